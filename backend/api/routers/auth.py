@@ -4,34 +4,59 @@ import os
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Header
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from ...database import get_db
 from ... import crud, schemas
-from ...security import hash_password, verify_password, create_access_token
+from ...security import PasswordHasherBusy, hash_password_pooled, verify_and_update_pooled, create_access_token
+from ...serialization import FastJSONRoute
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=FastJSONRoute)
 
 
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Сервис авторизации перегружен, повторите попытку позже",
+        headers={"Retry-After": "1"},
+    )
+
+
+# register/login are async: the hash is awaited on the process pool, and the
+# short sync database calls go to the threadpool, so a login burst does not
+# park request threads while bcrypt runs.
+
 @router.post("/register", summary="Регистрация, выдача токена")
-def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
-    existing_email = crud.get_user_by_email(db, user_in.email)
+async def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
+    existing_email = await run_in_threadpool(crud.get_user_by_email, db, user_in.email)
     if existing_email:
         raise HTTPException(status_code=400, detail="Email already registered")
-    hashed = hash_password(user_in.password)
-    user = crud.create_user(db, user_in, password_hasher=lambda _: hashed)
+    try:
+        hashed = await hash_password_pooled(user_in.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
+    user = await run_in_threadpool(crud.create_user, db, user_in, password_hasher=lambda _: hashed)
     token = create_access_token(user_id=user.id, access_level=user.access_level)
     return {"access_token": token, "token_type": "bearer", "level": user.access_level}
 
 
 @router.post("/login", summary="Логин, выдача токена")
-def login(login: str, password: str, db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, login)
+async def login(login: str, password: str, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(crud.get_user_by_email, db, login)
     if not user:
         raise HTTPException(status_code=400, detail="Invalid credentials")
-    if not verify_password(password, user.hashed_password):
+    try:
+        verified, new_hash = await verify_and_update_pooled(password, user.hashed_password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
+    if not verified:
         raise HTTPException(status_code=400, detail="Invalid credentials")
-    token = create_access_token(user_id=user.id, access_level=user.access_level)
-    return {"access_token": token, "token_type": "bearer", "level": user.access_level}
+    user_id, level = user.id, user.access_level  # read before a commit expires the row
+    # Cost factor changed since the hash was made: store the rehashed password
+    if new_hash:
+        await run_in_threadpool(crud.set_user_password_hash, db, user, new_hash)
+    token = create_access_token(user_id=user_id, access_level=level)
+    return {"access_token": token, "token_type": "bearer", "level": level}
 
 
 @router.post("/elevate", summary="Выдать токен с повышенным уровнем доступа (только для админа)")
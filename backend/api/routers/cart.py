@@ -1,15 +1,16 @@
 from __future__ import annotations
 
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 
 from ...database import get_db
-from ... import crud, schemas
+from ... import checkout, crud, schemas
 from ...auth import require_access, AuthContext
+from ...serialization import FastJSONRoute
 
-router = APIRouter(prefix="/users/{user_id}/cart", tags=["cart"])
+router = APIRouter(prefix="/users/{user_id}/cart", tags=["cart"], route_class=FastJSONRoute)
 
 
 @router.get("", response_model=schemas.Cart, summary="Получить корзину пользователя")
@@ -29,27 +30,71 @@ def update_cart(user_id: int, cart_update: schemas.CartUpdate, db: Session = Dep
     return crud.update_cart(db, cart=cart, cart_in=cart_update)
 
 
+@router.post("/items", response_model=schemas.Cart, summary="Добавить позицию в корзину")
+def add_cart_item(user_id: int, item: schemas.CartItemCreate, db: Session = Depends(get_db), ctx: AuthContext = Depends(require_access(1))):
+    user = crud.get_user_by_id(db, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+    cart = crud.add_cart_item(db, user_id=user_id, module_id=item.module_id, color_id=item.color_id, quantity=item.quantity)
+    if cart is None:
+        raise HTTPException(status_code=404, detail="Модуль не найден или недоступен в выбранном цвете")
+    return cart
+
+
+@router.patch("/items/{item_id}", response_model=schemas.Cart, summary="Изменить количество позиции (0 — удалить)")
+def update_cart_item(user_id: int, item_id: int, item_update: schemas.CartItemUpdate, db: Session = Depends(get_db), ctx: AuthContext = Depends(require_access(1))):
+    cart = crud.set_cart_item_quantity(db, user_id=user_id, item_id=item_id, quantity=item_update.quantity)
+    if cart is None:
+        raise HTTPException(status_code=404, detail="Позиция корзины не найдена")
+    return cart
+
+
+@router.delete("/items/{item_id}", response_model=schemas.Cart, summary="Удалить позицию из корзины")
+def remove_cart_item(user_id: int, item_id: int, db: Session = Depends(get_db), ctx: AuthContext = Depends(require_access(1))):
+    cart = crud.remove_cart_item(db, user_id=user_id, item_id=item_id)
+    if cart is None:
+        raise HTTPException(status_code=404, detail="Позиция корзины не найдена")
+    return cart
+
+
 @router.post("/modules/{module_id}", response_model=schemas.Cart, summary="Добавить модуль в корзину")
-def add_module_to_cart(user_id: int, module_id: int, db: Session = Depends(get_db), ctx: AuthContext = Depends(require_access(1))):
+def add_module_to_cart(user_id: int, module_id: int, color_id: Optional[int] = None, quantity: int = Query(1, ge=1), db: Session = Depends(get_db), ctx: AuthContext = Depends(require_access(1))):
     user = crud.get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
-    
-    module = crud.get_module(db, module_id)
-    if not module:
-        raise HTTPException(status_code=404, detail="Модуль не найден")
-    
-    return crud.add_module_to_cart(db, user_id=user_id, module_id=module_id)
+
+    cart = crud.add_cart_item(db, user_id=user_id, module_id=module_id, color_id=color_id, quantity=quantity)
+    if cart is None:
+        raise HTTPException(status_code=404, detail="Модуль не найден или недоступен в выбранном цвете")
+    return cart
 
 
 @router.delete("/modules/{module_id}", response_model=schemas.Cart, summary="Удалить модуль из корзины")
-def remove_module_from_cart(user_id: int, module_id: int, db: Session = Depends(get_db), ctx: AuthContext = Depends(require_access(1))):
+def remove_module_from_cart(user_id: int, module_id: int, color_id: Optional[int] = None, db: Session = Depends(get_db), ctx: AuthContext = Depends(require_access(1))):
+    user = crud.get_user_by_id(db, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+    return crud.remove_module_from_cart(db, user_id=user_id, module_id=module_id, color_id=color_id)
+
+
+@router.post("/checkout", response_model=schemas.Order, status_code=status.HTTP_201_CREATED, summary="Оформить заказ из корзины")
+def checkout_cart(
+    user_id: int,
+    checkout_in: schemas.CheckoutCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, max_length=255),
+    db: Session = Depends(get_db),
+    ctx: AuthContext = Depends(require_access(1)),
+):
+    """Повтор с тем же Idempotency-Key возвращает уже созданный заказ (заголовок Idempotent-Replayed)."""
+    if ctx.user_id != user_id and ctx.access_level < 2:
+        raise HTTPException(status_code=403, detail="Нельзя оформить заказ из чужой корзины")
     user = crud.get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
-    
-    module = crud.get_module(db, module_id)
-    if not module:
-        raise HTTPException(status_code=404, detail="Модуль не найден")
-    
-    return crud.remove_module_from_cart(db, user_id=user_id, module_id=module_id)
\ No newline at end of file
+    result = checkout.checkout_cart(db, user_id, checkout_in, idempotency_key)
+    if result.replayed:
+        response.status_code = status.HTTP_200_OK
+        response.headers["Idempotent-Replayed"] = "true"
+    return result.order
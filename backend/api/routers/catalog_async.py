@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...database import get_async_db
+from ... import crud_async, models, schemas
+from ...auth import require_access_async, AuthContext
+from ...cache import cached_response_async
+from ...conditional import conditional_get_async, list_validator_async
+from ...filters import CatalogFilters, catalog_filters
+from ...pagination import Cursor, cursor_param, set_next_cursor
+from ...projection import Projection, furniture_projection, module_projection
+from ...serialization import dump_json, FastJSONRoute
+
+# Async (DB_ASYNC=1) variants of the catalog and cart read paths. They are
+# registered ahead of the sync routers on the same paths and share their
+# response models, so they are hidden from the OpenAPI schema.
+router = APIRouter(include_in_schema=False, route_class=FastJSONRoute)
+
+
+# ======================
+# Colors
+# ======================
+@router.get("/colors/", response_model=List[schemas.Color])
+async def list_colors(request: Request, skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    async def build():
+        colors = await crud_async.list_colors(db, skip=skip, limit=limit)
+        return dump_json(List[schemas.Color], colors), {}
+    return await cached_response_async("colors", request, build)
+
+
+@router.get("/colors/{color_id}", response_model=schemas.Color)
+async def get_color(color_id: int, db: AsyncSession = Depends(get_async_db)):
+    color = await crud_async.get_color(db, color_id)
+    if color is None:
+        raise HTTPException(status_code=404, detail="Цвет не найден")
+    return color
+
+
+# ======================
+# Modules
+# ======================
+@router.get("/modules/", response_model=List[schemas.Module])
+async def list_modules(request: Request, skip: int = 0, limit: int = 100, name: str = None, after: Optional[Cursor] = Depends(cursor_param("modules")), filters: CatalogFilters = Depends(catalog_filters), projection: Projection = Depends(module_projection), db: AsyncSession = Depends(get_async_db)):
+    async def build():
+        modules = await crud_async.list_modules(db, skip=skip, limit=limit, name=name, after=after, filters=filters, options=projection.options)
+        headers = {}
+        set_next_cursor(headers, modules, limit, "modules")
+        return dump_json(List[projection.schema], modules), headers
+    return await cached_response_async("modules", request, build, validator=lambda: list_validator_async(db, request, models.Module))
+
+
+@router.get("/modules/facets", response_model=schemas.CatalogFacets)
+async def module_facets(request: Request, name: str = None, filters: CatalogFilters = Depends(catalog_filters), db: AsyncSession = Depends(get_async_db)):
+    async def build():
+        facets = await crud_async.module_facets(db, name=name, filters=filters)
+        return dump_json(schemas.CatalogFacets, facets), {}
+    return await cached_response_async("modules", request, build, validator=lambda: list_validator_async(db, request, models.Module))
+
+
+@router.get("/modules/cards", response_model=List[schemas.CatalogCard])
+async def list_module_cards(request: Request, skip: int = 0, limit: int = 100, after: Optional[Cursor] = Depends(cursor_param("module_cards")), db: AsyncSession = Depends(get_async_db)):
+    async def build():
+        items = await crud_async.list_cards(db, "module", skip=skip, limit=limit, after=after)
+        headers = {}
+        set_next_cursor(headers, items, limit, "module_cards")
+        return dump_json(List[schemas.CatalogCard], items), headers
+    return await cached_response_async("modules", request, build, validator=lambda: list_validator_async(db, request, models.Module))
+
+
+@router.get("/modules/{module_id}", response_model=schemas.Module, dependencies=[Depends(conditional_get_async(models.Module, "module_id"))])
+async def get_module(module_id: int, response: Response, projection: Projection = Depends(module_projection), db: AsyncSession = Depends(get_async_db)):
+    module = await crud_async.get_module(db, module_id, options=projection.options)
+    if module is None:
+        raise HTTPException(status_code=404, detail="Модуль не найден")
+    return projection.render(module, response)
+
+
+# ======================
+# Furniture
+# ======================
+@router.get("/furniture/", response_model=List[schemas.Furniture])
+async def list_furniture(request: Request, skip: int = 0, limit: int = 100, furniture_type: str = None, model: str = None, after: Optional[Cursor] = Depends(cursor_param("furniture")), filters: CatalogFilters = Depends(catalog_filters), projection: Projection = Depends(furniture_projection), db: AsyncSession = Depends(get_async_db)):
+    async def build():
+        furniture_items = await crud_async.list_furniture(db, skip=skip, limit=limit, furniture_type=furniture_type, after=after, filters=filters, model=model, options=projection.options)
+        headers = {}
+        set_next_cursor(headers, furniture_items, limit, "furniture")
+        return dump_json(List[projection.schema], furniture_items), headers
+    return await cached_response_async("furniture", request, build, validator=lambda: list_validator_async(db, request, models.Furniture))
+
+
+@router.get("/furniture/facets", response_model=schemas.CatalogFacets)
+async def furniture_facets(request: Request, furniture_type: str = None, model: str = None, filters: CatalogFilters = Depends(catalog_filters), db: AsyncSession = Depends(get_async_db)):
+    async def build():
+        facets = await crud_async.furniture_facets(db, furniture_type=furniture_type, model=model, filters=filters)
+        return dump_json(schemas.CatalogFacets, facets), {}
+    return await cached_response_async("furniture", request, build, validator=lambda: list_validator_async(db, request, models.Furniture))
+
+
+@router.get("/furniture/cards", response_model=List[schemas.CatalogCard])
+async def list_furniture_cards(request: Request, skip: int = 0, limit: int = 100, furniture_type: str = None, after: Optional[Cursor] = Depends(cursor_param("furniture_cards")), db: AsyncSession = Depends(get_async_db)):
+    async def build():
+        items = await crud_async.list_cards(db, "furniture", skip=skip, limit=limit, after=after, furniture_type=furniture_type)
+        headers = {}
+        set_next_cursor(headers, items, limit, "furniture_cards")
+        return dump_json(List[schemas.CatalogCard], items), headers
+    return await cached_response_async("furniture", request, build, validator=lambda: list_validator_async(db, request, models.Furniture))
+
+
+@router.get("/furniture/{furniture_id}", response_model=schemas.Furniture, dependencies=[Depends(conditional_get_async(models.Furniture, "furniture_id"))])
+async def get_furniture(furniture_id: int, response: Response, projection: Projection = Depends(furniture_projection), db: AsyncSession = Depends(get_async_db)):
+    furniture = await crud_async.get_furniture(db, furniture_id, options=projection.options)
+    if furniture is None:
+        raise HTTPException(status_code=404, detail="Мебель не найдена")
+    return projection.render(furniture, response)
+
+
+# ======================
+# News
+# ======================
+@router.get("/news/", response_model=List[schemas.News], dependencies=[Depends(conditional_get_async(models.News))])
+async def list_news(response: Response, skip: int = 0, limit: int = 100, after: Optional[Cursor] = Depends(cursor_param("news")), db: AsyncSession = Depends(get_async_db)):
+    news_list = await crud_async.list_news(db, skip=skip, limit=limit, after=after)
+    set_next_cursor(response.headers, news_list, limit, "news", key=lambda news: news.created_at)
+    return news_list
+
+
+@router.get("/news/{news_id}", response_model=schemas.News, dependencies=[Depends(conditional_get_async(models.News, "news_id"))])
+async def get_news(news_id: int, db: AsyncSession = Depends(get_async_db)):
+    news = await crud_async.get_news(db, news_id)
+    if news is None:
+        raise HTTPException(status_code=404, detail="Новость не найдена")
+    return news
+
+
+# ======================
+# Shops / Where to buy
+# ======================
+@router.get("/shops/", response_model=List[schemas.Shop])
+async def list_shops(request: Request, skip: int = 0, limit: int = 100, city: str = None, db: AsyncSession = Depends(get_async_db)):
+    async def build():
+        shops = await crud_async.list_shops(db, skip=skip, limit=limit, city=city)
+        return dump_json(List[schemas.Shop], shops), {}
+    return await cached_response_async("shops", request, build, validator=lambda: list_validator_async(db, request, models.Shop))
+
+
+@router.get("/shops/{shop_id}", response_model=schemas.Shop, dependencies=[Depends(conditional_get_async(models.Shop, "shop_id"))])
+async def get_shop(shop_id: int, db: AsyncSession = Depends(get_async_db)):
+    shop = await crud_async.get_shop(db, shop_id)
+    if shop is None:
+        raise HTTPException(status_code=404, detail="Магазин не найден")
+    return shop
+
+
+@router.get("/where-to-buy/", response_model=List[schemas.WhereToBuy])
+async def list_where_to_buy(request: Request, skip: int = 0, limit: int = 100, location: str = None, db: AsyncSession = Depends(get_async_db)):
+    async def build():
+        where_to_buy_list = await crud_async.list_where_to_buy(db, skip=skip, limit=limit, location=location)
+        return dump_json(List[schemas.WhereToBuy], where_to_buy_list), {}
+    return await cached_response_async("where_to_buy", request, build, validator=lambda: list_validator_async(db, request, models.WhereToBuy))
+
+
+@router.get("/where-to-buy/{where_to_buy_id}", response_model=schemas.WhereToBuy, dependencies=[Depends(conditional_get_async(models.WhereToBuy, "where_to_buy_id"))])
+async def get_where_to_buy(where_to_buy_id: int, db: AsyncSession = Depends(get_async_db)):
+    where_to_buy = await crud_async.get_where_to_buy(db, where_to_buy_id)
+    if where_to_buy is None:
+        raise HTTPException(status_code=404, detail="Точка продаж не найдена")
+    return where_to_buy
+
+
+# ======================
+# Cart
+# ======================
+@router.get("/users/{user_id}/cart", response_model=schemas.Cart)
+async def get_cart(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    user = await crud_async.get_user_by_id(db, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+    return await crud_async.get_or_create_cart(db, user_id=user_id)
+
+
+@router.post("/users/{user_id}/cart/modules/{module_id}", response_model=schemas.Cart)
+async def add_module_to_cart(user_id: int, module_id: int, color_id: Optional[int] = None, quantity: int = Query(1, ge=1), db: AsyncSession = Depends(get_async_db), ctx: AuthContext = Depends(require_access_async(1))):
+    user = await crud_async.get_user_by_id(db, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+    cart = await crud_async.add_cart_item(db, user_id=user_id, module_id=module_id, color_id=color_id, quantity=quantity)
+    if cart is None:
+        raise HTTPException(status_code=404, detail="Модуль не найден или недоступен в выбранном цвете")
+    return cart
+
+
+@router.post("/users/{user_id}/cart/items", response_model=schemas.Cart)
+async def add_cart_item(user_id: int, item: schemas.CartItemCreate, db: AsyncSession = Depends(get_async_db), ctx: AuthContext = Depends(require_access_async(1))):
+    user = await crud_async.get_user_by_id(db, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+    cart = await crud_async.add_cart_item(db, user_id=user_id, module_id=item.module_id, color_id=item.color_id, quantity=item.quantity)
+    if cart is None:
+        raise HTTPException(status_code=404, detail="Модуль не найден или недоступен в выбранном цвете")
+    return cart
+
+
+@router.delete("/users/{user_id}/cart/modules/{module_id}", response_model=schemas.Cart)
+async def remove_module_from_cart(user_id: int, module_id: int, color_id: Optional[int] = None, db: AsyncSession = Depends(get_async_db), ctx: AuthContext = Depends(require_access_async(1))):
+    user = await crud_async.get_user_by_id(db, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+    return await crud_async.remove_module_from_cart(db, user_id=user_id, module_id=module_id, color_id=color_id)
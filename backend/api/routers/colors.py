@@ -1,12 +1,15 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Request, status, UploadFile, File, Form
 from sqlalchemy.orm import Session
 
 from ...database import get_db
-from ... import crud, schemas
-from ...uploads import save_upload
+from ...auth import require_access, AuthContext
+from ... import bulk, crud, schemas
+from ...uploads import save_uploads
+from ...cache import cached_response
+from ...serialization import dump_json, FastJSONRoute
 
-router = APIRouter(prefix="/colors", tags=["colors"])
+router = APIRouter(prefix="/colors", tags=["colors"], route_class=FastJSONRoute)
 
 
 @router.post("/", response_model=schemas.Color, status_code=status.HTTP_201_CREATED)
@@ -19,10 +22,7 @@ def create_color(
 ):
     """Создать новый цвет с загрузкой фотографий"""
     # Обработка загруженных фотографий
-    photo_urls = []
-    for photo in photos:
-        if photo.filename:
-            photo_urls.append(save_upload(photo, prefix="color"))
+    photo_urls = save_uploads(photos, prefix="color")
     
     # Создание объекта цвета
     color_data = {
@@ -38,13 +38,49 @@ def create_color(
 
 @router.get("/", response_model=List[schemas.Color])
 def list_colors(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db)
 ):
     """Получить список цветов"""
-    colors = crud.list_colors(db=db, skip=skip, limit=limit)
-    return colors
+    def build():
+        colors = crud.list_colors(db=db, skip=skip, limit=limit)
+        return dump_json(List[schemas.Color], colors), {}
+    return cached_response("colors", request, build)
+
+
+@router.post("/bulk", response_model=schemas.BulkResult)
+def bulk_create_colors(
+    rows: List = Depends(bulk.bulk_rows),
+    atomic: bool = False,
+    db: Session = Depends(get_db),
+    ctx: AuthContext = Depends(require_access(2))
+):
+    """Массовое создание цветов: JSON-массив или NDJSON, одна транзакция, ошибки по строкам (atomic=true — все или ничего)"""
+    return bulk.bulk_create(db, bulk.COLORS, rows, atomic=atomic)
+
+
+@router.patch("/bulk", response_model=schemas.BulkResult)
+def bulk_update_colors(
+    rows: List = Depends(bulk.bulk_rows),
+    atomic: bool = False,
+    db: Session = Depends(get_db),
+    ctx: AuthContext = Depends(require_access(2))
+):
+    """Массовое обновление цветов: каждая строка содержит id и изменяемые поля"""
+    return bulk.bulk_update(db, bulk.COLORS, rows, atomic=atomic)
+
+
+@router.delete("/bulk", response_model=schemas.BulkResult)
+def bulk_delete_colors(
+    rows: List = Depends(bulk.bulk_rows),
+    atomic: bool = False,
+    db: Session = Depends(get_db),
+    ctx: AuthContext = Depends(require_access(2))
+):
+    """Массовое удаление цветов по списку id"""
+    return bulk.bulk_delete(db, bulk.COLORS, rows, atomic=atomic)
 
 
 @router.get("/{color_id}", response_model=schemas.Color)
@@ -74,10 +110,7 @@ def update_color(
         raise HTTPException(status_code=404, detail="Цвет не найден")
     
     # Обработка загруженных фотографий
-    photo_urls = []
-    for photo in photos:
-        if photo.filename:
-            photo_urls.append(save_upload(photo, prefix="color"))
+    photo_urls = save_uploads(photos, prefix="color")
     
     # Создание объекта обновления
     update_data = {}
@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from ...auth import require_access, AuthContext
+from ... import export
+from ...serialization import FastJSONRoute
+
+router = APIRouter(prefix="/export", tags=["export"], route_class=FastJSONRoute)
+
+
+@router.get("/{entity}")
+def export_entity(
+    entity: str,
+    format: str = Query("csv", description="csv, ndjson или parquet"),
+    gzip: bool = Query(False, description="Сжать выгрузку (для parquet — сжатие колонок)"),
+    since: Optional[datetime] = Query(None, description="Только записи, созданные начиная с этого момента"),
+    ctx: AuthContext = Depends(require_access(2))
+):
+    """Потоковая выгрузка заказов, модулей, мебели или обращений в поддержку"""
+    if entity not in export.ENTITIES:
+        raise HTTPException(status_code=404, detail="Неизвестная сущность для выгрузки")
+    if format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail="Поддерживаются форматы csv, ndjson, parquet")
+    if format == "parquet" and not export.parquet_available():
+        raise HTTPException(status_code=400, detail="Выгрузка в Parquet недоступна на сервере")
+    media_type = "application/gzip" if gzip and format != "parquet" else export.FORMATS[format][0]
+    filename = export.export_filename(entity, format, gzip)
+    return StreamingResponse(
+        export.stream_export(entity, format, gzip=gzip, since=since),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,12 +1,19 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, UploadFile, File, Form
 from sqlalchemy.orm import Session
 
 from ...database import get_db
-from ... import crud, schemas
-from ...uploads import save_upload
+from ...auth import require_access, AuthContext
+from ... import bulk, cards, crud, models, schemas
+from ...uploads import save_uploads
+from ...filters import CatalogFilters, catalog_filters
+from ...pagination import Cursor, cursor_param, set_next_cursor
+from ...projection import Projection, furniture_projection
+from ...cache import cached_response
+from ...conditional import conditional_get, list_validator
+from ...serialization import dump_json, FastJSONRoute
 
-router = APIRouter(prefix="/furniture", tags=["furniture"])
+router = APIRouter(prefix="/furniture", tags=["furniture"], route_class=FastJSONRoute)
 
 
 @router.post("/", response_model=schemas.Furniture, status_code=status.HTTP_201_CREATED)
@@ -24,10 +31,7 @@ def create_furniture(
 ):
     """Создать новую мебель с загрузкой фотографий"""
     # Обработка загруженных фотографий
-    photo_urls = []
-    for photo in photos:
-        if photo.filename:
-            photo_urls.append(save_upload(photo, prefix="furniture"))
+    photo_urls = save_uploads(photos, prefix="furniture")
     
     # Парсинг color_ids если они переданы
     color_ids_list = []
@@ -57,26 +61,106 @@ def create_furniture(
 
 @router.get("/", response_model=List[schemas.Furniture])
 def list_furniture(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     furniture_type: str = None,
+    model: str = None,
+    after: Optional[Cursor] = Depends(cursor_param("furniture")),
+    filters: CatalogFilters = Depends(catalog_filters),
+    projection: Projection = Depends(furniture_projection),
     db: Session = Depends(get_db)
 ):
-    """Получить список мебели"""
-    furniture_items = crud.list_furniture(db=db, skip=skip, limit=limit, furniture_type=furniture_type)
-    return furniture_items
+    """Получить список мебели (фильтры по типу, модели, цене и цветам; fields/view — только нужные поля)"""
+    def build():
+        furniture_items = crud.list_furniture(
+            db=db, skip=skip, limit=limit, furniture_type=furniture_type, after=after, filters=filters, model=model,
+            options=projection.options
+        )
+        headers = {}
+        set_next_cursor(headers, furniture_items, limit, "furniture")
+        return dump_json(List[projection.schema], furniture_items), headers
+    return cached_response("furniture", request, build, validator=lambda: list_validator(db, request, models.Furniture))
 
 
-@router.get("/{furniture_id}", response_model=schemas.Furniture)
+@router.get("/facets", response_model=schemas.CatalogFacets)
+def furniture_facets(
+    request: Request,
+    furniture_type: str = None,
+    model: str = None,
+    filters: CatalogFilters = Depends(catalog_filters),
+    db: Session = Depends(get_db)
+):
+    """Количество мебели по цветам, типам, моделям и ценовым диапазонам для текущих фильтров"""
+    def build():
+        facets = crud.furniture_facets(db=db, furniture_type=furniture_type, model=model, filters=filters)
+        return dump_json(schemas.CatalogFacets, facets), {}
+    return cached_response("furniture", request, build, validator=lambda: list_validator(db, request, models.Furniture))
+
+
+@router.get("/cards", response_model=List[schemas.CatalogCard])
+def list_furniture_cards(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    furniture_type: str = None,
+    after: Optional[Cursor] = Depends(cursor_param("furniture_cards")),
+    db: Session = Depends(get_db)
+):
+    """Карточки мебели для списков (тип — точное совпадение): цена, первое фото и цвета без join-ов"""
+    def build():
+        items = cards.list_cards(db, "furniture", skip=skip, limit=limit, after=after, furniture_type=furniture_type)
+        headers = {}
+        set_next_cursor(headers, items, limit, "furniture_cards")
+        return dump_json(List[schemas.CatalogCard], items), headers
+    return cached_response("furniture", request, build, validator=lambda: list_validator(db, request, models.Furniture))
+
+
+@router.post("/bulk", response_model=schemas.BulkResult)
+def bulk_create_furniture(
+    rows: List = Depends(bulk.bulk_rows),
+    atomic: bool = False,
+    db: Session = Depends(get_db),
+    ctx: AuthContext = Depends(require_access(2))
+):
+    """Массовое создание мебели: JSON-массив или NDJSON, одна транзакция, ошибки по строкам (atomic=true — все или ничего)"""
+    return bulk.bulk_create(db, bulk.FURNITURE, rows, atomic=atomic)
+
+
+@router.patch("/bulk", response_model=schemas.BulkResult)
+def bulk_update_furniture(
+    rows: List = Depends(bulk.bulk_rows),
+    atomic: bool = False,
+    db: Session = Depends(get_db),
+    ctx: AuthContext = Depends(require_access(2))
+):
+    """Массовое обновление мебели: каждая строка содержит id и изменяемые поля"""
+    return bulk.bulk_update(db, bulk.FURNITURE, rows, atomic=atomic)
+
+
+@router.delete("/bulk", response_model=schemas.BulkResult)
+def bulk_delete_furniture(
+    rows: List = Depends(bulk.bulk_rows),
+    atomic: bool = False,
+    db: Session = Depends(get_db),
+    ctx: AuthContext = Depends(require_access(2))
+):
+    """Массовое удаление мебели по списку id"""
+    return bulk.bulk_delete(db, bulk.FURNITURE, rows, atomic=atomic)
+
+
+@router.get("/{furniture_id}", response_model=schemas.Furniture, dependencies=[Depends(conditional_get(models.Furniture, "furniture_id"))])
 def get_furniture(
     furniture_id: int,
+    response: Response,
+    projection: Projection = Depends(furniture_projection),
     db: Session = Depends(get_db)
 ):
-    """Получить мебель по ID"""
-    furniture = crud.get_furniture(db=db, furniture_id=furniture_id)
+    """Получить мебель по ID (fields/view — только нужные поля)"""
+    furniture = crud.get_furniture(db=db, furniture_id=furniture_id, options=projection.options)
     if furniture is None:
         raise HTTPException(status_code=404, detail="Мебель не найдена")
-    return furniture
+    return projection.render(furniture, response)
 
 
 @router.put("/{furniture_id}", response_model=schemas.Furniture)
@@ -99,10 +183,7 @@ def update_furniture(
         raise HTTPException(status_code=404, detail="Мебель не найдена")
     
     # Обработка загруженных фотографий
-    photo_urls = []
-    for photo in photos:
-        if photo.filename:
-            photo_urls.append(save_upload(photo, prefix="furniture"))
+    photo_urls = save_uploads(photos, prefix="furniture")
     
     # Парсинг color_ids если они переданы
     color_ids_list = None
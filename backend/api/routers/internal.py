@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from ... import cache, cards, pricing
+from ...auth import require_access, AuthContext
+from ...cache import response_cache
+from ...database import get_db, pool_status
+from ...serialization import FastJSONRoute
+
+router = APIRouter(prefix="/internal", tags=["internal"], route_class=FastJSONRoute)
+
+
+@router.get("/cache", summary="Статистика кэша ответов каталога")
+def cache_stats(ctx: AuthContext = Depends(require_access(3))):
+    return {"responses": response_cache.stats()}
+
+
+@router.get("/pool", summary="Состояние пула соединений с БД")
+def pool_stats(ctx: AuthContext = Depends(require_access(3))):
+    return pool_status()
+
+
+@router.post("/reprice", summary="Пересчитать цены и суммы всех активных корзин")
+def reprice_carts(db: Session = Depends(get_db), ctx: AuthContext = Depends(require_access(3))):
+    return {"carts": pricing.reprice_carts(db)}
+
+
+@router.post("/cards/rebuild", summary="Пересобрать карточки каталога из модулей и мебели")
+def rebuild_cards(db: Session = Depends(get_db), ctx: AuthContext = Depends(require_access(3))):
+    rebuilt = cards.rebuild_cards(db)
+    db.commit()
+    cache.invalidate("modules", "furniture")
+    return {"cards": rebuilt}
@@ -1,12 +1,19 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, UploadFile, File, Form
 from sqlalchemy.orm import Session
 
 from ...database import get_db
-from ... import crud, schemas, models
-from ...uploads import save_upload
+from ...auth import require_access, AuthContext
+from ... import bulk, cards, crud, schemas, models
+from ...uploads import save_uploads
+from ...filters import CatalogFilters, catalog_filters
+from ...pagination import Cursor, cursor_param, set_next_cursor
+from ...projection import Projection, module_projection
+from ...cache import cached_response
+from ...conditional import conditional_get, list_validator
+from ...serialization import dump_json, FastJSONRoute
 
-router = APIRouter(prefix="/modules", tags=["modules"])
+router = APIRouter(prefix="/modules", tags=["modules"], route_class=FastJSONRoute)
 
 
 @router.post("/", response_model=schemas.Module, status_code=status.HTTP_201_CREATED)
@@ -23,10 +30,7 @@ def create_module(
 ):
     """Создать новый модуль с загрузкой фотографий"""
     # Обработка загруженных фотографий
-    photo_urls = []
-    for photo in photos:
-        if photo.filename:
-            photo_urls.append(save_upload(photo, prefix="module"))
+    photo_urls = save_uploads(photos, prefix="module")
     
     # Парсинг color_ids если они переданы
     color_ids_list = []
@@ -55,26 +59,100 @@ def create_module(
 
 @router.get("/", response_model=List[schemas.Module])
 def list_modules(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     name: str = None,
+    after: Optional[Cursor] = Depends(cursor_param("modules")),
+    filters: CatalogFilters = Depends(catalog_filters),
+    projection: Projection = Depends(module_projection),
     db: Session = Depends(get_db)
 ):
-    """Получить список модулей"""
-    modules = crud.list_modules(db=db, skip=skip, limit=limit, name=name)
-    return modules
+    """Получить список модулей (фильтры по цене и цветам; fields/view — только нужные поля)"""
+    def build():
+        modules = crud.list_modules(db=db, skip=skip, limit=limit, name=name, after=after, filters=filters, options=projection.options)
+        headers = {}
+        set_next_cursor(headers, modules, limit, "modules")
+        return dump_json(List[projection.schema], modules), headers
+    return cached_response("modules", request, build, validator=lambda: list_validator(db, request, models.Module))
 
 
-@router.get("/{module_id}", response_model=schemas.Module)
+@router.get("/facets", response_model=schemas.CatalogFacets)
+def module_facets(
+    request: Request,
+    name: str = None,
+    filters: CatalogFilters = Depends(catalog_filters),
+    db: Session = Depends(get_db)
+):
+    """Количество модулей по цветам и ценовым диапазонам для текущих фильтров"""
+    def build():
+        facets = crud.module_facets(db=db, name=name, filters=filters)
+        return dump_json(schemas.CatalogFacets, facets), {}
+    return cached_response("modules", request, build, validator=lambda: list_validator(db, request, models.Module))
+
+
+@router.get("/cards", response_model=List[schemas.CatalogCard])
+def list_module_cards(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Cursor] = Depends(cursor_param("module_cards")),
+    db: Session = Depends(get_db)
+):
+    """Карточки модулей для списков: цена, первое фото и цвета без join-ов"""
+    def build():
+        items = cards.list_cards(db, "module", skip=skip, limit=limit, after=after)
+        headers = {}
+        set_next_cursor(headers, items, limit, "module_cards")
+        return dump_json(List[schemas.CatalogCard], items), headers
+    return cached_response("modules", request, build, validator=lambda: list_validator(db, request, models.Module))
+
+
+@router.post("/bulk", response_model=schemas.BulkResult)
+def bulk_create_modules(
+    rows: List = Depends(bulk.bulk_rows),
+    atomic: bool = False,
+    db: Session = Depends(get_db),
+    ctx: AuthContext = Depends(require_access(2))
+):
+    """Массовое создание модулей: JSON-массив или NDJSON, одна транзакция, ошибки по строкам (atomic=true — все или ничего)"""
+    return bulk.bulk_create(db, bulk.MODULES, rows, atomic=atomic)
+
+
+@router.patch("/bulk", response_model=schemas.BulkResult)
+def bulk_update_modules(
+    rows: List = Depends(bulk.bulk_rows),
+    atomic: bool = False,
+    db: Session = Depends(get_db),
+    ctx: AuthContext = Depends(require_access(2))
+):
+    """Массовое обновление модулей: каждая строка содержит id и изменяемые поля"""
+    return bulk.bulk_update(db, bulk.MODULES, rows, atomic=atomic)
+
+
+@router.delete("/bulk", response_model=schemas.BulkResult)
+def bulk_delete_modules(
+    rows: List = Depends(bulk.bulk_rows),
+    atomic: bool = False,
+    db: Session = Depends(get_db),
+    ctx: AuthContext = Depends(require_access(2))
+):
+    """Массовое удаление модулей по списку id"""
+    return bulk.bulk_delete(db, bulk.MODULES, rows, atomic=atomic)
+
+
+@router.get("/{module_id}", response_model=schemas.Module, dependencies=[Depends(conditional_get(models.Module, "module_id"))])
 def get_module(
     module_id: int,
+    response: Response,
+    projection: Projection = Depends(module_projection),
     db: Session = Depends(get_db)
 ):
-    """Получить модуль по ID"""
-    module = crud.get_module(db=db, module_id=module_id)
+    """Получить модуль по ID (fields/view — только нужные поля)"""
+    module = crud.get_module(db=db, module_id=module_id, options=projection.options)
     if module is None:
         raise HTTPException(status_code=404, detail="Модуль не найден")
-    return module
+    return projection.render(module, response)
 
 
 @router.put("/{module_id}", response_model=schemas.Module)
@@ -96,10 +174,7 @@ def update_module(
         raise HTTPException(status_code=404, detail="Модуль не найден")
     
     # Обработка загруженных фотографий
-    photo_urls = []
-    for photo in photos:
-        if photo.filename:
-            photo_urls.append(save_upload(photo, prefix="module"))
+    photo_urls = save_uploads(photos, prefix="module")
     
     # Парсинг color_ids если они переданы
     color_ids_list = None
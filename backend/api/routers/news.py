@@ -1,12 +1,15 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Response, status, UploadFile, File, Form
 from sqlalchemy.orm import Session
 
 from ...database import get_db
-from ... import crud, schemas
-from ...uploads import save_upload
+from ... import crud, models, schemas
+from ...conditional import conditional_get
+from ...uploads import save_upload, save_uploads
+from ...pagination import Cursor, cursor_param, set_next_cursor
+from ...serialization import FastJSONRoute
 
-router = APIRouter(prefix="/news", tags=["news"])
+router = APIRouter(prefix="/news", tags=["news"], route_class=FastJSONRoute)
 
 
 @router.post("/", response_model=schemas.News, status_code=status.HTTP_201_CREATED)
@@ -25,10 +28,7 @@ def create_news(
         main_photo_url = save_upload(main_photo, prefix="news_main")
     
     # Обработка дополнительных фотографий
-    photo_urls = []
-    for photo in photos:
-        if photo.filename:
-            photo_urls.append(save_upload(photo, prefix="news"))
+    photo_urls = save_uploads(photos, prefix="news")
     
     # Создание объекта новости
     news_data = {
@@ -43,18 +43,21 @@ def create_news(
     return crud.create_news(db=db, news_in=news_in)
 
 
-@router.get("/", response_model=List[schemas.News])
+@router.get("/", response_model=List[schemas.News], dependencies=[Depends(conditional_get(models.News))])
 def list_news(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    after: Optional[Cursor] = Depends(cursor_param("news")),
     db: Session = Depends(get_db)
 ):
     """Получить список новостей"""
-    news_list = crud.list_news(db=db, skip=skip, limit=limit)
+    news_list = crud.list_news(db=db, skip=skip, limit=limit, after=after)
+    set_next_cursor(response.headers, news_list, limit, "news", key=lambda news: news.created_at)
     return news_list
 
 
-@router.get("/{news_id}", response_model=schemas.News)
+@router.get("/{news_id}", response_model=schemas.News, dependencies=[Depends(conditional_get(models.News, "news_id"))])
 def get_news(
     news_id: int,
     db: Session = Depends(get_db)
@@ -87,10 +90,7 @@ def update_news(
         main_photo_url = save_upload(main_photo, prefix="news_main")
     
     # Обработка дополнительных фотографий
-    photo_urls = []
-    for photo in photos:
-        if photo.filename:
-            photo_urls.append(save_upload(photo, prefix="news"))
+    photo_urls = save_uploads(photos, prefix="news")
     
     # Создание объекта обновления
     update_data = {}
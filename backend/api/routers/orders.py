@@ -2,14 +2,27 @@ from __future__ import annotations
 
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 
 from ...database import get_db
-from ... import crud, schemas
+from ... import crud, models, schemas
 from ...auth import require_access, AuthContext
+from ...conditional import conditional_get
+from ...pagination import Cursor, cursor_param, set_next_cursor
+from ...serialization import FastJSONRoute
 
-router = APIRouter(prefix="/orders", tags=["orders"])
+router = APIRouter(prefix="/orders", tags=["orders"], route_class=FastJSONRoute)
+
+
+def _order_modules(db: Session, module_ids: Optional[List[int]]) -> List:
+    """Проверить все модули заказа одним запросом."""
+    modules = crud.get_modules(db, module_ids or [])
+    found = {module.id for module in modules}
+    for module_id in module_ids or []:
+        if module_id not in found:
+            raise HTTPException(status_code=404, detail=f"Модуль с ID {module_id} не найден")
+    return modules
 
 
 @router.post("", response_model=schemas.Order, status_code=status.HTTP_201_CREATED, summary="Создать заказ")
@@ -18,22 +31,18 @@ def create_order(order_in: schemas.OrderCreate, db: Session = Depends(get_db), c
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
     
-    # Проверить, что все модули существуют
-    if order_in.module_ids:
-        for module_id in order_in.module_ids:
-            module = crud.get_module(db, module_id)
-            if not module:
-                raise HTTPException(status_code=404, detail=f"Модуль с ID {module_id} не найден")
-    
-    return crud.create_order(db, order_in)
+    modules = _order_modules(db, order_in.module_ids)
+    return crud.create_order(db, order_in, modules)
 
 
-@router.get("", response_model=List[schemas.Order], summary="Список заказов (фильтр по user_id)")
-def list_orders(user_id: Optional[int] = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.list_orders(db, user_id=user_id, skip=skip, limit=limit)
+@router.get("", response_model=List[schemas.Order], summary="Список заказов (фильтр по user_id)", dependencies=[Depends(conditional_get(models.Order, depends_on=(models.Module,)))])
+def list_orders(response: Response, user_id: Optional[int] = None, skip: int = 0, limit: int = 100, after: Optional[Cursor] = Depends(cursor_param("orders")), db: Session = Depends(get_db)):
+    orders = crud.list_orders(db, user_id=user_id, skip=skip, limit=limit, after=after)
+    set_next_cursor(response.headers, orders, limit, "orders", key=lambda order: order.created_at)
+    return orders
 
 
-@router.get("/{order_id}", response_model=schemas.Order, summary="Получить заказ")
+@router.get("/{order_id}", response_model=schemas.Order, summary="Получить заказ", dependencies=[Depends(conditional_get(models.Order, "order_id", depends_on=(models.Module,)))])
 def get_order(order_id: int, db: Session = Depends(get_db)):
     order = crud.get_order(db, order_id)
     if not order:
@@ -47,14 +56,8 @@ def update_order(order_id: int, order_in: schemas.OrderUpdate, db: Session = Dep
     if not order:
         raise HTTPException(status_code=404, detail="Заказ не найден")
     
-    # Проверить, что все модули существуют
-    if order_in.module_ids:
-        for module_id in order_in.module_ids:
-            module = crud.get_module(db, module_id)
-            if not module:
-                raise HTTPException(status_code=404, detail=f"Модуль с ID {module_id} не найден")
-    
-    return crud.update_order(db, order, order_in)
+    modules = _order_modules(db, order_in.module_ids) if order_in.module_ids is not None else None
+    return crud.update_order(db, order, order_in, modules)
 
 
 @router.delete("/{order_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Удалить заказ")
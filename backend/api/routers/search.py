@@ -0,0 +1,24 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from ...database import get_db
+from ... import schemas, search
+from ...serialization import FastJSONRoute
+
+router = APIRouter(prefix="/search", tags=["search"], route_class=FastJSONRoute)
+
+
+@router.get("/", response_model=List[schemas.SearchHit])
+def search_catalog(
+    q: str = Query(..., min_length=1, max_length=200, description="Поисковый запрос"),
+    types: Optional[str] = Query(None, description="Через запятую: modules, furniture, news"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Поиск по модулям, мебели и новостям с ранжированием и подсветкой"""
+    kinds = [kind.strip() for kind in types.split(",") if kind.strip()] if types else list(search.TARGETS)
+    unknown = [kind for kind in kinds if kind not in search.TARGETS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Неизвестный тип поиска: {', '.join(unknown)}")
+    return search.search(db, q, kinds, limit=limit)
@@ -1,11 +1,14 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 
 from ...database import get_db
-from ... import crud, schemas
+from ... import crud, models, schemas
+from ...cache import cached_response
+from ...conditional import conditional_get, list_validator
+from ...serialization import dump_json, FastJSONRoute
 
-router = APIRouter(prefix="/shops", tags=["shops"])
+router = APIRouter(prefix="/shops", tags=["shops"], route_class=FastJSONRoute)
 
 
 @router.post("/", response_model=schemas.Shop, status_code=status.HTTP_201_CREATED)
@@ -19,17 +22,20 @@ def create_shop(
 
 @router.get("/", response_model=List[schemas.Shop])
 def list_shops(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     city: str = None,
     db: Session = Depends(get_db)
 ):
     """Получить список магазинов"""
-    shops = crud.list_shops(db=db, skip=skip, limit=limit, city=city)
-    return shops
+    def build():
+        shops = crud.list_shops(db=db, skip=skip, limit=limit, city=city)
+        return dump_json(List[schemas.Shop], shops), {}
+    return cached_response("shops", request, build, validator=lambda: list_validator(db, request, models.Shop))
 
 
-@router.get("/{shop_id}", response_model=schemas.Shop)
+@router.get("/{shop_id}", response_model=schemas.Shop, dependencies=[Depends(conditional_get(models.Shop, "shop_id"))])
 def get_shop(
     shop_id: int,
     db: Session = Depends(get_db)
@@ -1,11 +1,14 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 
 from ...database import get_db
-from ... import crud, schemas
+from ... import crud, models, schemas
+from ...conditional import conditional_get
+from ...pagination import Cursor, cursor_param, set_next_cursor
+from ...serialization import FastJSONRoute
 
-router = APIRouter(prefix="/support", tags=["support"])
+router = APIRouter(prefix="/support", tags=["support"], route_class=FastJSONRoute)
 
 
 @router.post("/requests", response_model=schemas.SupportRequest, status_code=status.HTTP_201_CREATED)
@@ -18,19 +21,22 @@ def create_support_request(
     return crud.create_support_request(db=db, request_in=request, user_id=user_id)
 
 
-@router.get("/requests", response_model=List[schemas.SupportRequest])
+@router.get("/requests", response_model=List[schemas.SupportRequest], dependencies=[Depends(conditional_get(models.SupportRequest))])
 def list_support_requests(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     status: Optional[str] = None,
+    after: Optional[Cursor] = Depends(cursor_param("support_requests")),
     db: Session = Depends(get_db)
 ):
     """Получить список запросов в поддержку"""
-    requests = crud.list_support_requests(db=db, skip=skip, limit=limit, status=status)
+    requests = crud.list_support_requests(db=db, skip=skip, limit=limit, status=status, after=after)
+    set_next_cursor(response.headers, requests, limit, "support_requests", key=lambda request: request.created_at)
     return requests
 
 
-@router.get("/requests/{request_id}", response_model=schemas.SupportRequest)
+@router.get("/requests/{request_id}", response_model=schemas.SupportRequest, dependencies=[Depends(conditional_get(models.SupportRequest, "request_id"))])
 def get_support_request(
     request_id: int,
     db: Session = Depends(get_db)
@@ -6,10 +6,12 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from ...database import get_db
-from ... import crud, schemas
+from ... import crud, models, schemas
 from ...auth import require_access, AuthContext
+from ...conditional import conditional_get
+from ...serialization import FastJSONRoute
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=FastJSONRoute)
 
 
 @router.post("", response_model=schemas.User, status_code=status.HTTP_201_CREATED, summary="Создать пользователя")
@@ -25,12 +27,12 @@ def create_user(user_in: schemas.UserCreate, db: Session = Depends(get_db), ctx:
     return crud.create_user(db, user_in)
 
 
-@router.get("", response_model=List[schemas.User], summary="Список пользователей")
+@router.get("", response_model=List[schemas.User], summary="Список пользователей", dependencies=[Depends(conditional_get(models.User))])
 def list_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return crud.list_users(db, skip=skip, limit=limit)
 
 
-@router.get("/{user_id}", response_model=schemas.User, summary="Получить пользователя по ID")
+@router.get("/{user_id}", response_model=schemas.User, summary="Получить пользователя по ID", dependencies=[Depends(conditional_get(models.User, "user_id"))])
 def get_user(user_id: int, db: Session = Depends(get_db)):
     user = crud.get_user_by_id(db, user_id)
     if not user:
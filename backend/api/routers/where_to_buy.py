@@ -1,11 +1,14 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 
 from ...database import get_db
-from ... import crud, schemas
+from ... import crud, models, schemas
+from ...cache import cached_response
+from ...conditional import conditional_get, list_validator
+from ...serialization import dump_json, FastJSONRoute
 
-router = APIRouter(prefix="/where-to-buy", tags=["where-to-buy"])
+router = APIRouter(prefix="/where-to-buy", tags=["where-to-buy"], route_class=FastJSONRoute)
 
 
 @router.post("/", response_model=schemas.WhereToBuy, status_code=status.HTTP_201_CREATED)
@@ -19,17 +22,20 @@ def create_where_to_buy(
 
 @router.get("/", response_model=List[schemas.WhereToBuy])
 def list_where_to_buy(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     location: str = None,
     db: Session = Depends(get_db)
 ):
     """Получить список точек продаж"""
-    where_to_buy_list = crud.list_where_to_buy(db=db, skip=skip, limit=limit, location=location)
-    return where_to_buy_list
+    def build():
+        where_to_buy_list = crud.list_where_to_buy(db=db, skip=skip, limit=limit, location=location)
+        return dump_json(List[schemas.WhereToBuy], where_to_buy_list), {}
+    return cached_response("where_to_buy", request, build, validator=lambda: list_validator(db, request, models.WhereToBuy))
 
 
-@router.get("/{where_to_buy_id}", response_model=schemas.WhereToBuy)
+@router.get("/{where_to_buy_id}", response_model=schemas.WhereToBuy, dependencies=[Depends(conditional_get(models.WhereToBuy, "where_to_buy_id"))])
 def get_where_to_buy(
     where_to_buy_id: int,
     db: Session = Depends(get_db)
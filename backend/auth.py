@@ -1,8 +1,10 @@
 from fastapi import Header, HTTPException, status, Depends
 from typing import Optional
 
+from .cache import access_level_cache
 from .security import decode_token
-from .database import get_db
+from .database import get_async_db, get_db
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from .models import User
 
@@ -29,16 +31,44 @@ def get_auth_context(authorization: Optional[str] = Header(default=None)) -> Aut
     raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing Bearer token")
 
 
+def _stored_level(user: Optional[User]) -> Optional[int]:
+    if user is not None and isinstance(user.access_level, int):
+        return user.access_level
+    return None
+
+
+def _grant(ctx: AuthContext, level: Optional[int], min_level: int) -> AuthContext:
+    effective_level = ctx.access_level if level is None else level
+    if effective_level < min_level:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient access level")
+    ctx.access_level = effective_level
+    return ctx
+
+
 def require_access(min_level: int):
     def dependency(ctx: AuthContext = Depends(get_auth_context), db: Session = Depends(get_db)) -> AuthContext:
-        # Refresh access level from DB if user_id is present to honor runtime changes
-        effective_level = ctx.access_level
+        # Refresh access level from DB if user_id is present to honor runtime changes;
+        # the short-lived cache is invalidated by crud whenever a level changes
+        level = None
+        if ctx.user_id is not None:
+            level = access_level_cache.get(ctx.user_id)
+            if level is None:
+                level = _stored_level(db.get(User, ctx.user_id))
+                if level is not None:
+                    access_level_cache.set(ctx.user_id, level)
+        return _grant(ctx, level, min_level)
+    return dependency
+
+
+def require_access_async(min_level: int):
+    """require_access for the DB_ASYNC routes: the level is read through get_async_db."""
+    async def dependency(ctx: AuthContext = Depends(get_auth_context), db: AsyncSession = Depends(get_async_db)) -> AuthContext:
+        level = None
         if ctx.user_id is not None:
-            user = db.get(User, ctx.user_id)
-            if user is not None and isinstance(user.access_level, int):
-                effective_level = user.access_level
-        if effective_level < min_level:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient access level")
-        ctx.access_level = effective_level
-        return ctx
+            level = access_level_cache.get(ctx.user_id)
+            if level is None:
+                level = _stored_level(await db.get(User, ctx.user_id))
+                if level is not None:
+                    access_level_cache.set(ctx.user_id, level)
+        return _grant(ctx, level, min_level)
     return dependency
@@ -0,0 +1,11 @@
+"""Load-test and micro-benchmark suite.
+
+    python -m backend.bench seed                  # synthetic catalog in ./bench.sqlite
+    python -m backend.bench run --save baseline   # run every scenario, store the results
+    python -m backend.bench run --compare baseline
+    python -m backend.bench compression           # CPU cost vs bytes saved per encoding
+
+BENCH_DATABASE_URL (or --db) points the suite at a local Postgres instead.
+The app is driven in-process through httpx's ASGI transport, so the numbers
+cover routing, validation, SQL and serialization but no network or server.
+"""
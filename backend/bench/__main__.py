@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+
+
+# The engine is created when backend.database is imported, so the database
+# URL must be in the environment before any other backend module is loaded.
+
+DEFAULT_DATABASE_URL = "sqlite:///bench.sqlite"
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m backend.bench", description="Behoof API load tests and micro-benchmarks")
+    parser.add_argument("--db", default=os.getenv("BENCH_DATABASE_URL", DEFAULT_DATABASE_URL), help="database URL (SQLite file or local Postgres)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed = commands.add_parser("seed", help="fill the database with a synthetic catalog")
+    seed.add_argument("--modules", type=int, default=100_000)
+    seed.add_argument("--colors", type=int, default=40)
+    seed.add_argument("--furniture", type=int, default=10_000)
+    seed.add_argument("--users", type=int, default=1_000)
+    seed.add_argument("--orders", type=int, default=20_000)
+    seed.add_argument("--news", type=int, default=200)
+    seed.add_argument("--seed", type=int, default=1, help="random seed")
+    seed.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+
+    run = commands.add_parser("run", help="run scenarios and micro-benchmarks")
+    run.add_argument("--scenarios", help="comma-separated scenario names (default: all)")
+    run.add_argument("--iterations", type=int, default=200, help="timed requests per scenario")
+    run.add_argument("--concurrency", type=int, default=1, help="requests in flight per scenario")
+    run.add_argument("--warmup", type=int, default=5)
+    run.add_argument("--micro-iterations", type=int, default=100)
+    run.add_argument("--skip-micro", action="store_true")
+    run.add_argument("--read-only", action="store_true", help="skip scenarios that write")
+    run.add_argument("--cache", action="store_true", help="keep the response cache on (off by default: every request reaches the database)")
+    run.add_argument("--seed", type=int, default=1, help="random seed of the request mix")
+    run.add_argument("--accept-encoding", default="identity", help="Accept-Encoding of every request (e.g. gzip, br, zstd)")
+    run.add_argument("--save", metavar="NAME", help="store the report as baselines/NAME.json (or a .json path)")
+    run.add_argument("--compare", metavar="NAME", help="compare with a stored baseline; exit 1 on regressions")
+    run.add_argument("--tolerance", type=float, default=0.15, help="allowed p95 growth / req/s drop (0.15 = 15%%)")
+
+    compress = commands.add_parser("compression", help="CPU cost against bytes saved per encoding and level")
+    compress.add_argument("--iterations", type=int, default=50)
+
+    commands.add_parser("list", help="list scenarios")
+    return parser
+
+
+def _configure(args: argparse.Namespace) -> None:
+    os.environ["DATABASE_URL"] = args.db
+    if args.command == "run" and not args.cache:
+        os.environ.setdefault("RESPONSE_CACHE_TTL", "0")
+    # metrics budget warnings would flood the benchmark output
+    os.environ.setdefault("METRICS_QUERY_BUDGET", "0")
+    os.environ.setdefault("METRICS_LATENCY_BUDGET_MS", "0")
+
+
+def _seed(args: argparse.Namespace) -> int:
+    from ..database import engine, init_db
+    from . import seed
+
+    init_db()
+    if args.reset:
+        seed.reset(engine)
+    elif seed.module_count(engine):
+        print("The database already has modules; use --reset to reseed it.")
+        return 1
+    size = seed.SeedSize(modules=args.modules, colors=args.colors, furniture=args.furniture, users=args.users, orders=args.orders, news=args.news)
+    timings = seed.seed(engine, size, args.seed)
+    for step, seconds in timings.items():
+        print(f"{step:<20}{seconds:8.2f} s")
+    return 0
+
+
+async def _run_http(args: argparse.Namespace, scenarios):
+    import httpx
+
+    from ..database import engine
+    from ..main import app
+    from . import runner
+    from .scenarios import load_data, mount_plain_uploads
+
+    data = load_data(engine)
+    mount_plain_uploads(app)
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Accept-Encoding": args.accept_encoding}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        for scenario in scenarios:
+            result = await runner.run_scenario(client, scenario, data, args.iterations, args.concurrency, args.warmup, args.seed)
+            results.append(result)
+            print(f"  {result.name:<16} p50 {result.p50_ms:8.2f} ms  p95 {result.p95_ms:8.2f} ms  {result.rps:8.1f} req/s")
+    return results
+
+
+def _run(args: argparse.Namespace) -> int:
+    from ..database import engine, init_db
+    from ..security import shutdown_password_pool
+    from . import micro, runner, seed
+    from .scenarios import select_scenarios
+
+    init_db()
+    if not seed.module_count(engine):
+        print("The benchmark database is empty: run `python -m backend.bench seed` first.")
+        return 1
+    scenarios = select_scenarios(args.scenarios.split(",") if args.scenarios else None)
+    if args.read_only:
+        scenarios = [scenario for scenario in scenarios if not scenario.writes]
+    try:
+        http = asyncio.run(_run_http(args, scenarios))
+    finally:
+        shutdown_password_pool()
+    results = {"http": http}
+    runner.print_table(f"HTTP ({engine.dialect.name}, concurrency {args.concurrency})", http)
+    if not args.skip_micro:
+        results["micro"] = micro.run(args.micro_iterations)
+        runner.print_table("micro", results["micro"])
+
+    meta = {
+        "dialect": engine.dialect.name, "modules": seed.module_count(engine), "iterations": args.iterations,
+        "concurrency": args.concurrency, "cache": args.cache, "seed": args.seed, "accept_encoding": args.accept_encoding,
+    }
+    current = runner.report(results, meta)
+    if args.save:
+        print(f"\nbaseline saved to {runner.save_baseline(args.save, current)}")
+    if args.compare:
+        baseline = runner.load_baseline(args.compare)
+        lines = runner.compare(current, baseline, args.tolerance)
+        print(f"\ncompared with {args.compare} ({baseline['meta'].get('git')}, {baseline['meta'].get('created_at')}):")
+        differing = [key for key in ("dialect", "modules", "concurrency", "cache", "accept_encoding") if baseline["meta"].get(key) != meta[key]]
+        if differing:
+            print(f"  warning: the baseline was run with different {', '.join(differing)}")
+        print("\n".join(lines))
+        if any(line.lstrip().startswith("REGRESSION") for line in lines):
+            return 1
+    return 0
+
+
+def _compression(args: argparse.Namespace) -> int:
+    from ..database import engine, init_db
+    from . import compression, seed
+
+    init_db()
+    if not seed.module_count(engine):
+        print("The benchmark database is empty: run `python -m backend.bench seed` first.")
+        return 1
+    compression.print_table(compression.run(args.iterations))
+    return 0
+
+
+def main(argv=None) -> int:
+    args = _parser().parse_args(argv)
+    _configure(args)
+    if args.command == "list":
+        from .scenarios import SCENARIOS
+        for scenario in SCENARIOS:
+            print(f"{scenario.name:<16}{'write' if scenario.writes else 'read ':<7}{scenario.description}")
+        return 0
+    if args.command == "seed":
+        return _seed(args)
+    if args.command == "compression":
+        return _compression(args)
+    return _run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Tuple
+
+from .. import cards, crud, export, schemas
+from ..compression import ENCODINGS, LEVELS, StreamCompressor, compress
+from ..database import SessionLocal
+from ..serialization import dump_json
+from .runner import time_call
+
+
+# CPU cost against bytes saved per encoding and level, on the bodies the API
+# actually sends: one page of each large list response and the start of an
+# NDJSON export. "one-shot" is what the middleware does with a whole body and
+# what the response cache does once per entry and encoding; "stream" is the
+# per-chunk flushing the middleware uses for streamed responses.
+
+LEVELS_TRIED = {"gzip": (1, 6, 9), "br": (1, 4, 6, 9), "zstd": (1, 3, 9, 15)}
+EXPORT_BYTES = 1024 * 1024
+EXPORT_CHUNK = 64 * 1024  # roughly one export batch
+
+
+@dataclass
+class Row:
+    payload: str
+    encoding: str
+    level: int
+    mode: str
+    size: int
+    compressed: int
+    p50_ms: float
+
+    @property
+    def ratio(self) -> float:
+        return self.size / self.compressed if self.compressed else 0.0
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.size / 1e6 / (self.p50_ms / 1000) if self.p50_ms else 0.0
+
+
+def _head(chunks: Iterator[bytes], limit: int) -> bytes:
+    out = bytearray()
+    for chunk in chunks:
+        out += chunk
+        if len(out) >= limit:
+            break
+    return bytes(out[:limit])
+
+
+def payloads() -> Dict[str, bytes]:
+    with SessionLocal() as db:
+        return {
+            "modules": dump_json(List[schemas.Module], crud.list_modules(db, limit=100)),
+            "module_cards": dump_json(List[schemas.CatalogCard], cards.list_cards(db, "module", limit=100)),
+            "orders": dump_json(List[schemas.Order], crud.list_orders(db, limit=100)),
+            "news": dump_json(List[schemas.News], crud.list_news(db, limit=50)),
+            "export_ndjson": _head(export.stream_export("modules", "ndjson"), EXPORT_BYTES),
+        }
+
+
+def _stream(body: bytes, encoding: str, level: int) -> bytes:
+    compressor = StreamCompressor(encoding, level)
+    out = [compressor.chunk(body[i:i + EXPORT_CHUNK]) for i in range(0, len(body), EXPORT_CHUNK)]
+    out.append(compressor.finish())
+    return b"".join(out)
+
+
+def run(iterations: int) -> List[Row]:
+    rows = []
+    for name, body in payloads().items():
+        if not body or body == b"[]":
+            continue
+        for encoding in ENCODINGS:
+            modes: List[Tuple[str, object]] = [("one-shot", compress)]
+            if name.startswith("export"):
+                modes.append(("stream", _stream))
+            for level in LEVELS_TRIED[encoding]:
+                for mode, fn in modes:
+                    compressed = fn(body, encoding, level)
+                    result = time_call(f"{name}_{encoding}{level}", lambda: fn(body, encoding, level), iterations)
+                    rows.append(Row(name, encoding, level, mode, len(body), len(compressed), result.p50_ms))
+    return rows
+
+
+def print_table(rows: List[Row]) -> None:
+    print(f"{'payload':<16}{'encoding':<10}{'level':>6}  {'mode':<10}{'bytes':>10}{'compressed':>12}{'ratio':>8}{'p50 ms':>10}{'MB/s':>9}")
+    for r in rows:
+        mark = "*" if r.level == LEVELS[r.encoding] else " "
+        print(
+            f"{r.payload:<16}{r.encoding:<10}{r.level:>5}{mark}  {r.mode:<10}{r.size:>10}{r.compressed:>12}"
+            f"{r.ratio:>8.1f}{r.p50_ms:>10.3f}{r.mb_per_s:>9.1f}"
+        )
+    print("\n* configured level (COMPRESSION_*_LEVEL / COMPRESSION_BROTLI_QUALITY)")
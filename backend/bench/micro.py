@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Dict, List
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+
+from .. import cards, crud, models, pricing, schemas
+from ..database import SessionLocal
+from ..serialization import fast_dump_json, pydantic_dump_json
+from .runner import Result, time_call
+
+
+# Micro-benchmarks of the hot functions behind the catalog and cart routes,
+# without HTTP: a fresh session per call, as a request would have. The
+# serialize_* entries time one page of already loaded rows through each
+# response path: "fastapi" is what a response_model route does by default
+# (validate, dump to JSON-able python, json.dumps), "pydantic" is dump_json's
+# TypeAdapter path, "fast" is FAST_SERIALIZATION.
+
+PAGE = 100
+
+
+def _in_session(fn: Callable[[Any], Any]) -> Callable[[], Any]:
+    def call():
+        with SessionLocal() as db:
+            return fn(db)
+    return call
+
+
+def _fastapi_dump_json(schema: Any) -> Callable[[Any], bytes]:
+    adapter = TypeAdapter(schema)
+
+    def dump(obj: Any) -> bytes:
+        value = adapter.dump_python(adapter.validate_python(obj, from_attributes=True), mode="json")
+        return json.dumps(value, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+    return dump
+
+
+def _serializers(name: str, schema: Any, rows: Any) -> Dict[str, Callable[[], Any]]:
+    fastapi_dump = _fastapi_dump_json(schema)
+    paths = {
+        f"serialize_{name}_fastapi": lambda: fastapi_dump(rows),
+        f"serialize_{name}_pydantic": lambda: pydantic_dump_json(schema, rows),
+        f"serialize_{name}_fast": lambda: fast_dump_json(schema, rows),
+    }
+    decoded = [json.loads(dump()) for dump in paths.values()]
+    if any(output != decoded[0] for output in decoded):
+        raise AssertionError(f"serialization paths disagree for {name}")
+    return paths
+
+
+def benchmarks() -> Dict[str, Callable[[], Any]]:
+    # rows are fully loaded and detached: serialization alone is timed
+    with SessionLocal() as db:
+        page = list(crud.list_modules(db, limit=PAGE))
+        orders = list(crud.list_orders(db, limit=PAGE))
+        cart_ids = list(db.scalars(select(models.Cart.id).order_by(models.Cart.id).limit(PAGE)))
+        cart_user = db.scalar(select(models.Cart.user_id).order_by(models.Cart.id).limit(1))
+        cart = crud.get_or_create_cart(db, cart_user) if cart_user is not None else None
+        db.expunge_all()
+    return {
+        "list_modules": _in_session(lambda db: crud.list_modules(db, limit=PAGE)),
+        **_serializers("modules", List[schemas.Module], page),
+        **_serializers("orders", List[schemas.Order], orders),
+        **(_serializers("cart", schemas.Cart, cart) if cart is not None else {}),
+        "list_cards": _in_session(lambda db: cards.list_cards(db, "module", limit=PAGE)),
+        "module_facets": _in_session(lambda db: crud.module_facets(db)),
+        "cart_totals": _in_session(lambda db: pricing.cart_totals(db, cart_ids)),
+    }
+
+
+def run(iterations: int, names=None) -> List[Result]:
+    selected = benchmarks()
+    if names:
+        selected = {name: fn for name, fn in selected.items() if name in names}
+    return [time_call(name, fn, iterations) for name, fn in selected.items()]
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import httpx
+
+from .scenarios import BenchData, Scenario
+
+
+# Timing, percentiles and baselines. A baseline is the JSON report of an
+# earlier run; a comparison flags scenarios whose p95 grew or whose
+# throughput dropped by more than the tolerance.
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+
+@dataclass
+class Result:
+    name: str
+    count: int
+    errors: int
+    seconds: float  # wall time of the timed requests
+    rps: float
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending sequence."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(name: str, latencies: List[float], errors: int, wall: float) -> Result:
+    values = sorted(latencies)
+    ms = [value * 1000 for value in values]
+    return Result(
+        name=name,
+        count=len(values),
+        errors=errors,
+        seconds=wall,
+        rps=len(values) / wall if wall > 0 else 0.0,
+        mean_ms=sum(ms) / len(ms) if ms else 0.0,
+        p50_ms=percentile(ms, 50),
+        p95_ms=percentile(ms, 95),
+        p99_ms=percentile(ms, 99),
+        max_ms=ms[-1] if ms else 0.0,
+    )
+
+
+async def _worker(client: httpx.AsyncClient, scenario: Scenario, data: BenchData, rng: random.Random, iterations: int,
+                  latencies: List[float], failures: List[str], timed: List[float]) -> None:
+    for _ in range(iterations):
+        state: Dict[str, Any] = {}
+        if scenario.prepare is not None:
+            await scenario.prepare(client, data, rng, state)
+        spec = scenario.build(data, rng, state)
+        start = time.perf_counter()
+        response = await client.request(spec.method, spec.url, params=spec.params, json=spec.json, headers=spec.headers, content=spec.content)
+        await response.aread()
+        elapsed = time.perf_counter() - start
+        timed.append(elapsed)
+        if response.status_code in scenario.expect:
+            latencies.append(elapsed)
+            if scenario.cleanup is not None:
+                await scenario.cleanup(client, data, response)
+        else:
+            failures.append(f"{spec.method} {spec.url} -> {response.status_code}: {response.text[:200]}")
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, data: BenchData, iterations: int,
+                       concurrency: int = 1, warmup: int = 5, seed_value: int = 1) -> Result:
+    if scenario.max_iterations is not None:
+        iterations = min(iterations, scenario.max_iterations)
+        warmup = min(warmup, 1)
+    if scenario.setup is not None:
+        await scenario.setup(client, data)
+    rng = random.Random(f"{seed_value}:{scenario.name}")
+    await _worker(client, scenario, data, rng, warmup, [], [], [])
+    latencies: List[float] = []
+    failures: List[str] = []
+    timed: List[float] = []
+    per_worker = [iterations // concurrency + (1 if i < iterations % concurrency else 0) for i in range(concurrency)]
+    rngs = [random.Random(f"{seed_value}:{scenario.name}:{i}") for i in range(concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _worker(client, scenario, data, rngs[i], count, latencies, failures, timed) for i, count in enumerate(per_worker) if count
+    ))
+    wall = time.perf_counter() - start
+    if concurrency == 1:
+        wall = sum(timed)  # prepare steps are not part of the throughput
+    for failure in failures[:3]:
+        print(f"  ! {scenario.name}: {failure}")
+    return summarize(scenario.name, latencies, len(failures), wall)
+
+
+def time_call(name: str, fn: Callable[[], Any], iterations: int, warmup: int = 3) -> Result:
+    """Micro-benchmark of a plain function (no HTTP)."""
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return summarize(name, latencies, 0, sum(latencies))
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, cwd=os.path.dirname(__file__))
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def report(results: Dict[str, List[Result]], meta: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "meta": {
+            **meta,
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "git": _git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        **{section: {result.name: asdict(result) for result in items} for section, items in results.items()},
+    }
+
+
+def baseline_path(name: str) -> str:
+    return name if name.endswith(".json") or os.sep in name else os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def save_baseline(name: str, data: Dict[str, Any]) -> str:
+    path = baseline_path(name)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=2, ensure_ascii=False)
+    return path
+
+
+def load_baseline(name: str) -> Dict[str, Any]:
+    with open(baseline_path(name), encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def print_table(title: str, results: Sequence[Result]) -> None:
+    print(f"\n{title}")
+    print(f"{'scenario':<28}{'n':>6}{'err':>5}{'req/s':>10}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}   (ms)")
+    for r in results:
+        print(f"{r.name:<28}{r.count:>6}{r.errors:>5}{r.rps:>10.1f}{r.mean_ms:>10.2f}{r.p50_ms:>10.2f}{r.p95_ms:>10.2f}{r.p99_ms:>10.2f}{r.max_ms:>10.2f}")
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Lines describing each scenario against the baseline; regressions are prefixed with REGRESSION."""
+    lines = []
+    for section in ("http", "micro"):
+        for name, now in current.get(section, {}).items():
+            before = baseline.get(section, {}).get(name)
+            if before is None:
+                lines.append(f"  new         {section}/{name}")
+                continue
+            p95_ratio = now["p95_ms"] / before["p95_ms"] if before["p95_ms"] else 1.0
+            rps_ratio = now["rps"] / before["rps"] if before["rps"] else 1.0
+            regressed = p95_ratio > 1 + tolerance or rps_ratio < 1 / (1 + tolerance) or now["errors"] > before["errors"]
+            tag = "REGRESSION" if regressed else "ok"
+            lines.append(
+                f"  {tag:<11} {section}/{name}: p95 {before['p95_ms']:.2f} -> {now['p95_ms']:.2f} ms ({p95_ratio - 1:+.0%}), "
+                f"req/s {before['rps']:.1f} -> {now['rps']:.1f} ({rps_ratio - 1:+.0%})"
+            )
+    return lines
@@ -0,0 +1,349 @@
+from __future__ import annotations
+
+import json
+import os
+import random
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import httpx
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+
+from .. import models
+from ..database import engine as app_engine
+from ..security import create_access_token
+from ..uploads import UPLOAD_DIR
+from .seed import BENCH_PASSWORD, FURNITURE_TYPES, SEARCH_WORDS
+
+
+# HTTP scenarios: each iteration sends one timed request, after an optional
+# untimed `prepare` step (e.g. putting a line into the cart a removal then
+# deletes). Request parameters are drawn from the seeded data.
+
+CHECKOUT_BODY = {
+    "full_name": "Иван Иванов", "email": "buyer@bench.example", "delivery_address": "ул. Тестовая, 1",
+    "city": "Москва", "street": "Тестовая", "house": "1", "payment_method": "card", "recipient": "Иван Иванов",
+}
+PAGE_SIZE = 24
+
+# Uploads scenarios serve one file through /uploads (UploadsStaticFiles) and
+# through a plain StaticFiles mount of the same directory (mount_plain_uploads)
+PLAIN_UPLOADS_PREFIX = "/bench-plain-uploads"
+UPLOAD_FILE = "bench/photo.jpg"
+UPLOAD_FILE_SIZE = 1024 * 1024
+UPLOAD_RANGE_SIZE = 64 * 1024
+
+# Bulk-create scenarios post the same 10k rows every iteration and delete them
+# again afterwards (untimed), so the table and the payload stay the same
+BULK_CREATE_ROWS = 10_000
+BULK_ARTICLE_PREFIX = "BENCH-BULK-"
+
+
+@dataclass
+class BenchData:
+    """Ids and tokens sampled from the database once per run."""
+    module_ids: Tuple[int, int]  # min, max
+    module_colors: List[Tuple[int, int]]  # (module_id, color_id) pairs that exist
+    color_ids: List[int]
+    user_ids: List[int]
+    admin_token: str
+    tokens: Dict[int, str] = field(default_factory=dict)
+    upload_etags: Dict[str, str] = field(default_factory=dict)  # url -> ETag, filled by _setup_uploads
+
+    def token(self, user_id: int) -> str:
+        if user_id not in self.tokens:
+            self.tokens[user_id] = create_access_token(user_id, 1)
+        return self.tokens[user_id]
+
+    def auth(self, user_id: int) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token(user_id)}"}
+
+    @property
+    def admin(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.admin_token}"}
+
+
+def load_data(engine: Engine, sample: int = 2000) -> BenchData:
+    with engine.connect() as conn:
+        low, high = conn.execute(select(func.min(models.Module.id), func.max(models.Module.id))).one()
+        if low is None:
+            raise RuntimeError("The benchmark database is empty: run `python -m backend.bench seed` first")
+        link = models.module_colors.c
+        pairs = [tuple(row) for row in conn.execute(select(link.module_id, link.color_id).order_by(func.random()).limit(sample))]
+        color_ids = list(conn.scalars(select(models.Color.id).order_by(models.Color.id)))
+        user_ids = list(conn.scalars(select(models.User.id).where(models.User.access_level == 1).order_by(models.User.id)))
+        admin_id = conn.scalar(select(models.User.id).where(models.User.access_level >= 3).order_by(models.User.id).limit(1))
+    pairs.sort()  # ORDER BY random() differs per run; the seeded rng then picks the same ones
+    return BenchData((low, high), pairs, color_ids, user_ids, create_access_token(admin_id or 1, 3))
+
+
+class RequestSpec(NamedTuple):
+    method: str
+    url: str
+    params: Optional[Dict[str, Any]] = None
+    json: Any = None
+    headers: Optional[Dict[str, str]] = None
+    content: Optional[bytes] = None  # pre-encoded body (NDJSON, large JSON)
+
+
+Prepare = Callable[[httpx.AsyncClient, BenchData, random.Random, Dict[str, Any]], Awaitable[None]]
+Setup = Callable[[httpx.AsyncClient, BenchData], Awaitable[None]]
+Cleanup = Callable[[httpx.AsyncClient, BenchData, httpx.Response], Awaitable[None]]
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    description: str
+    build: Callable[[BenchData, random.Random, Dict[str, Any]], RequestSpec]
+    prepare: Optional[Prepare] = None
+    setup: Optional[Setup] = None  # untimed, once before the warmup
+    cleanup: Optional[Cleanup] = None  # untimed, after each successful request
+    expect: Tuple[int, ...] = (200,)
+    max_iterations: Optional[int] = None  # caps slow scenarios (login, exports)
+    writes: bool = False
+
+
+def _module_id(data: BenchData, rng: random.Random) -> int:
+    return rng.randint(*data.module_ids)
+
+
+def _pair(data: BenchData, rng: random.Random) -> Tuple[int, int]:
+    return rng.choice(data.module_colors)
+
+
+async def _checked(client: httpx.AsyncClient, spec: RequestSpec) -> httpx.Response:
+    response = await client.request(spec.method, spec.url, params=spec.params, json=spec.json, headers=spec.headers, content=spec.content)
+    if response.status_code >= 400:
+        raise RuntimeError(f"prepare step {spec.method} {spec.url} -> {response.status_code}: {response.text[:200]}")
+    return response
+
+
+def _add_line(data: BenchData, user_id: int, module_id: int, color_id: int) -> RequestSpec:
+    return RequestSpec("POST", f"/api/users/{user_id}/cart/modules/{module_id}", params={"color_id": color_id}, headers=data.auth(user_id))
+
+
+async def _prepare_cart_line(client: httpx.AsyncClient, data: BenchData, rng: random.Random, state: Dict[str, Any]) -> None:
+    state["user_id"] = rng.choice(data.user_ids)
+    state["module_id"], state["color_id"] = _pair(data, rng)
+    await _checked(client, _add_line(data, state["user_id"], state["module_id"], state["color_id"]))
+
+
+async def _prepare_checkout(client: httpx.AsyncClient, data: BenchData, rng: random.Random, state: Dict[str, Any]) -> None:
+    state["user_id"] = rng.choice(data.user_ids)
+    for _ in range(2):
+        module_id, color_id = _pair(data, rng)
+        await _checked(client, _add_line(data, state["user_id"], module_id, color_id))
+
+
+def _browse(data: BenchData, rng: random.Random, state: Dict[str, Any]) -> RequestSpec:
+    params: Dict[str, Any] = {"skip": rng.randrange(0, 50) * PAGE_SIZE, "limit": PAGE_SIZE}
+    if rng.random() < 0.5:
+        low = rng.randrange(1_000, 100_000, 1_000)
+        params.update(price_min=low, price_max=low + rng.choice((5_000, 20_000, 50_000)))
+    if rng.random() < 0.3:
+        params["color_ids"] = rng.sample(data.color_ids, min(2, len(data.color_ids)))
+    return RequestSpec("GET", "/api/modules/", params=params)
+
+
+def _cards(data: BenchData, rng: random.Random, state: Dict[str, Any]) -> RequestSpec:
+    return RequestSpec("GET", "/api/modules/cards", params={"skip": rng.randrange(0, 200) * PAGE_SIZE, "limit": PAGE_SIZE})
+
+
+def _furniture(data: BenchData, rng: random.Random, state: Dict[str, Any]) -> RequestSpec:
+    return RequestSpec("GET", "/api/furniture/", params={"furniture_type": rng.choice(FURNITURE_TYPES), "limit": PAGE_SIZE, "skip": rng.randrange(0, 20) * PAGE_SIZE})
+
+
+def _detail(data: BenchData, rng: random.Random, state: Dict[str, Any]) -> RequestSpec:
+    return RequestSpec("GET", f"/api/modules/{_module_id(data, rng)}")
+
+
+def _facets(data: BenchData, rng: random.Random, state: Dict[str, Any]) -> RequestSpec:
+    low = rng.randrange(1_000, 100_000, 1_000)
+    return RequestSpec("GET", "/api/modules/facets", params={"price_min": low, "price_max": low + 20_000})
+
+
+def _search(data: BenchData, rng: random.Random, state: Dict[str, Any]) -> RequestSpec:
+    words = rng.sample(SEARCH_WORDS, rng.choice((1, 1, 2)))
+    return RequestSpec("GET", "/api/search/", params={"q": " ".join(words), "limit": 20})
+
+
+def _cart_get(data: BenchData, rng: random.Random, state: Dict[str, Any]) -> RequestSpec:
+    return RequestSpec("GET", f"/api/users/{rng.choice(data.user_ids)}/cart")
+
+
+def _cart_add(data: BenchData, rng: random.Random, state: Dict[str, Any]) -> RequestSpec:
+    module_id, color_id = _pair(data, rng)
+    return _add_line(data, rng.choice(data.user_ids), module_id, color_id)
+
+
+def _cart_remove(data: BenchData, rng: random.Random, state: Dict[str, Any]) -> RequestSpec:
+    user_id = state["user_id"]
+    return RequestSpec("DELETE", f"/api/users/{user_id}/cart/modules/{state['module_id']}", params={"color_id": state["color_id"]}, headers=data.auth(user_id))
+
+
+def _checkout(data: BenchData, rng: random.Random, state: Dict[str, Any]) -> RequestSpec:
+    user_id = state["user_id"]
+    return RequestSpec("POST", f"/api/users/{user_id}/cart/checkout", json=CHECKOUT_BODY, headers=data.auth(user_id))
+
+
+def _order_create(data: BenchData, rng: random.Random, state: Dict[str, Any]) -> RequestSpec:
+    user_id = rng.choice(data.user_ids)
+    module_ids = sorted({_module_id(data, rng) for _ in range(rng.randint(1, 10))})
+    return RequestSpec("POST", "/api/orders", json={**CHECKOUT_BODY, "user_id": user_id, "module_ids": module_ids}, headers=data.auth(user_id))
+
+
+def _order_of(size: int) -> Callable[[BenchData, random.Random, Dict[str, Any]], RequestSpec]:
+    """Order of exactly `size` distinct modules, so its cost can be compared across sizes."""
+    def build(data: BenchData, rng: random.Random, state: Dict[str, Any]) -> RequestSpec:
+        user_id = rng.choice(data.user_ids)
+        low, high = data.module_ids
+        module_ids = sorted(rng.sample(range(low, high + 1), min(size, high - low + 1)))
+        return RequestSpec("POST", "/api/orders", json={**CHECKOUT_BODY, "user_id": user_id, "module_ids": module_ids}, headers=data.auth(user_id))
+    return build
+
+
+def _orders_list(data: BenchData, rng: random.Random, state: Dict[str, Any]) -> RequestSpec:
+    return RequestSpec("GET", "/api/orders", params={"user_id": rng.choice(data.user_ids), "limit": 20})
+
+
+def _login(data: BenchData, rng: random.Random, state: Dict[str, Any]) -> RequestSpec:
+    user_id = rng.choice(data.user_ids)
+    return RequestSpec("POST", "/api/auth/login", params={"login": f"user{user_id}@bench.example", "password": BENCH_PASSWORD})
+
+
+def _bulk_prices(data: BenchData, rng: random.Random, state: Dict[str, Any]) -> RequestSpec:
+    start = _module_id(data, rng)
+    rows = [{"id": module_id, "price": float(rng.randrange(1_000, 150_000, 100))} for module_id in range(start, min(start + 100, data.module_ids[1] + 1))]
+    return RequestSpec("PATCH", "/api/modules/bulk", json=rows, headers=data.admin)
+
+
+async def _setup_uploads(client: httpx.AsyncClient, data: BenchData) -> None:
+    path = os.path.join(UPLOAD_DIR, UPLOAD_FILE)
+    if not os.path.exists(path) or os.path.getsize(path) != UPLOAD_FILE_SIZE:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as out:
+            out.write(random.Random(0).randbytes(UPLOAD_FILE_SIZE))
+    for prefix in ("/uploads", PLAIN_UPLOADS_PREFIX):
+        url = f"{prefix}/{UPLOAD_FILE}"
+        data.upload_etags[url] = (await _checked(client, RequestSpec("GET", url))).headers["etag"]
+
+
+def _upload_get(prefix: str) -> Callable[[BenchData, random.Random, Dict[str, Any]], RequestSpec]:
+    return lambda data, rng, state: RequestSpec("GET", f"{prefix}/{UPLOAD_FILE}")
+
+
+def _upload_revalidate(prefix: str) -> Callable[[BenchData, random.Random, Dict[str, Any]], RequestSpec]:
+    def build(data: BenchData, rng: random.Random, state: Dict[str, Any]) -> RequestSpec:
+        url = f"{prefix}/{UPLOAD_FILE}"
+        return RequestSpec("GET", url, headers={"If-None-Match": data.upload_etags[url]})
+    return build
+
+
+def _upload_range(prefix: str) -> Callable[[BenchData, random.Random, Dict[str, Any]], RequestSpec]:
+    def build(data: BenchData, rng: random.Random, state: Dict[str, Any]) -> RequestSpec:
+        start = rng.randrange(0, UPLOAD_FILE_SIZE - UPLOAD_RANGE_SIZE)
+        return RequestSpec("GET", f"{prefix}/{UPLOAD_FILE}", headers={"Range": f"bytes={start}-{start + UPLOAD_RANGE_SIZE - 1}"})
+    return build
+
+
+_bulk_bodies: Dict[str, bytes] = {}
+
+
+def _bulk_body(data: BenchData, fmt: str) -> bytes:
+    if fmt not in _bulk_bodies:
+        rng = random.Random(0)
+        rows = [
+            {
+                "name": f"Пакетный модуль {i}", "article": f"{BULK_ARTICLE_PREFIX}{i:06d}",
+                "price": float(rng.randrange(1_000, 150_000, 100)),
+                "color_ids": rng.sample(data.color_ids, min(rng.randint(1, 3), len(data.color_ids))),
+            }
+            for i in range(BULK_CREATE_ROWS)
+        ]
+        if fmt == "ndjson":
+            _bulk_bodies[fmt] = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode()
+        else:
+            _bulk_bodies[fmt] = json.dumps(rows, ensure_ascii=False).encode()
+    return _bulk_bodies[fmt]
+
+
+def _bulk_create(fmt: str) -> Callable[[BenchData, random.Random, Dict[str, Any]], RequestSpec]:
+    content_type = "application/x-ndjson" if fmt == "ndjson" else "application/json"
+
+    def build(data: BenchData, rng: random.Random, state: Dict[str, Any]) -> RequestSpec:
+        headers = {**data.admin, "Content-Type": content_type}
+        return RequestSpec("POST", "/api/modules/bulk", params={"atomic": "true"}, headers=headers, content=_bulk_body(data, fmt))
+    return build
+
+
+async def _delete_modules(client: httpx.AsyncClient, data: BenchData, ids: List[int]) -> None:
+    if ids:
+        await _checked(client, RequestSpec("DELETE", "/api/modules/bulk", json=ids, headers=data.admin))
+
+
+async def _setup_bulk_create(client: httpx.AsyncClient, data: BenchData) -> None:
+    """Drop rows left behind by an interrupted run: their articles would fail the atomic batch."""
+    with app_engine.connect() as conn:
+        ids = list(conn.scalars(select(models.Module.id).where(models.Module.article.startswith(BULK_ARTICLE_PREFIX))))
+    await _delete_modules(client, data, ids)
+
+
+async def _cleanup_bulk_create(client: httpx.AsyncClient, data: BenchData, response: httpx.Response) -> None:
+    await _delete_modules(client, data, response.json()["ids"])
+
+
+def _export(data: BenchData, rng: random.Random, state: Dict[str, Any]) -> RequestSpec:
+    return RequestSpec("GET", "/api/export/modules", params={"format": "ndjson"}, headers=data.admin)
+
+
+SCENARIOS: Sequence[Scenario] = (
+    Scenario("browse", "Страница списка модулей с фильтрами по цене и цветам", _browse),
+    Scenario("cards", "Страница карточек модулей (read model)", _cards),
+    Scenario("furniture", "Список мебели по типу", _furniture),
+    Scenario("module_detail", "Карточка модуля по id", _detail),
+    Scenario("facets", "Фасеты по цветам и ценам", _facets),
+    Scenario("search", "Полнотекстовый поиск по каталогу", _search),
+    Scenario("cart_get", "Корзина пользователя", _cart_get),
+    Scenario("cart_add", "Добавление модуля в корзину", _cart_add, writes=True),
+    Scenario("cart_remove", "Удаление модуля из корзины", _cart_remove, prepare=_prepare_cart_line, writes=True),
+    Scenario("checkout", "Оформление заказа из корзины", _checkout, prepare=_prepare_checkout, expect=(201,), writes=True),
+    Scenario("order_create", "Создание заказа по списку модулей", _order_create, expect=(201,), writes=True),
+    Scenario("order_create_1", "Создание заказа из 1 модуля", _order_of(1), expect=(201,), writes=True),
+    Scenario("order_create_10", "Создание заказа из 10 модулей", _order_of(10), expect=(201,), writes=True),
+    Scenario("order_create_100", "Создание заказа из 100 модулей", _order_of(100), expect=(201,), writes=True),
+    Scenario("orders_list", "Заказы пользователя", _orders_list),
+    Scenario("login", "Логин (bcrypt в пуле процессов)", _login, max_iterations=50),
+    Scenario("bulk_update", "Массовое обновление цен 100 модулей", _bulk_prices, max_iterations=20, writes=True),
+    Scenario("bulk_create_json", "Массовое создание 10 000 модулей, JSON-массив", _bulk_create("json"),
+             setup=_setup_bulk_create, cleanup=_cleanup_bulk_create, max_iterations=10, writes=True),
+    Scenario("bulk_create_ndjson", "Массовое создание 10 000 модулей, NDJSON", _bulk_create("ndjson"),
+             setup=_setup_bulk_create, cleanup=_cleanup_bulk_create, max_iterations=10, writes=True),
+    Scenario("export", "Потоковая выгрузка всех модулей в NDJSON", _export, max_iterations=3),
+    Scenario("uploads_get", "Файл 1 МБ из /uploads", _upload_get("/uploads"), setup=_setup_uploads),
+    Scenario("uploads_get_plain", "Тот же файл через обычный StaticFiles", _upload_get(PLAIN_UPLOADS_PREFIX), setup=_setup_uploads),
+    Scenario("uploads_304", "Повторная проверка файла из /uploads по ETag", _upload_revalidate("/uploads"), setup=_setup_uploads, expect=(304,)),
+    Scenario("uploads_304_plain", "Проверка по ETag через обычный StaticFiles", _upload_revalidate(PLAIN_UPLOADS_PREFIX), setup=_setup_uploads, expect=(304,)),
+    Scenario("uploads_range", "Диапазон 64 КБ файла из /uploads", _upload_range("/uploads"), setup=_setup_uploads, expect=(206,)),
+    # StaticFiles of this Starlette version ignores Range and sends the whole file
+    Scenario("uploads_range_plain", "Диапазон 64 КБ через обычный StaticFiles", _upload_range(PLAIN_UPLOADS_PREFIX), setup=_setup_uploads, expect=(200, 206)),
+)
+
+
+def mount_plain_uploads(app) -> None:
+    """Plain StaticFiles over the upload directory, the baseline of the uploads_* scenarios."""
+    from starlette.staticfiles import StaticFiles
+
+    if not any(getattr(route, "path", None) == PLAIN_UPLOADS_PREFIX for route in app.routes):
+        app.mount(PLAIN_UPLOADS_PREFIX, StaticFiles(directory=UPLOAD_DIR, check_dir=False))
+
+
+def select_scenarios(names: Optional[Sequence[str]]) -> List[Scenario]:
+    if not names:
+        return list(SCENARIOS)
+    by_name = {scenario.name: scenario for scenario in SCENARIOS}
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(unknown)} (known: {', '.join(by_name)})")
+    return [by_name[name] for name in names]
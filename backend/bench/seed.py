@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, List
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .. import cards, models, pricing
+from ..database import Base, init_db
+from ..security import hash_password
+
+
+# Synthetic catalog: deterministic for a given seed, written with Core
+# executemany batches (the ORM would spend minutes on 100k modules).
+
+BENCH_PASSWORD = "bench-password"
+INSERT_BATCH_SIZE = 5000
+
+ITEM_KINDS = ("Шкаф", "Тумба", "Полка", "Стол", "Комод", "Пенал", "Стеллаж", "Фасад", "Ящик", "Витрина")
+ITEM_STYLES = ("угловой", "навесной", "напольный", "распашной", "купе", "прямой", "узкий", "высокий", "низкий", "модульный")
+MATERIALS = ("дуб", "ясень", "венге", "орех", "бук", "сосна", "МДФ", "ЛДСП", "стекло", "металл")
+FURNITURE_TYPES = ("Кухня", "Гостиная", "Спальня", "Прихожая", "Детская", "Офис")
+COLOR_NAMES = ("Белый", "Черный", "Серый", "Бежевый", "Графит", "Дуб сонома", "Венге", "Орех", "Слоновая кость", "Мокко")
+
+# Words the search scenario queries: all of them occur in generated names
+SEARCH_WORDS = tuple(word.lower() for word in ITEM_KINDS + MATERIALS)
+
+
+@dataclass(frozen=True)
+class SeedSize:
+    modules: int = 100_000
+    colors: int = 40
+    furniture: int = 10_000
+    users: int = 1_000  # one active cart each
+    cart_lines: int = 3
+    orders: int = 20_000
+    modules_per_order: int = 3
+    news: int = 200
+
+
+def _batches(rows: Iterator[dict], size: int = INSERT_BATCH_SIZE) -> Iterator[List[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(conn, table, rows: Iterator[dict]) -> None:
+    for batch in _batches(rows):
+        conn.execute(insert(table), batch)
+
+
+def _price(rng: random.Random) -> float:
+    return float(rng.randrange(1_000, 150_000, 100))
+
+
+def _discount(rng: random.Random, price: float):
+    return round(price * rng.uniform(0.7, 0.95), -1) if rng.random() < 0.3 else None
+
+
+def _name(rng: random.Random, i: int) -> str:
+    return f"{rng.choice(ITEM_KINDS)} {rng.choice(ITEM_STYLES)} {rng.choice(MATERIALS)} {i}"
+
+
+def _paragraph(rng: random.Random, sentences: int) -> str:
+    return " ".join(
+        f"{rng.choice(ITEM_KINDS)} {rng.choice(ITEM_STYLES)} из материала {rng.choice(MATERIALS)} подходит для {rng.choice(FURNITURE_TYPES).lower()}."
+        for _ in range(sentences)
+    )
+
+
+def _color_sets(rng: random.Random, owners: int, colors: int) -> Dict[int, List[int]]:
+    return {owner: rng.sample(range(1, colors + 1), rng.randint(1, min(4, colors))) for owner in range(1, owners + 1)}
+
+
+def module_count(engine: Engine) -> int:
+    with engine.connect() as conn:
+        return conn.scalar(select(func.count()).select_from(models.Module)) or 0
+
+
+def reset(engine: Engine) -> None:
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+
+
+def seed(engine: Engine, size: SeedSize = SeedSize(), seed_value: int = 1) -> Dict[str, float]:
+    """Fill an empty database; returns seconds per step."""
+    rng = random.Random(seed_value)
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+
+    def step(name: str) -> None:
+        nonlocal started
+        now = time.perf_counter()
+        timings[name] = now - started
+        started = now
+
+    hashed = hash_password(BENCH_PASSWORD)  # one bcrypt run shared by every user
+    color_prices = {i: float(rng.choice((0, 0, 0, 500, 1000, 2500))) for i in range(1, size.colors + 1)}
+    module_prices: Dict[int, float] = {}
+    module_colors = _color_sets(rng, size.modules, size.colors)
+
+    with engine.begin() as conn:
+        _insert(conn, models.User.__table__, (
+            {
+                "id": i, "full_name": f"Пользователь {i}", "login": f"user{i}", "email": f"user{i}@bench.example",
+                "phone_number": f"+7900{i:07d}", "hashed_password": hashed, "access_level": 3 if i == 1 else 1,
+            }
+            for i in range(1, size.users + 1)
+        ))
+        _insert(conn, models.Color.__table__, (
+            {"id": i, "name": f"{COLOR_NAMES[(i - 1) % len(COLOR_NAMES)]} {i}", "hex_code": f"#{rng.randrange(0x1000000):06x}", "additional_price": price}
+            for i, price in color_prices.items()
+        ))
+        step("users_colors")
+
+        def module_rows():
+            for i in range(1, size.modules + 1):
+                price = _price(rng)
+                discounted = _discount(rng, price)
+                module_prices[i] = discounted if discounted is not None else price
+                yield {
+                    "id": i, "name": _name(rng, i), "article": f"M-{i:06d}", "price": price, "discounted_price": discounted,
+                    "technical_details": f"Материал: {rng.choice(MATERIALS)}. Ширина {rng.randrange(300, 1200, 50)} мм.",
+                    "photos": [],
+                }
+        _insert(conn, models.Module.__table__, module_rows())
+        _insert(conn, models.module_colors, (
+            {"module_id": module_id, "color_id": color_id}
+            for module_id, color_ids in module_colors.items() for color_id in color_ids
+        ))
+        step("modules")
+
+        _insert(conn, models.Furniture.__table__, (
+            {
+                "id": i, "furniture_type": rng.choice(FURNITURE_TYPES), "name": _name(rng, i), "price": _price(rng) * 5,
+                "discounted_price": None, "photos": [], "model": f"Серия {rng.randint(1, 50)}", "article": f"F-{i:06d}",
+            }
+            for i in range(1, size.furniture + 1)
+        ))
+        _insert(conn, models.furniture_colors, (
+            {"furniture_id": owner, "color_id": color_id}
+            for owner, color_ids in _color_sets(rng, size.furniture, size.colors).items() for color_id in color_ids
+        ))
+        step("furniture")
+
+        _insert(conn, models.Cart.__table__, ({"id": i, "user_id": i, "status": "active", "total_amount": 0} for i in range(1, size.users + 1)))
+
+        def cart_item_rows():
+            for cart_id in range(1, size.users + 1):
+                for module_id in rng.sample(range(1, size.modules + 1), min(size.cart_lines, size.modules)):
+                    color_id = rng.choice(module_colors[module_id])
+                    yield {
+                        "cart_id": cart_id, "module_id": module_id, "color_id": color_id, "quantity": rng.randint(1, 3),
+                        "unit_price": module_prices[module_id] + color_prices[color_id],
+                    }
+        _insert(conn, models.CartItem.__table__, cart_item_rows())
+        step("carts")
+
+        order_lines: List[dict] = []
+        order_items: List[dict] = []
+
+        def order_rows():
+            for i in range(1, size.orders + 1):
+                module_ids = rng.sample(range(1, size.modules + 1), min(size.modules_per_order, size.modules))
+                order_lines.extend({"order_id": i, "module_id": module_id} for module_id in module_ids)
+                order_items.extend(
+                    {"order_id": i, "module_id": module_id, "color_id": None, "quantity": 1, "unit_price": module_prices[module_id]}
+                    for module_id in module_ids
+                )
+                yield {
+                    "id": i, "user_id": rng.randint(1, size.users), "full_name": "Иван Иванов", "email": "buyer@bench.example",
+                    "delivery_address": "ул. Тестовая, 1", "city": "Москва", "street": "Тестовая", "house": "1",
+                    "payment_method": rng.choice(("card", "cash")), "recipient": "Иван Иванов",
+                    "total_amount": sum(module_prices[module_id] for module_id in module_ids), "status": "pending",
+                }
+        _insert(conn, models.Order.__table__, order_rows())
+        _insert(conn, models.order_modules, iter(order_lines))
+        _insert(conn, models.OrderItem.__table__, iter(order_items))
+        step("orders")
+
+        # news texts are long (a few KB each), like the real feed
+        _insert(conn, models.News.__table__, (
+            {"id": i, "title": f"Новость {i}", "text1": _paragraph(rng, 40), "text2": _paragraph(rng, 40), "photos": []}
+            for i in range(1, size.news + 1)
+        ))
+        step("news")
+
+        if conn.dialect.name == "postgresql":
+            # explicit ids do not advance the serial sequences
+            for table in ("users", "colors", "modules", "furniture", "carts", "cart_items", "orders", "news"):
+                conn.exec_driver_sql(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {table}), 1))")
+
+    with Session(engine) as db:
+        pricing.reprice_carts(db)
+        cards.rebuild_cards(db)
+        db.commit()
+    step("cart_totals_cards")
+    return timings
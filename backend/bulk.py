@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Type
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import cache, cards, models, pricing, schemas
+
+
+# Largest batch one request may carry
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "50000"))
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+class BulkSpec(NamedTuple):
+    """How one catalog entity is written in bulk."""
+    model: Any
+    create_schema: Type[BaseModel]
+    update_schema: Type[BaseModel]
+    namespaces: Tuple[str, ...]  # response-cache namespaces to invalidate
+    color_link: Any = None  # association table to colors, if the entity has colors
+    unique: Optional[str] = None  # column that must stay unique (article)
+    dependents: Tuple[Any, ...] = ()  # (table column referencing the row) cleared on delete
+    priced_by: Tuple[str, ...] = ()  # columns whose change reprices the carts holding the row
+    cart_key: Optional[str] = None  # pricing.affected_carts() argument selecting those carts
+    card_owners: Optional[Callable[[Session, Sequence[int]], cards.CardOwners]] = None  # catalog cards showing the rows
+    embedded: bool = False  # rows are shown inside their card owners: bump the owners' updated_at
+
+
+MODULES = BulkSpec(
+    models.Module, schemas.ModuleCreate, schemas.ModuleUpdate, ("modules",),
+    color_link=models.module_colors, unique="article",
+    dependents=(models.module_colors.c.module_id, models.CartItem.__table__.c.module_id, models.order_modules.c.module_id),
+    priced_by=("price", "discounted_price"), cart_key="module_ids", card_owners=cards.own_cards("module"),
+)
+FURNITURE = BulkSpec(
+    models.Furniture, schemas.FurnitureCreate, schemas.FurnitureUpdate, ("furniture",),
+    color_link=models.furniture_colors, unique="article",
+    dependents=(models.furniture_colors.c.furniture_id,), card_owners=cards.own_cards("furniture"),
+)
+COLORS = BulkSpec(
+    models.Color, schemas.ColorCreate, schemas.ColorUpdate, ("colors", "modules", "furniture"),
+    dependents=(models.module_colors.c.color_id, models.furniture_colors.c.color_id, models.CartItem.__table__.c.color_id),
+    priced_by=("additional_price",), cart_key="color_ids", card_owners=cards.color_owners, embedded=True,
+)
+
+
+class _Unparsable(NamedTuple):
+    message: str
+
+
+async def bulk_rows(request: Request) -> List[Any]:
+    """Dependency reading a JSON array or NDJSON (one object per line) body."""
+    body = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_TYPES:
+        rows = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError as exc:
+                rows.append(_Unparsable(f"Некорректный JSON: {exc}"))
+    else:
+        try:
+            rows = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Ожидается JSON-массив или NDJSON")
+        if isinstance(rows, dict) and isinstance(rows.get("items"), list):
+            rows = rows["items"]
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Ожидается JSON-массив или NDJSON")
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Не более {BULK_MAX_ROWS} строк за запрос")
+    return rows
+
+
+def _validation_messages(exc: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}" for error in exc.errors()]
+
+
+def _row_error(index: int, messages: Sequence[str], row_id: Optional[int] = None) -> Dict[str, Any]:
+    return {"index": index, "id": row_id, "errors": list(messages)}
+
+
+def _parse(rows: Sequence[Any], schema: Type[BaseModel], errors: List[dict], require_id: bool = False):
+    """Validate every row in one pass; returns [(index, id, values)] for the valid ones."""
+    parsed = []
+    for index, row in enumerate(rows):
+        if isinstance(row, _Unparsable):
+            errors.append(_row_error(index, [row.message]))
+            continue
+        if not isinstance(row, dict):
+            errors.append(_row_error(index, ["row: ожидается объект"]))
+            continue
+        row_id = row.get("id") if require_id else None
+        if require_id and (not isinstance(row_id, int) or isinstance(row_id, bool)):
+            errors.append(_row_error(index, ["id: обязательное целое поле"]))
+            continue
+        try:
+            item = schema.model_validate({key: value for key, value in row.items() if key != "id"})
+        except ValidationError as exc:
+            errors.append(_row_error(index, _validation_messages(exc), row_id))
+            continue
+        parsed.append((index, row_id, item.model_dump(exclude_unset=require_id)))
+    return parsed
+
+
+def _check_colors(db: Session, parsed, errors: List[dict]):
+    """Resolve every referenced color id with one query and reject rows naming unknown ones."""
+    wanted = {color_id for _, _, values in parsed for color_id in (values.get("color_ids") or ())}
+    known = set(db.scalars(select(models.Color.id).where(models.Color.id.in_(wanted)))) if wanted else set()
+    valid = []
+    for index, row_id, values in parsed:
+        missing = sorted(set(values.get("color_ids") or ()) - known)
+        if missing:
+            errors.append(_row_error(index, [f"color_ids: цвета не найдены: {missing}"], row_id))
+        else:
+            valid.append((index, row_id, values))
+    return valid
+
+
+def _check_unique(db: Session, spec: BulkSpec, parsed, errors: List[dict]):
+    """Reject rows whose unique value repeats within the batch or belongs to another row in the table."""
+    if spec.unique is None:
+        return parsed
+    column = getattr(spec.model, spec.unique)
+    values = {values[spec.unique] for _, _, values in parsed if values.get(spec.unique) is not None}
+    taken = dict(db.execute(select(column, spec.model.id).where(column.in_(values))).all()) if values else {}
+    seen = set()
+    valid = []
+    for index, row_id, row in parsed:
+        value = row.get(spec.unique)
+        if value is not None and (value in seen or taken.get(value, row_id) != row_id):
+            errors.append(_row_error(index, [f"{spec.unique}: значение {value!r} уже используется"], row_id))
+            continue
+        if value is not None:
+            seen.add(value)
+        valid.append((index, row_id, row))
+    return valid
+
+
+def _link_colors(db: Session, spec: BulkSpec, links: List[Tuple[int, Sequence[int]]]) -> None:
+    owner_column, color_column = (column.name for column in spec.color_link.c)
+    params = [{owner_column: owner_id, color_column: color_id} for owner_id, color_ids in links for color_id in dict.fromkeys(color_ids)]
+    if params:
+        db.execute(insert(spec.color_link), params)
+
+
+def _card_owners(db: Session, spec: BulkSpec, ids: Sequence[int]) -> cards.CardOwners:
+    return spec.card_owners(db, ids) if spec.card_owners is not None and ids else {}
+
+
+def _refresh_cards(db: Session, spec: BulkSpec, owners: cards.CardOwners) -> None:
+    if spec.embedded:
+        cards.touch_owners(db, owners)
+    cards.refresh_owners(db, owners)
+
+
+def _commit(db: Session, spec: BulkSpec, errors: List[dict], atomic: bool, write: Callable[[], List[int]]) -> Dict[str, Any]:
+    """Run the writes and commit once; nothing is written when `atomic` and any row failed."""
+    ids: List[int] = []
+    if not (errors and atomic):
+        try:
+            ids = write()
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Пакет нарушает ограничения целостности и не был записан")
+        if ids:
+            cache.invalidate(*spec.namespaces)
+    return {"ids": ids, "errors": sorted(errors, key=lambda error: error["index"])}
+
+
+def bulk_create(db: Session, spec: BulkSpec, rows: Sequence[Any], atomic: bool = False) -> Dict[str, Any]:
+    """Insert all valid rows with one multi-row INSERT ... RETURNING and commit once."""
+    errors: List[dict] = []
+    parsed = _parse(rows, spec.create_schema, errors)
+    if spec.color_link is not None:
+        parsed = _check_colors(db, parsed, errors)
+    parsed = _check_unique(db, spec, parsed, errors)
+
+    def write() -> List[int]:
+        if not parsed:
+            return []
+        values = [{key: value for key, value in row.items() if key != "color_ids"} for _, _, row in parsed]
+        ids = list(db.scalars(insert(spec.model).returning(spec.model.id, sort_by_parameter_order=True), values))
+        if spec.color_link is not None:
+            _link_colors(db, spec, [(row_id, row.get("color_ids") or ()) for row_id, (_, _, row) in zip(ids, parsed)])
+        _refresh_cards(db, spec, _card_owners(db, spec, ids))
+        return ids
+
+    return _commit(db, spec, errors, atomic, write)
+
+
+def bulk_update(db: Session, spec: BulkSpec, rows: Sequence[Any], atomic: bool = False) -> Dict[str, Any]:
+    """Apply partial updates (each row carries its `id`) as executemany UPDATEs and commit once."""
+    errors: List[dict] = []
+    parsed = _parse(rows, spec.update_schema, errors, require_id=True)
+    requested = {row_id for _, row_id, _ in parsed}
+    existing = set(db.scalars(select(spec.model.id).where(spec.model.id.in_(requested)))) if requested else set()
+    found = []
+    for index, row_id, values in parsed:
+        if row_id in existing:
+            found.append((index, row_id, values))
+        else:
+            errors.append(_row_error(index, ["id: запись не найдена"], row_id))
+    parsed = found
+    if spec.color_link is not None:
+        parsed = _check_colors(db, parsed, errors)
+    parsed = _check_unique(db, spec, parsed, errors)
+    repriced = [row_id for _, row_id, values in parsed if values.keys() & set(spec.priced_by)]
+
+    def write() -> List[int]:
+        # rows setting the same columns go together, so each group is one executemany
+        groups: Dict[Tuple[str, ...], List[dict]] = {}
+        relinks = []
+        colors_only = []
+        for _, row_id, values in parsed:
+            color_ids = values.pop("color_ids", None)
+            if color_ids is not None:
+                relinks.append((row_id, color_ids))
+                if not values:
+                    colors_only.append(row_id)
+            if values:
+                groups.setdefault(tuple(sorted(values)), []).append({"id": row_id, **values})
+        for params in groups.values():
+            db.execute(update(spec.model), params)
+        if relinks:
+            owner_column = next(iter(spec.color_link.c))
+            db.execute(delete(spec.color_link).where(owner_column.in_([row_id for row_id, _ in relinks])))
+            _link_colors(db, spec, relinks)
+        if colors_only and hasattr(spec.model, "updated_at"):
+            # only the colors changed: still bump updated_at
+            db.execute(update(spec.model).where(spec.model.id.in_(colors_only)).values(updated_at=datetime.utcnow()))
+        ids = [row_id for _, row_id, _ in parsed]
+        _refresh_cards(db, spec, _card_owners(db, spec, ids))
+        return ids
+
+    result = _commit(db, spec, errors, atomic, write)
+    if result["ids"] and repriced:
+        pricing.reprice_carts(db, pricing.affected_carts(db, **{spec.cart_key: repriced}))
+    return result
+
+
+def bulk_delete(db: Session, spec: BulkSpec, rows: Sequence[Any], atomic: bool = False) -> Dict[str, Any]:
+    """Delete rows by id (a list of ids or of {"id": ...} objects) together with their association rows."""
+    errors: List[dict] = []
+    wanted: Dict[int, int] = {}
+    for index, row in enumerate(rows):
+        row_id = row.get("id") if isinstance(row, dict) else row
+        if not isinstance(row_id, int) or isinstance(row_id, bool):
+            errors.append(_row_error(index, ["id: обязательное целое поле"]))
+        else:
+            wanted.setdefault(row_id, index)
+    existing = set(db.scalars(select(spec.model.id).where(spec.model.id.in_(wanted)))) if wanted else set()
+    for row_id, index in wanted.items():
+        if row_id not in existing:
+            errors.append(_row_error(index, ["id: запись не найдена"], row_id))
+
+    def write() -> List[int]:
+        ids = sorted(existing)
+        if ids:
+            cart_ids = pricing.affected_carts(db, **{spec.cart_key: ids}) if spec.cart_key else []
+            owners = _card_owners(db, spec, ids)
+            for column in spec.dependents:
+                db.execute(delete(column.table).where(column.in_(ids)))
+            pricing.refresh_cart_totals(db, cart_ids)
+            db.execute(delete(spec.model).where(spec.model.id.in_(ids)))
+            _refresh_cards(db, spec, owners)
+        return ids
+
+    return _commit(db, spec, errors, atomic, write)
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from fastapi import Request, Response
+
+from . import compression
+from .conditional import not_modified, not_modified_response
+
+
+# Response cache settings; RESPONSE_CACHE_TTL=0 disables caching
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# How long require_access may trust a user's access level without re-reading it
+ACCESS_LEVEL_CACHE_TTL = float(os.getenv("ACCESS_LEVEL_CACHE_TTL", "30"))
+ACCESS_LEVEL_CACHE_MAX_ENTRIES = int(os.getenv("ACCESS_LEVEL_CACHE_MAX_ENTRIES", "10000"))
+
+
+class TTLCache:
+    """Thread-safe LRU mapping with per-entry expiry and entry/byte bounds."""
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: Optional[int] = None, sizeof: Optional[Callable[[Any], int]] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or (lambda value: 0)
+        self._data: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < now:
+                if item is not None:
+                    self._pop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[2]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl <= 0:
+            return
+        size = self._sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while len(self._data) > self.max_entries or (self.max_bytes is not None and self._bytes > self.max_bytes):
+                self._pop(next(iter(self._data)))
+                self.evictions += 1
+
+    def replace(self, key: Hashable, value: Any) -> None:
+        """Swap the value of a live entry, keeping its expiry; no-op when it is gone."""
+        size = self._sizeof(value)
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return
+            self._data[key] = (item[0], size, value)
+            self._bytes += size - item[1]
+            while self.max_bytes is not None and self._bytes > self.max_bytes and self._data:
+                self._pop(next(iter(self._data)))
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> None:
+        with self._lock:
+            for key in [key for key in self._data if predicate(key)]:
+                self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _pop(self, key: Hashable) -> None:
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+
+# ======================
+# Access levels
+# ======================
+
+# user_id -> access_level; crud drops the entry whenever a user's level changes
+access_level_cache = TTLCache(ACCESS_LEVEL_CACHE_TTL, ACCESS_LEVEL_CACHE_MAX_ENTRIES)
+
+
+# ======================
+# Response cache
+# ======================
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    headers: Dict[str, str]
+    # compressed bodies by Content-Encoding, added the first time a client asks for one
+    variants: Optional[Dict[str, bytes]] = None
+
+
+def _response_size(entry: CachedResponse) -> int:
+    variants = sum(len(body) for body in entry.variants.values()) if entry.variants else 0
+    return len(entry.body) + variants + sum(len(k) + len(v) for k, v in entry.headers.items())
+
+
+response_cache = TTLCache(RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_BYTES, sizeof=_response_size)
+
+# Bumped on every invalidation so a response built from pre-write data is not stored afterwards
+_generations: Dict[str, int] = {}
+_generations_lock = threading.Lock()
+
+
+def _cache_key(namespace: str, request: Request) -> Tuple:
+    return (namespace, request.url.path, tuple(sorted(request.query_params.multi_items())))
+
+
+def _store(namespace: str, generation: int, key: Tuple, entry: CachedResponse, replace: bool = False) -> None:
+    with _generations_lock:
+        if _generations.get(namespace, 0) == generation:
+            if replace:
+                response_cache.replace(key, entry)
+            else:
+                response_cache.set(key, entry)
+
+
+def _respond(namespace: str, generation: int, key: Tuple, entry: CachedResponse, request: Request, fresh: bool) -> Response:
+    """Response for a cache entry, compressed for the client's Accept-Encoding.
+
+    The compressed body is kept with the entry, so each encoding costs one
+    compression per entry; CompressionMiddleware passes it through as is.
+    """
+    encoding = None
+    if len(entry.body) >= compression.COMPRESSION_MIN_SIZE:
+        encoding = compression.negotiate(request.headers.get("accept-encoding"))
+    if encoding is not None and encoding not in (entry.variants or {}):
+        entry = entry._replace(variants={**(entry.variants or {}), encoding: compression.compress(entry.body, encoding)})
+        if not fresh:
+            _store(namespace, generation, key, entry, replace=True)
+    if fresh:
+        _store(namespace, generation, key, entry)
+    headers = {**entry.headers, "Vary": "Accept-Encoding"}
+    if encoding is None:
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(content=entry.variants[encoding], media_type="application/json", headers=headers)
+
+
+def cached_response(
+    namespace: str,
+    request: Request,
+    build: Callable[[], Tuple[bytes, Dict[str, str]]],
+    validator: Optional[Callable[[], Dict[str, str]]] = None,
+) -> Response:
+    """Serve a JSON response from the cache, building and storing it on a miss.
+
+    The key is the namespace plus the request path and query parameters;
+    `build` returns the serialized body and any extra headers to keep with it.
+    `validator` returns ETag / Last-Modified headers (see conditional.py):
+    they are stored with the entry, so a cache hit answers a matching
+    conditional request with 304 without touching the database, and a miss
+    checks them before building the body.
+    """
+    key = _cache_key(namespace, request)
+    generation = _generations.get(namespace, 0)
+    entry = response_cache.get(key)
+    if entry is None:
+        validators = validator() if validator is not None else {}
+        if validators and not_modified(request, validators):
+            return not_modified_response(validators)
+        body, headers = build()
+        return _respond(namespace, generation, key, CachedResponse(body, {**headers, **validators}), request, fresh=True)
+    if not_modified(request, entry.headers):
+        return not_modified_response(entry.headers)
+    return _respond(namespace, generation, key, entry, request, fresh=False)
+
+
+async def cached_response_async(
+    namespace: str,
+    request: Request,
+    build: Callable[[], Awaitable[Tuple[bytes, Dict[str, str]]]],
+    validator: Optional[Callable[[], Awaitable[Dict[str, str]]]] = None,
+) -> Response:
+    """`cached_response` for async handlers whose `build` and `validator` are coroutine functions."""
+    key = _cache_key(namespace, request)
+    generation = _generations.get(namespace, 0)
+    entry = response_cache.get(key)
+    if entry is None:
+        validators = await validator() if validator is not None else {}
+        if validators and not_modified(request, validators):
+            return not_modified_response(validators)
+        body, headers = await build()
+        return _respond(namespace, generation, key, CachedResponse(body, {**headers, **validators}), request, fresh=True)
+    if not_modified(request, entry.headers):
+        return not_modified_response(entry.headers)
+    return _respond(namespace, generation, key, entry, request, fresh=False)
+
+
+def invalidate(*namespaces: str) -> None:
+    """Drop cached responses of the given namespaces (called by crud writes)."""
+    with _generations_lock:
+        for namespace in namespaces:
+            _generations[namespace] = _generations.get(namespace, 0) + 1
+        response_cache.invalidate(lambda key: key[0] in namespaces)
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import String, and_, cast, delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+from .filters import price_buckets
+from .pagination import Cursor
+
+
+# Catalog read model: one catalog_cards row per module / furniture item with
+# everything a listing card shows (effective price, first photo, color
+# summaries), so card listings are a single primary-key range scan with no
+# joins. Rows are rewritten by the write paths in the same transaction.
+#
+# catalog_facet_counts holds the facets of the unfiltered catalog (per color,
+# price bucket, furniture type and model, plus the total). refresh_cards keeps
+# it in step: the old cards' contributions are subtracted and the new ones
+# added, so the common "no filters" facets request reads a few rows instead of
+# running a GROUP BY per facet. Changing FACET_PRICE_BUCKETS needs a rebuild.
+
+CARD_MODELS = {"module": models.Module, "furniture": models.Furniture}
+COLOR_LINKS = {"module": models.module_colors, "furniture": models.furniture_colors}
+# Source rows loaded per statement (bulk writes may touch tens of thousands)
+REFRESH_BATCH_SIZE = 1000
+
+# {card kind: item ids} whose cards a write touched
+CardOwners = Dict[str, List[int]]
+
+
+def _card_rows(db: Session, kind: str, ids: Sequence[int]) -> List[dict]:
+    """Card rows of `ids` built from two plain column SELECTs (items, then their colors)."""
+    model, link = CARD_MODELS[kind], COLOR_LINKS[kind]
+    owner_column, color_column = link.c
+    colors: Dict[int, List[dict]] = {}
+    color_rows = db.execute(
+        select(owner_column, models.Color.id, models.Color.name, models.Color.hex_code, models.Color.additional_price)
+        .join(models.Color, models.Color.id == color_column)
+        .where(owner_column.in_(ids))
+        .order_by(owner_column, models.Color.id)
+    )
+    for owner_id, color_id, name, hex_code, additional_price in color_rows:
+        colors.setdefault(owner_id, []).append({"id": color_id, "name": name, "hex_code": hex_code, "additional_price": additional_price or 0})
+    is_furniture = kind == "furniture"
+    items = db.execute(
+        select(
+            model.id, model.name, model.article, model.price, model.discounted_price, model.photos, model.updated_at,
+            *((model.furniture_type, model.model) if is_furniture else ()),
+        ).where(model.id.in_(ids))
+    )
+    rows = []
+    for item in items:
+        rows.append({
+            "kind": kind,
+            "id": item.id,
+            "name": item.name,
+            "article": item.article,
+            "furniture_type": item.furniture_type if is_furniture else None,
+            "model": item.model if is_furniture else None,
+            "price": item.price,
+            "discounted_price": item.discounted_price,
+            "effective_price": item.discounted_price if item.discounted_price is not None else item.price,
+            "photo": item.photos[0] if item.photos else None,
+            "colors": colors.get(item.id, []),
+            "updated_at": item.updated_at,
+        })
+    return rows
+
+
+def _price_bucket(price: float) -> str:
+    """Lower bound of the price facet bucket holding `price` (the bucket key in catalog_facet_counts)."""
+    for low, high in price_buckets():
+        if high is None or price < high:
+            return f"{low:g}"
+
+
+def _facet_keys(card) -> Iterable[Tuple[str, str]]:
+    yield "total", ""
+    yield "price", _price_bucket(card["effective_price"])
+    for color in card["colors"] or ():
+        yield "color", str(color["id"])
+    if card["furniture_type"] is not None:
+        yield "furniture_type", card["furniture_type"]
+    if card["model"] is not None:
+        yield "model", card["model"]
+
+
+def _facet_counts(cards: Iterable) -> Counter:
+    return Counter(key for card in cards for key in _facet_keys(card))
+
+
+def _add_facet_counts(db: Session, kind: str, deltas: Counter) -> None:
+    """count += delta for each (facet, value), creating missing rows."""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    table = models.CatalogFacetCount.__table__
+    rows = [{"kind": kind, "facet": facet, "value": value, "count": delta} for (facet, value), delta in deltas.items()]
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name in ("postgresql", "sqlite"):
+        if dialect_name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table)
+        db.execute(
+            stmt.on_conflict_do_update(index_elements=[table.c.kind, table.c.facet, table.c.value], set_={"count": table.c.count + stmt.excluded["count"]}),
+            rows,
+        )
+        return
+    existing = set(db.execute(select(table.c.facet, table.c.value).where(table.c.kind == kind)).tuples())
+    for row in rows:
+        if (row["facet"], row["value"]) in existing:
+            db.execute(
+                update(table)
+                .where(table.c.kind == kind, table.c.facet == row["facet"], table.c.value == row["value"])
+                .values(count=table.c.count + row["count"])
+            )
+        else:
+            db.execute(insert(table), row)
+
+
+def refresh_cards(db: Session, kind: str, ids: Sequence[int]) -> None:
+    """Rewrite the cards of `ids` from their source rows; cards of deleted items are dropped."""
+    ids = sorted(set(ids))
+    if not ids:
+        return
+    db.flush()  # the session does not autoflush: make pending ORM changes visible
+    card_table = models.CatalogCard.__table__
+    facet_columns = (card_table.c.effective_price, card_table.c.colors, card_table.c.furniture_type, card_table.c.model)
+    for start in range(0, len(ids), REFRESH_BATCH_SIZE):
+        batch = ids[start:start + REFRESH_BATCH_SIZE]
+        rows = _card_rows(db, kind, batch)
+        in_batch = (card_table.c.kind == kind, card_table.c.id.in_(batch))
+        old = db.execute(select(*facet_columns).where(*in_batch)).mappings()
+        deltas = _facet_counts(rows)
+        deltas.subtract(_facet_counts(old))
+        db.execute(delete(card_table).where(*in_batch))
+        if rows:
+            db.execute(insert(card_table), rows)
+        _add_facet_counts(db, kind, deltas)
+
+
+def rebuild_facets(db: Session) -> None:
+    """Recount catalog_facet_counts from catalog_cards (after a bucket change or a full card rebuild)."""
+    card_table = models.CatalogCard.__table__
+    db.execute(delete(models.CatalogFacetCount))
+    for kind in CARD_MODELS:
+        counts: Counter = Counter()
+        last_id = 0
+        while True:
+            batch = db.execute(
+                select(card_table.c.id, card_table.c.effective_price, card_table.c.colors, card_table.c.furniture_type, card_table.c.model)
+                .where(card_table.c.kind == kind, card_table.c.id > last_id)
+                .order_by(card_table.c.id)
+                .limit(REFRESH_BATCH_SIZE)
+            ).mappings().all()
+            if not batch:
+                break
+            counts.update(_facet_counts(batch))
+            last_id = batch[-1]["id"]
+        _add_facet_counts(db, kind, counts)
+
+
+def stored_facets(db: Session, kind: str) -> dict:
+    """Facets of the unfiltered catalog from catalog_facet_counts, shaped like the live ones."""
+    table = models.CatalogFacetCount
+    rows = db.execute(
+        select(table.facet, table.value, table.count, models.Color.name)
+        .outerjoin(models.Color, and_(table.facet == "color", cast(models.Color.id, String) == table.value))
+        .where(table.kind == kind, table.count > 0)
+    ).all()
+    by_facet: Dict[str, Dict[str, int]] = {}
+    colors = []
+    for facet, value, count, color_name in rows:
+        if facet == "color":
+            if color_name is not None:
+                colors.append({"id": int(value), "name": color_name, "count": count})
+        else:
+            by_facet.setdefault(facet, {})[value] = count
+    prices = by_facet.get("price", {})
+
+    def value_counts(facet: str) -> List[dict]:
+        return [{"value": value, "count": count} for value, count in sorted(by_facet.get(facet, {}).items(), key=lambda item: (-item[1], item[0]))]
+
+    facets = {
+        "total": by_facet.get("total", {}).get("", 0),
+        "colors": sorted(colors, key=lambda color: (color["name"], color["id"])),
+        "price": [{"min": low, "max": high, "count": prices.get(f"{low:g}", 0)} for low, high in price_buckets()],
+    }
+    if kind == "furniture":
+        facets["furniture_types"] = value_counts("furniture_type")
+        facets["models"] = value_counts("model")
+    return facets
+
+
+def refresh_owners(db: Session, owners: CardOwners) -> None:
+    for kind, ids in owners.items():
+        refresh_cards(db, kind, ids)
+
+
+def touch_owners(db: Session, owners: CardOwners) -> None:
+    """Bump updated_at of items embedding a changed color, so their ETags change too."""
+    now = datetime.utcnow()
+    for kind, ids in owners.items():
+        model = CARD_MODELS[kind]
+        for start in range(0, len(ids), REFRESH_BATCH_SIZE):
+            db.execute(
+                update(model).where(model.id.in_(ids[start:start + REFRESH_BATCH_SIZE])).values(updated_at=now),
+                execution_options={"synchronize_session": False},
+            )
+
+
+def own_cards(kind: str) -> Callable[[Session, Sequence[int]], CardOwners]:
+    """Owners resolver for writes to the modules or furniture themselves."""
+    return lambda db, ids: {kind: list(ids)}
+
+
+def color_owners(db: Session, color_ids: Sequence[int]) -> CardOwners:
+    """Cards showing any of the colors (resolve before the color links are deleted)."""
+    color_ids = list(color_ids)
+    owners = {}
+    for kind, link in COLOR_LINKS.items():
+        owner_column, color_column = link.c
+        owners[kind] = list(db.scalars(select(owner_column).where(color_column.in_(color_ids)).distinct()))
+    return owners
+
+
+def photo_owners(db: Session, needle: str) -> CardOwners:
+    """Items showing a photo whose URL contains `needle`, directly or through one of their colors."""
+    color_ids = list(db.scalars(select(models.Color.id).where(cast(models.Color.photos, String).contains(needle))))
+    owners = color_owners(db, color_ids) if color_ids else {}
+    for kind, model in CARD_MODELS.items():
+        own = db.scalars(select(model.id).where(cast(model.photos, String).contains(needle)))
+        owners[kind] = sorted(set(owners.get(kind, [])) | set(own))
+    return owners
+
+
+def rebuild_cards(db: Session) -> int:
+    """Rewrite every card, in batches; the caller commits. Returns the number of source rows."""
+    total = 0
+    for kind, model in CARD_MODELS.items():
+        db.execute(delete(models.CatalogCard).where(models.CatalogCard.kind == kind, models.CatalogCard.id.not_in(select(model.id))))
+        last_id = 0
+        while True:
+            ids = list(db.scalars(select(model.id).where(model.id > last_id).order_by(model.id).limit(REFRESH_BATCH_SIZE)))
+            if not ids:
+                break
+            refresh_cards(db, kind, ids)
+            total += len(ids)
+            last_id = ids[-1]
+    rebuild_facets(db)
+    return total
+
+
+def select_cards(kind: str, skip: int = 0, limit: int = 100, after: Optional[Cursor] = None, furniture_type: Optional[str] = None):
+    """One range scan of the (kind, id) primary key, or of (kind, furniture_type, id) when filtered."""
+    stmt = select(models.CatalogCard).where(models.CatalogCard.kind == kind)
+    if furniture_type:
+        stmt = stmt.where(models.CatalogCard.furniture_type == furniture_type)
+    if after is not None:
+        stmt = stmt.where(models.CatalogCard.id > after.id)
+    else:
+        stmt = stmt.offset(skip)
+    return stmt.order_by(models.CatalogCard.id).limit(limit)
+
+
+def list_cards(db: Session, kind: str, skip: int = 0, limit: int = 100, after: Optional[Cursor] = None, furniture_type: Optional[str] = None) -> List[models.CatalogCard]:
+    return db.execute(select_cards(kind, skip, limit, after, furniture_type)).scalars().all()
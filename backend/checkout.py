@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import crud, models, pricing, schemas
+
+
+# How long a used Idempotency-Key keeps answering with its order
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+
+
+class CheckoutResult(NamedTuple):
+    order: models.Order
+    replayed: bool  # the key was already used: this is the order created back then
+
+
+def _request_hash(checkout_in: schemas.CheckoutCreate) -> str:
+    body = json.dumps(checkout_in.dict(), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _find_key(db: Session, user_id: int, key: str) -> Optional[models.IdempotencyKey]:
+    return db.scalar(select(models.IdempotencyKey).where(models.IdempotencyKey.user_id == user_id, models.IdempotencyKey.key == key))
+
+
+def _claim_key(db: Session, user_id: int, key: str, digest: str) -> Optional[models.Order]:
+    """Record the key inside the checkout transaction; returns the order of an earlier use of it.
+
+    On Postgres a concurrent checkout with the same key blocks on the unique
+    index until the first one commits, then sees its row here and replays it.
+    """
+    cutoff = datetime.utcnow() - timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+    db.execute(delete(models.IdempotencyKey).where(models.IdempotencyKey.user_id == user_id, models.IdempotencyKey.created_at < cutoff))
+    existing = _find_key(db, user_id, key)
+    if existing is None:
+        try:
+            with db.begin_nested():
+                db.add(models.IdempotencyKey(user_id=user_id, key=key, request_hash=digest))
+            return None
+        except IntegrityError:
+            existing = _find_key(db, user_id, key)
+    if existing is not None and existing.request_hash != digest:
+        db.rollback()
+        raise HTTPException(status_code=422, detail="Idempotency-Key уже использован с другим телом запроса")
+    order = crud.get_order(db, existing.order_id) if existing is not None and existing.order_id is not None else None
+    if order is None:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Запрос с этим Idempotency-Key еще выполняется")
+    crud.detach_order(db, order)
+    db.rollback()
+    return order
+
+
+def checkout_cart(db: Session, user_id: int, checkout_in: schemas.CheckoutCreate, idempotency_key: Optional[str] = None) -> CheckoutResult:
+    """Turn the user's active cart into an order and empty the cart, in one transaction.
+
+    The cart row is locked with SELECT ... FOR UPDATE SKIP LOCKED: a second
+    checkout of the same cart running at the same time gets 409 instead of
+    waiting and ordering the same lines again.
+    """
+    digest = _request_hash(checkout_in)
+    if idempotency_key is not None:
+        order = _claim_key(db, user_id, idempotency_key, digest)
+        if order is not None:
+            return CheckoutResult(order, True)
+
+    active = (models.Cart.user_id == user_id, models.Cart.status == "active")
+    cart_id = db.scalar(select(models.Cart.id).where(*active).order_by(models.Cart.id).limit(1).with_for_update(skip_locked=True))
+    if cart_id is None:
+        locked = db.scalar(select(models.Cart.id).where(*active).limit(1)) is not None
+        db.rollback()
+        if locked:
+            raise HTTPException(status_code=409, detail="Корзина уже оформляется")
+        raise HTTPException(status_code=400, detail="Корзина пуста")
+
+    # each cart line becomes an order line at current prices (not the snapshots); the total is their sum
+    lines = [dict(row) for row in db.execute(pricing.cart_lines_stmt(cart_id)).mappings()]
+    if not lines:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Корзина пуста")
+
+    order_data = {**checkout_in.dict(), "user_id": user_id, "total_amount": crud.lines_total(lines)}
+    modules = crud.get_modules(db, [line["module_id"] for line in lines])
+    order = crud.insert_order(db, order_data, modules, lines)
+    db.execute(delete(models.CartItem).where(models.CartItem.cart_id == cart_id))
+    pricing.refresh_cart_totals(db, [cart_id])
+    if idempotency_key is not None:
+        db.execute(
+            update(models.IdempotencyKey)
+            .where(models.IdempotencyKey.user_id == user_id, models.IdempotencyKey.key == idempotency_key)
+            .values(order_id=order.id)
+        )
+    # detached objects are not expired by the commit, so serializing them costs no query
+    crud.detach_order(db, order)
+    db.commit()
+    return CheckoutResult(order, False)
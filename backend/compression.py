@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import gzip
+import os
+import zlib
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli and zstandard are optional: gzip is always available
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Negotiated response compression (Accept-Encoding: zstd, br, gzip). The
+# middleware compresses text-like responses from COMPRESSION_MIN_SIZE bytes
+# up; streamed bodies are compressed chunk by chunk and flushed after every
+# chunk so exports stay progressive. Responses that already carry a
+# Content-Encoding pass through untouched: the response cache stores the
+# compressed variants of its entries (cache.py) and serves them directly, so
+# a cached body is compressed once per encoding, not once per request.
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Server preference among the encodings the client accepts equally; unknown or uninstalled ones are skipped
+COMPRESSION_ENCODINGS = os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip")
+# Levels tuned for per-request CPU, not for maximum ratio
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+LEVELS = {"gzip": COMPRESSION_GZIP_LEVEL, "br": COMPRESSION_BROTLI_QUALITY, "zstd": COMPRESSION_ZSTD_LEVEL}
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def _installed(encoding: str) -> bool:
+    return encoding == "gzip" or (encoding == "br" and brotli is not None) or (encoding == "zstd" and zstandard is not None)
+
+
+ENCODINGS: Tuple[str, ...] = tuple(
+    encoding for encoding in (name.strip() for name in COMPRESSION_ENCODINGS.split(",")) if encoding and _installed(encoding)
+)
+
+
+def negotiate(accept_encoding: Optional[str], encodings: Tuple[str, ...] = ENCODINGS) -> Optional[str]:
+    """Best encoding for an Accept-Encoding header: highest q-value, then server preference."""
+    if not accept_encoding or not encodings:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip().lower()] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """One-shot compression at the configured level (or `level`, for the benchmark)."""
+    level = LEVELS.get(encoding) if level is None else level
+    if encoding == "gzip":
+        return gzip.compress(body, level, mtime=0)
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(body)
+    raise ValueError(f"unsupported encoding: {encoding}")
+
+
+class StreamCompressor:
+    """Incremental compressor whose output after each chunk is decodable so far."""
+
+    def __init__(self, encoding: str, level: Optional[int] = None):
+        self.encoding = encoding
+        level = LEVELS[encoding] if level is None else level
+        if encoding == "gzip":
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+        elif encoding == "br":
+            self._obj = brotli.Compressor(quality=level)
+        else:
+            self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "gzip":
+            return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == "br":
+            return self._obj.process(data) + self._obj.flush()
+        return self._obj.compress(data) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        if self.encoding == "gzip":
+            return self._obj.flush(zlib.Z_FINISH)
+        if self.encoding == "br":
+            return self._obj.finish()
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "")
+    return (
+        "content-encoding" not in headers
+        and "content-range" not in headers
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+    )
+
+
+def vary_accept_encoding(headers: MutableHeaders) -> None:
+    vary = headers.get("vary")
+    if vary is None:
+        headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["Vary"] = f"{vary}, Accept-Encoding"
+
+
+def encoded_etag(etag: Optional[str], encoding: str) -> Optional[str]:
+    """A strong ETag names exact bytes, so the compressed variant gets its own; weak ones are kept."""
+    if etag is None or etag.startswith("W/"):
+        return etag
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else f"{etag}-{encoding}"
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware: buffers nothing beyond the first body chunk."""
+
+    def __init__(self, app: ASGIApp, min_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _Responder(self.app, encoding, self.min_size)(scope, receive, send)
+
+
+class _Responder:
+    def __init__(self, app: ASGIApp, encoding: str, min_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.min_size = min_size
+        self.send: Send = None
+        self.start: Optional[Message] = None
+        self.compressor: Optional[StreamCompressor] = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_wrapper)
+
+    async def send_wrapper(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            status = message["status"]
+            self.passthrough = status < 200 or status in (204, 206, 304) or not compressible(headers)
+            if self.passthrough:
+                await self.send(message)
+            else:
+                self.start = message  # held until the first body chunk shows the response size
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            headers = MutableHeaders(raw=start["headers"])
+            length = headers.get("content-length")
+            small = len(body) < self.min_size if not more_body else (length is not None and int(length) < self.min_size)
+            vary_accept_encoding(headers)
+            if small:
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            headers["Content-Encoding"] = self.encoding
+            etag = encoded_etag(headers.get("etag"), self.encoding)
+            if etag is not None:
+                headers["ETag"] = etag
+            if not more_body:
+                body = compress(body, self.encoding)
+                headers["Content-Length"] = str(len(body))
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            del headers["Content-Length"]
+            self.compressor = StreamCompressor(self.encoding)
+            await self.send(start)
+
+        if more_body:
+            data = self.compressor.chunk(body) if body else b""
+            if data:
+                await self.send({"type": "http.response.body", "body": data, "more_body": True})
+        else:
+            await self.send({"type": "http.response.body", "body": self.compressor.chunk(body) + self.compressor.finish()})
+
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional, Sequence
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .database import get_async_db, get_db
+
+
+# Conditional GET: validators (weak ETag + Last-Modified) derived from
+# updated_at, read with one small query before any row is loaded or
+# serialized. Items use their own updated_at; lists use count(*) and
+# max(updated_at) of the table (an index-only scan with ix_*_updated_at), so
+# inserts, updates and deletes all change the ETag. Tables whose rows are
+# embedded in the response (modules inside orders) are folded in the same way.
+
+Headers = Dict[str, str]
+
+
+def _http_date(value: datetime) -> str:
+    return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def _parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def validator_headers(request: Request, last_modified: Optional[datetime], parts: Sequence[Any]) -> Headers:
+    """ETag over the resource state plus path and query (projections and pages differ)."""
+    state = repr((request.url.path, request.url.query, tuple(parts)))
+    headers = {"ETag": f'W/"{hashlib.md5(state.encode()).hexdigest()}"'}
+    if last_modified is not None:
+        headers["Last-Modified"] = _http_date(last_modified)
+    return headers
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def not_modified(request: Request, headers: Mapping[str, str]) -> bool:
+    """RFC 9110 evaluation: If-None-Match (weak comparison) wins over If-Modified-Since."""
+    if_none_match = request.headers.get("if-none-match")
+    etag = headers.get("ETag") or headers.get("etag")
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        return any(tag.strip() == "*" or _opaque(tag) == _opaque(etag) for tag in if_none_match.split(","))
+    if_modified_since = request.headers.get("if-modified-since")
+    last_modified = headers.get("Last-Modified") or headers.get("last-modified")
+    if if_modified_since is None or last_modified is None:
+        return False
+    since, modified = _parse_http_date(if_modified_since), _parse_http_date(last_modified)
+    return since is not None and modified is not None and modified <= since
+
+
+def not_modified_response(headers: Mapping[str, str]) -> Response:
+    return Response(status_code=304, headers=dict(headers))
+
+
+def _table_stamp(model) -> list:
+    return [
+        select(func.count()).select_from(model).scalar_subquery(),
+        select(func.max(model.updated_at)).scalar_subquery(),
+    ]
+
+
+def list_stmt(*models):
+    return select(*[column for model in models for column in _table_stamp(model)])
+
+
+def item_stmt(model, item_id: int, depends_on: Sequence[Any] = ()):
+    own = select(model.updated_at).where(model.id == item_id).scalar_subquery()
+    return select(own, *[column for dependency in depends_on for column in _table_stamp(dependency)])
+
+
+def _latest(values: Sequence[Any]) -> Optional[datetime]:
+    stamps = [value for value in values if isinstance(value, datetime)]
+    return max(stamps) if stamps else None
+
+
+def _list_headers(request: Request, row: Sequence[Any]) -> Headers:
+    return validator_headers(request, _latest(row), row)
+
+
+def _item_headers(request: Request, row: Sequence[Any]) -> Optional[Headers]:
+    if row[0] is None:
+        return None  # no such row: the handler answers 404
+    return validator_headers(request, _latest(row), row)
+
+
+def list_validator(db: Session, request: Request, *models) -> Headers:
+    return _list_headers(request, db.execute(list_stmt(*models)).one())
+
+
+async def list_validator_async(db, request: Request, *models) -> Headers:
+    return _list_headers(request, (await db.execute(list_stmt(*models))).one())
+
+
+def item_validator(db: Session, request: Request, model, item_id: int, depends_on: Sequence[Any] = ()) -> Optional[Headers]:
+    return _item_headers(request, db.execute(item_stmt(model, item_id, depends_on)).one())
+
+
+async def item_validator_async(db, request: Request, model, item_id: int, depends_on: Sequence[Any] = ()) -> Optional[Headers]:
+    return _item_headers(request, (await db.execute(item_stmt(model, item_id, depends_on))).one())
+
+
+def _path_id(request: Request, id_param: str) -> Optional[int]:
+    try:
+        return int(request.path_params[id_param])
+    except (KeyError, ValueError):
+        return None  # left to the handler's own validation
+
+
+def _check(request: Request, response: Response, headers: Optional[Headers]) -> None:
+    if headers is None:
+        return
+    if not_modified(request, headers):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+
+def conditional_get(model, id_param: Optional[str] = None, depends_on: Sequence[Any] = ()):
+    """Dependency answering 304 before the handler runs, else adding ETag / Last-Modified.
+
+    With `id_param` the validator is that row's updated_at, otherwise the whole
+    table's; `depends_on` adds tables whose rows the response embeds.
+    """
+    def dependency(request: Request, response: Response, db: Session = Depends(get_db)) -> None:
+        if id_param is None:
+            headers = list_validator(db, request, model, *depends_on)
+        else:
+            item_id = _path_id(request, id_param)
+            headers = None if item_id is None else item_validator(db, request, model, item_id, depends_on)
+        _check(request, response, headers)
+    return dependency
+
+
+def conditional_get_async(model, id_param: Optional[str] = None, depends_on: Sequence[Any] = ()):
+    """`conditional_get` for the DB_ASYNC routes."""
+    async def dependency(request: Request, response: Response, db=Depends(get_async_db)) -> None:
+        if id_param is None:
+            headers = await list_validator_async(db, request, model, *depends_on)
+        else:
+            item_id = _path_id(request, id_param)
+            headers = None if item_id is None else await item_validator_async(db, request, model, item_id, depends_on)
+        _check(request, response, headers)
+    return dependency
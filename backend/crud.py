@@ -1,11 +1,125 @@
 from __future__ import annotations
 
+from datetime import datetime
 from typing import Optional, Sequence, List
 
-from sqlalchemy import select, and_, or_, func
-from sqlalchemy.orm import Session
+from sqlalchemy import select, and_, or_, func, tuple_, case, delete, insert, update
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from . import models, schemas
+from . import cache, cards, models, pricing, schemas
+from .filters import CatalogFilters, price_buckets
+from .pagination import Cursor
+from .pricing import effective_price
+
+
+# ======================
+# Loader options
+# ======================
+
+# Eager-loading profiles per response schema: every relationship the schema
+# serializes is fetched with one extra SELECT ... IN per level, so list and
+# detail endpoints issue a fixed number of queries regardless of page size.
+MODULE_LOAD = (selectinload(models.Module.colors),)
+FURNITURE_LOAD = (selectinload(models.Furniture.colors),)
+# cart lines come with their module and color in the same SELECT (many-to-one joins)
+CART_LOAD = (selectinload(models.Cart.items).options(joinedload(models.CartItem.module), joinedload(models.CartItem.color)),)
+ORDER_LOAD = (selectinload(models.Order.modules).selectinload(models.Module.colors), selectinload(models.Order.items))
+
+
+def _paginate(stmt, skip: int, limit: int, after: Optional[Cursor], id_column, key_column=None):
+    """Apply offset or keyset pagination; keyset lists are ordered newest-first by (key, id)."""
+    if key_column is None:
+        stmt = stmt.order_by(id_column)
+        if after is not None:
+            stmt = stmt.where(id_column > after.id)
+    else:
+        stmt = stmt.order_by(key_column.desc(), id_column.desc())
+        if after is not None:
+            stmt = stmt.where(tuple_(key_column, id_column) < tuple_(after.key, after.id))
+    if after is None:
+        stmt = stmt.offset(skip)
+    return stmt.limit(limit)
+
+
+# ======================
+# Catalog filters & facets
+# ======================
+
+# (owner id, color id) columns of the color association tables
+MODULE_COLOR_LINK = (models.module_colors.c.module_id, models.module_colors.c.color_id)
+FURNITURE_COLOR_LINK = (models.furniture_colors.c.furniture_id, models.furniture_colors.c.color_id)
+
+
+def _catalog_conditions(model, color_link, filters: Optional[CatalogFilters]) -> list:
+    conditions = []
+    if filters is None:
+        return conditions
+    price = effective_price(model)
+    if filters.price_min is not None:
+        conditions.append(price >= filters.price_min)
+    if filters.price_max is not None:
+        conditions.append(price <= filters.price_max)
+    if filters.color_ids:
+        owner_id, color_id = color_link
+        conditions.append(select(owner_id).where(owner_id == model.id, color_id.in_(filters.color_ids)).exists())
+    return conditions
+
+
+def _value_counts(db: Session, column, conditions: list) -> List[dict]:
+    count = func.count()
+    rows = db.execute(
+        select(column, count).where(column.isnot(None), *conditions).group_by(column).order_by(count.desc(), column)
+    )
+    return [{"value": value, "count": n} for value, n in rows]
+
+
+def _catalog_facets(db: Session, model, color_link, conditions_for, filters: CatalogFilters) -> dict:
+    """Result total plus per-color and price-bucket counts.
+
+    Each facet applies every filter except its own, so choosing a color still
+    shows how many items the other colors would give. One GROUP BY per facet;
+    the unfiltered facets are read from catalog_facet_counts instead
+    (cards.stored_facets).
+    """
+    owner_id, color_id = color_link
+    total = db.scalar(select(func.count()).select_from(model).where(*conditions_for(filters)))
+
+    count = func.count()
+    color_rows = db.execute(
+        select(models.Color.id, models.Color.name, count)
+        .select_from(owner_id.table)
+        .join(model, model.id == owner_id)
+        .join(models.Color, models.Color.id == color_id)
+        .where(*conditions_for(filters.without("color_ids")))
+        .group_by(models.Color.id, models.Color.name)
+        .order_by(models.Color.name, models.Color.id)
+    )
+
+    buckets = price_buckets()
+    price = effective_price(model)
+    bucket = case(
+        *((price < high, index) for index, (low, high) in enumerate(buckets) if high is not None),
+        else_=len(buckets) - 1,
+    )
+    bucket_counts = dict(
+        db.execute(
+            select(bucket, func.count()).where(*conditions_for(filters.without("price_min", "price_max"))).group_by(bucket)
+        ).all()
+    )
+    return {
+        "total": total,
+        "colors": [{"id": cid, "name": cname, "count": n} for cid, cname, n in color_rows],
+        "price": [
+            {"min": low, "max": high, "count": bucket_counts.get(index, 0)}
+            for index, (low, high) in enumerate(buckets)
+        ],
+    }
+
+
+def _reload(db: Session, model, obj_id: int, options):
+    """Re-read a row after commit together with its eager-loading profile."""
+    return db.get(model, obj_id, options=options, populate_existing=True)
 
 
 # ======================
@@ -62,13 +176,33 @@ def update_user(db: Session, user: models.User, user_in: schemas.UserUpdate, pas
         user.access_level = user_in.access_level
     db.add(user)
     db.commit()
+    cache.access_level_cache.delete(user.id)
+    db.refresh(user)
+    return user
+
+
+def set_user_password_hash(db: Session, user: models.User, hashed_password: str) -> models.User:
+    user.hashed_password = hashed_password
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def set_user_access_level(db: Session, user: models.User, level: int) -> models.User:
+    user.access_level = level
+    db.add(user)
+    db.commit()
+    cache.access_level_cache.delete(user.id)
     db.refresh(user)
     return user
 
 
 def delete_user(db: Session, user: models.User) -> None:
+    user_id = user.id
     db.delete(user)
     db.commit()
+    cache.access_level_cache.delete(user_id)
 
 
 # ======================
@@ -79,6 +213,7 @@ def create_color(db: Session, color_in: schemas.ColorCreate) -> models.Color:
     color = models.Color(**color_in.dict())
     db.add(color)
     db.commit()
+    cache.invalidate("colors", "modules", "furniture")
     db.refresh(color)
     return color
 
@@ -87,23 +222,41 @@ def get_color(db: Session, color_id: int) -> Optional[models.Color]:
     return db.get(models.Color, color_id)
 
 
+def select_colors(skip: int = 0, limit: int = 100):
+    return select(models.Color).offset(skip).limit(limit)
+
+
 def list_colors(db: Session, skip: int = 0, limit: int = 100) -> Sequence[models.Color]:
-    stmt = select(models.Color).offset(skip).limit(limit)
-    return db.execute(stmt).scalars().all()
+    return db.execute(select_colors(skip, limit)).scalars().all()
 
 
 def update_color(db: Session, color: models.Color, color_in: schemas.ColorUpdate) -> models.Color:
-    for field, value in color_in.dict(exclude_unset=True).items():
+    color_data = color_in.dict(exclude_unset=True)
+    for field, value in color_data.items():
         setattr(color, field, value)
     db.add(color)
+    owners = cards.color_owners(db, [color.id])
+    cards.touch_owners(db, owners)
+    cards.refresh_owners(db, owners)
     db.commit()
+    cache.invalidate("colors", "modules", "furniture")
+    if "additional_price" in color_data:
+        pricing.reprice_carts(db, pricing.affected_carts(db, color_ids=[color.id]))
     db.refresh(color)
     return color
 
 
 def delete_color(db: Session, color: models.Color) -> None:
+    # строки корзин с этим цветом (ON DELETE CASCADE есть не во всех БД)
+    cart_ids = pricing.affected_carts(db, color_ids=[color.id])
+    owners = cards.color_owners(db, [color.id])
+    db.execute(delete(models.CartItem).where(models.CartItem.color_id == color.id))
+    pricing.refresh_cart_totals(db, cart_ids)
     db.delete(color)
+    cards.touch_owners(db, owners)
+    cards.refresh_owners(db, owners)
     db.commit()
+    cache.invalidate("colors", "modules", "furniture")
 
 
 # ======================
@@ -123,21 +276,45 @@ def create_module(db: Session, module_in: schemas.ModuleCreate) -> models.Module
         colors = db.execute(select(models.Color).where(models.Color.id.in_(color_ids))).scalars().all()
         module.colors.extend(colors)
     
+    cards.refresh_cards(db, "module", [module.id])
     db.commit()
-    db.refresh(module)
-    return module
+    cache.invalidate("modules")
+    return _reload(db, models.Module, module.id, MODULE_LOAD)
+
 
+def get_module(db: Session, module_id: int, options: tuple = MODULE_LOAD) -> Optional[models.Module]:
+    return db.get(models.Module, module_id, options=options)
 
-def get_module(db: Session, module_id: int) -> Optional[models.Module]:
-    return db.get(models.Module, module_id)
 
+def get_modules(db: Session, module_ids: Sequence[int]) -> List[models.Module]:
+    """Modules by id in one SELECT, in request order; unknown ids are left out."""
+    module_ids = list(dict.fromkeys(module_ids))
+    if not module_ids:
+        return []
+    found = {module.id: module for module in db.execute(select(models.Module).options(*MODULE_LOAD).where(models.Module.id.in_(module_ids))).scalars()}
+    return [found[module_id] for module_id in module_ids if module_id in found]
 
-def list_modules(db: Session, skip: int = 0, limit: int = 100, name: Optional[str] = None) -> Sequence[models.Module]:
-    stmt = select(models.Module)
+
+def _module_conditions(name: Optional[str], filters: Optional[CatalogFilters]) -> list:
+    conditions = _catalog_conditions(models.Module, MODULE_COLOR_LINK, filters)
     if name:
-        stmt = stmt.where(models.Module.name.ilike(f"%{name}%"))
-    stmt = stmt.offset(skip).limit(limit)
-    return db.execute(stmt).scalars().all()
+        conditions.append(models.Module.name.ilike(f"%{name}%"))
+    return conditions
+
+
+def select_modules(skip: int = 0, limit: int = 100, name: Optional[str] = None, after: Optional[Cursor] = None, filters: Optional[CatalogFilters] = None, options: tuple = MODULE_LOAD):
+    stmt = select(models.Module).options(*options).where(*_module_conditions(name, filters))
+    return _paginate(stmt, skip, limit, after, models.Module.id)
+
+
+def list_modules(db: Session, skip: int = 0, limit: int = 100, name: Optional[str] = None, after: Optional[Cursor] = None, filters: Optional[CatalogFilters] = None, options: tuple = MODULE_LOAD) -> Sequence[models.Module]:
+    return db.execute(select_modules(skip, limit, name, after, filters, options)).scalars().all()
+
+
+def module_facets(db: Session, name: Optional[str] = None, filters: Optional[CatalogFilters] = None) -> dict:
+    if not name and (filters or CatalogFilters()) == CatalogFilters():
+        return cards.stored_facets(db, "module")
+    return _catalog_facets(db, models.Module, MODULE_COLOR_LINK, lambda f: _module_conditions(name, f), filters or CatalogFilters())
 
 
 def update_module(db: Session, module: models.Module, module_in: schemas.ModuleUpdate) -> models.Module:
@@ -151,16 +328,25 @@ def update_module(db: Session, module: models.Module, module_in: schemas.ModuleU
     if color_ids is not None:
         colors = db.execute(select(models.Color).where(models.Color.id.in_(color_ids))).scalars().all()
         module.colors = colors
+        module.updated_at = datetime.utcnow()  # связи не меняют строку, а ответ меняется
     
     db.add(module)
+    cards.refresh_cards(db, "module", [module.id])
     db.commit()
-    db.refresh(module)
-    return module
+    cache.invalidate("modules")
+    if module_data.keys() & {"price", "discounted_price"}:
+        pricing.reprice_carts(db, pricing.affected_carts(db, module_ids=[module.id]))
+    return _reload(db, models.Module, module.id, MODULE_LOAD)
 
 
 def delete_module(db: Session, module: models.Module) -> None:
+    cart_ids = pricing.affected_carts(db, module_ids=[module.id])
+    db.execute(delete(models.CartItem).where(models.CartItem.module_id == module.id))
+    pricing.refresh_cart_totals(db, cart_ids)
     db.delete(module)
+    cards.refresh_cards(db, "module", [module.id])
     db.commit()
+    cache.invalidate("modules")
 
 
 # ======================
@@ -180,21 +366,42 @@ def create_furniture(db: Session, furniture_in: schemas.FurnitureCreate) -> mode
         colors = db.execute(select(models.Color).where(models.Color.id.in_(color_ids))).scalars().all()
         furniture.colors.extend(colors)
     
+    cards.refresh_cards(db, "furniture", [furniture.id])
     db.commit()
-    db.refresh(furniture)
-    return furniture
+    cache.invalidate("furniture")
+    return _reload(db, models.Furniture, furniture.id, FURNITURE_LOAD)
 
 
-def get_furniture(db: Session, furniture_id: int) -> Optional[models.Furniture]:
-    return db.get(models.Furniture, furniture_id)
+def get_furniture(db: Session, furniture_id: int, options: tuple = FURNITURE_LOAD) -> Optional[models.Furniture]:
+    return db.get(models.Furniture, furniture_id, options=options)
 
 
-def list_furniture(db: Session, skip: int = 0, limit: int = 100, furniture_type: Optional[str] = None) -> Sequence[models.Furniture]:
-    stmt = select(models.Furniture)
+def _furniture_conditions(furniture_type: Optional[str], model: Optional[str], filters: Optional[CatalogFilters]) -> list:
+    conditions = _catalog_conditions(models.Furniture, FURNITURE_COLOR_LINK, filters)
     if furniture_type:
-        stmt = stmt.where(models.Furniture.furniture_type.ilike(f"%{furniture_type}%"))
-    stmt = stmt.offset(skip).limit(limit)
-    return db.execute(stmt).scalars().all()
+        conditions.append(models.Furniture.furniture_type.ilike(f"%{furniture_type}%"))
+    if model:
+        conditions.append(models.Furniture.model == model)
+    return conditions
+
+
+def select_furniture(skip: int = 0, limit: int = 100, furniture_type: Optional[str] = None, after: Optional[Cursor] = None, filters: Optional[CatalogFilters] = None, model: Optional[str] = None, options: tuple = FURNITURE_LOAD):
+    stmt = select(models.Furniture).options(*options).where(*_furniture_conditions(furniture_type, model, filters))
+    return _paginate(stmt, skip, limit, after, models.Furniture.id)
+
+
+def list_furniture(db: Session, skip: int = 0, limit: int = 100, furniture_type: Optional[str] = None, after: Optional[Cursor] = None, filters: Optional[CatalogFilters] = None, model: Optional[str] = None, options: tuple = FURNITURE_LOAD) -> Sequence[models.Furniture]:
+    return db.execute(select_furniture(skip, limit, furniture_type, after, filters, model, options)).scalars().all()
+
+
+def furniture_facets(db: Session, furniture_type: Optional[str] = None, model: Optional[str] = None, filters: Optional[CatalogFilters] = None) -> dict:
+    filters = filters or CatalogFilters()
+    if furniture_type is None and model is None and filters == CatalogFilters():
+        return cards.stored_facets(db, "furniture")
+    facets = _catalog_facets(db, models.Furniture, FURNITURE_COLOR_LINK, lambda f: _furniture_conditions(furniture_type, model, f), filters)
+    facets["furniture_types"] = _value_counts(db, models.Furniture.furniture_type, _furniture_conditions(None, model, filters))
+    facets["models"] = _value_counts(db, models.Furniture.model, _furniture_conditions(furniture_type, None, filters))
+    return facets
 
 
 def update_furniture(db: Session, furniture: models.Furniture, furniture_in: schemas.FurnitureUpdate) -> models.Furniture:
@@ -208,108 +415,273 @@ def update_furniture(db: Session, furniture: models.Furniture, furniture_in: sch
     if color_ids is not None:
         colors = db.execute(select(models.Color).where(models.Color.id.in_(color_ids))).scalars().all()
         furniture.colors = colors
+        furniture.updated_at = datetime.utcnow()  # связи не меняют строку, а ответ меняется
     
     db.add(furniture)
+    cards.refresh_cards(db, "furniture", [furniture.id])
     db.commit()
-    db.refresh(furniture)
-    return furniture
+    cache.invalidate("furniture")
+    return _reload(db, models.Furniture, furniture.id, FURNITURE_LOAD)
 
 
 def delete_furniture(db: Session, furniture: models.Furniture) -> None:
     db.delete(furniture)
+    cards.refresh_cards(db, "furniture", [furniture.id])
     db.commit()
+    cache.invalidate("furniture")
 
 
 # ======================
 # Cart CRUD
 # ======================
 
+def select_cart(user_id: int):
+    return select(models.Cart).where(models.Cart.user_id == user_id).options(*CART_LOAD)
+
+
+def _create_cart(db: Session, user_id: int) -> int:
+    cart = models.Cart(user_id=user_id)
+    db.add(cart)
+    db.commit()
+    return cart.id
+
+
 def get_or_create_cart(db: Session, user_id: int) -> models.Cart:
-    stmt = select(models.Cart).where(models.Cart.user_id == user_id)
-    cart = db.execute(stmt).scalars().first()
+    cart = db.execute(select_cart(user_id)).scalars().first()
     if not cart:
-        cart = models.Cart(user_id=user_id)
-        db.add(cart)
-        db.commit()
-        db.refresh(cart)
+        cart = _reload(db, models.Cart, _create_cart(db, user_id), CART_LOAD)
     return cart
 
 
+def get_or_create_cart_id(db: Session, user_id: int) -> int:
+    """Id of the user's cart, without loading its lines."""
+    cart_id = db.scalar(select(models.Cart.id).where(models.Cart.user_id == user_id).limit(1))
+    return cart_id if cart_id is not None else _create_cart(db, user_id)
+
+
+def unit_price_stmt(module_id: int, color_id: Optional[int] = None):
+    """Current price of one unit: discounted module price plus the color surcharge.
+
+    Returns no row when the module does not exist or the color is not offered for it.
+    """
+    price = effective_price(models.Module)
+    if color_id is None:
+        return select(price).where(models.Module.id == module_id)
+    return (
+        select(price + func.coalesce(models.Color.additional_price, 0))
+        .join(models.module_colors, models.module_colors.c.module_id == models.Module.id)
+        .join(models.Color, models.Color.id == models.module_colors.c.color_id)
+        .where(models.Module.id == module_id, models.Color.id == color_id)
+    )
+
+
+def cart_line_filter(cart_id: int, module_id: int, color_id: Optional[int]):
+    color = models.CartItem.color_id.is_(None) if color_id is None else models.CartItem.color_id == color_id
+    return and_(models.CartItem.cart_id == cart_id, models.CartItem.module_id == module_id, color)
+
+
+def upsert_cart_item_stmt(dialect_name: str, cart_id: int, module_id: int, color_id: Optional[int], quantity: int, unit_price: float):
+    """INSERT ... ON CONFLICT on the (cart, module, color) line adding to its quantity; None if the dialect has no upsert."""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    now = datetime.utcnow()
+    stmt = dialect_insert(models.CartItem).values(
+        cart_id=cart_id, module_id=module_id, color_id=color_id, quantity=quantity,
+        unit_price=unit_price, created_at=now, updated_at=now,
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=list(models.CART_ITEM_LINE),
+        set_={
+            "quantity": models.CartItem.quantity + stmt.excluded.quantity,
+            "unit_price": stmt.excluded.unit_price,
+            "updated_at": now,
+        },
+    )
+
+
+def add_cart_item(db: Session, user_id: int, module_id: int, color_id: Optional[int] = None, quantity: int = 1) -> Optional[models.Cart]:
+    """Add `quantity` units of a module (in a color) to the cart with one upsert.
+
+    Returns None when the color is not offered for the module.
+    """
+    unit_price = db.scalar(unit_price_stmt(module_id, color_id))
+    if unit_price is None:
+        return None
+    cart_id = get_or_create_cart_id(db, user_id)
+    stmt = upsert_cart_item_stmt(db.get_bind().dialect.name, cart_id, module_id, color_id, quantity, unit_price)
+    if stmt is not None:
+        db.execute(stmt)
+    else:
+        updated = db.execute(
+            update(models.CartItem)
+            .where(cart_line_filter(cart_id, module_id, color_id))
+            .values(quantity=models.CartItem.quantity + quantity, unit_price=unit_price)
+        )
+        if updated.rowcount == 0:
+            db.add(models.CartItem(cart_id=cart_id, module_id=module_id, color_id=color_id, quantity=quantity, unit_price=unit_price))
+            db.flush()
+    pricing.refresh_cart_totals(db, [cart_id])
+    db.commit()
+    return _reload(db, models.Cart, cart_id, CART_LOAD)
+
+
+def set_cart_item_quantity(db: Session, user_id: int, item_id: int, quantity: int) -> Optional[models.Cart]:
+    """Set a line's quantity (0 removes it); None if the line is not in the user's cart."""
+    cart_id = get_or_create_cart_id(db, user_id)
+    line = and_(models.CartItem.id == item_id, models.CartItem.cart_id == cart_id)
+    if quantity > 0:
+        result = db.execute(update(models.CartItem).where(line).values(quantity=quantity, updated_at=datetime.utcnow()))
+    else:
+        result = db.execute(delete(models.CartItem).where(line))
+    if result.rowcount == 0:
+        db.rollback()
+        return None
+    pricing.refresh_cart_totals(db, [cart_id])
+    db.commit()
+    return _reload(db, models.Cart, cart_id, CART_LOAD)
+
+
+def remove_cart_item(db: Session, user_id: int, item_id: int) -> Optional[models.Cart]:
+    return set_cart_item_quantity(db, user_id, item_id, 0)
+
+
+def remove_module_from_cart(db: Session, user_id: int, module_id: int, color_id: Optional[int] = None) -> models.Cart:
+    """Drop every line of a module (or only the line in `color_id`) from the cart."""
+    cart_id = get_or_create_cart_id(db, user_id)
+    stmt = delete(models.CartItem).where(models.CartItem.cart_id == cart_id, models.CartItem.module_id == module_id)
+    if color_id is not None:
+        stmt = stmt.where(models.CartItem.color_id == color_id)
+    db.execute(stmt)
+    pricing.refresh_cart_totals(db, [cart_id])
+    db.commit()
+    return _reload(db, models.Cart, cart_id, CART_LOAD)
+
+
 def update_cart(db: Session, cart: models.Cart, cart_in: schemas.CartUpdate) -> models.Cart:
     cart_data = cart_in.dict(exclude_unset=True)
-    module_ids = cart_data.pop('module_ids', None)
-    
+    items = cart_data.pop('items', None)
+
     for field, value in cart_data.items():
         setattr(cart, field, value)
-    
-    # Обновить связи с модулями если указано
-    if module_ids is not None:
-        modules = db.execute(select(models.Module).where(models.Module.id.in_(module_ids))).scalars().all()
-        cart.modules = modules
-    
     db.add(cart)
-    db.commit()
-    db.refresh(cart)
-    return cart
 
+    # Заменить содержимое корзины, если передано: одна выборка цен, один executemany
+    if items is not None:
+        db.execute(delete(models.CartItem).where(models.CartItem.cart_id == cart.id))
+        rows = _priced_cart_rows(db, cart.id, items)
+        if rows:
+            db.execute(insert(models.CartItem), rows)
+        db.flush()
+        pricing.refresh_cart_totals(db, [cart.id])
 
-def add_module_to_cart(db: Session, user_id: int, module_id: int) -> models.Cart:
-    cart = get_or_create_cart(db, user_id)
-    module = db.get(models.Module, module_id)
-    if module and module not in cart.modules:
-        cart.modules.append(module)
-        db.add(cart)
-        db.commit()
-        db.refresh(cart)
-    return cart
-
-
-def remove_module_from_cart(db: Session, user_id: int, module_id: int) -> models.Cart:
-    cart = get_or_create_cart(db, user_id)
-    module = db.get(models.Module, module_id)
-    if module and module in cart.modules:
-        cart.modules.remove(module)
-        db.add(cart)
-        db.commit()
-        db.refresh(cart)
-    return cart
+    db.commit()
+    return _reload(db, models.Cart, cart.id, CART_LOAD)
+
+
+def _priced_cart_rows(db: Session, cart_id: int, items: List[dict]) -> List[dict]:
+    """Merge duplicate lines and snapshot unit prices; lines with unknown modules or colors are skipped."""
+    quantities: dict = {}
+    for item in items:
+        key = (item["module_id"], item.get("color_id"))
+        quantities[key] = quantities.get(key, 0) + item.get("quantity", 1)
+    module_ids = {module_id for module_id, _ in quantities}
+    prices = dict(db.execute(select(models.Module.id, effective_price(models.Module)).where(models.Module.id.in_(module_ids))).all())
+    offered = {
+        (module_id, color_id): additional or 0
+        for module_id, color_id, additional in db.execute(
+            select(models.module_colors.c.module_id, models.Color.id, models.Color.additional_price)
+            .join(models.Color, models.Color.id == models.module_colors.c.color_id)
+            .where(models.module_colors.c.module_id.in_(module_ids))
+        )
+    }
+    now = datetime.utcnow()
+    rows = []
+    for (module_id, color_id), quantity in quantities.items():
+        if module_id not in prices or (color_id is not None and (module_id, color_id) not in offered):
+            continue
+        surcharge = offered.get((module_id, color_id), 0) if color_id is not None else 0
+        rows.append({
+            "cart_id": cart_id, "module_id": module_id, "color_id": color_id, "quantity": quantity,
+            "unit_price": prices[module_id] + surcharge, "created_at": now, "updated_at": now,
+        })
+    return rows
 
 
 # ======================
 # Order CRUD
 # ======================
 
-def create_order(db: Session, order_in: schemas.OrderCreate) -> models.Order:
-    order_data = order_in.dict()
-    module_ids = order_data.pop('module_ids', [])
-    
-    order = models.Order(**order_data)
-    db.add(order)
-    db.flush()  # получить ID заказа
-    
-    # Добавить связи с модулями
-    if module_ids:
-        modules = db.execute(select(models.Module).where(models.Module.id.in_(module_ids))).scalars().all()
-        order.modules.extend(modules)
-    
+def create_order(db: Session, order_in: schemas.OrderCreate, modules: Optional[Sequence[models.Module]] = None) -> models.Order:
+    """Insert the order and its module links; `modules` are the already validated order modules.
+
+    The order row comes back from INSERT ... RETURNING and the links go in with
+    one executemany, so the response is built from what was written without a
+    reload.
+    """
+    order_data = order_in.dict(exclude={"module_ids"})
+    if modules is None:
+        modules = get_modules(db, order_in.module_ids or [])
+    lines = module_lines(modules)
+    order_data["total_amount"] = lines_total(lines)
+    order = insert_order(db, order_data, modules, lines)
+
+    # detached objects are not expired by the commit, so serializing them costs no query
+    detach_order(db, order)
     db.commit()
-    db.refresh(order)
+    return order
+
+
+def detach_order(db: Session, order: models.Order) -> None:
+    """Expunge the order and the rows it is serialized with (lines, modules, their loaded colors), nothing else."""
+    rows = [order, *order.items]
+    for module in order.modules:
+        rows.append(module)
+        rows.extend(module.__dict__.get("colors", ()))  # only what is loaded: no lazy load here
+    for row in rows:
+        if row in db:
+            db.expunge(row)
+
+
+def module_lines(modules: Sequence[models.Module]) -> List[dict]:
+    """Order lines of a plain module list: one unit of each, no color, at the current price."""
+    return [{"module_id": module.id, "color_id": None, "quantity": 1, "unit_price": pricing.unit_price(module)} for module in modules]
+
+
+def lines_total(lines: Sequence[dict]) -> float:
+    return sum(line["quantity"] * line["unit_price"] for line in lines)
+
+
+def insert_order(db: Session, order_data: dict, modules: Sequence[models.Module], lines: Sequence[dict]) -> models.Order:
+    """INSERT ... RETURNING the order, then one executemany each for its module links and lines; the caller commits."""
+    order = db.scalars(insert(models.Order).values(**order_data).returning(models.Order)).one()
+    if modules:
+        db.execute(insert(models.order_modules), [{"order_id": order.id, "module_id": module.id} for module in modules])
+    items = []
+    if lines:
+        stmt = insert(models.OrderItem).returning(models.OrderItem, sort_by_parameter_order=True)
+        items = list(db.scalars(stmt, [{**line, "order_id": order.id} for line in lines]))
+    set_committed_value(order, "modules", list(modules))
+    set_committed_value(order, "items", items)
     return order
 
 
 def get_order(db: Session, order_id: int) -> Optional[models.Order]:
-    return db.get(models.Order, order_id)
+    return db.get(models.Order, order_id, options=ORDER_LOAD)
 
 
-def list_orders(db: Session, user_id: Optional[int] = None, skip: int = 0, limit: int = 100) -> Sequence[models.Order]:
-    stmt = select(models.Order)
+def list_orders(db: Session, user_id: Optional[int] = None, skip: int = 0, limit: int = 100, after: Optional[Cursor] = None) -> Sequence[models.Order]:
+    stmt = select(models.Order).options(*ORDER_LOAD)
     if user_id is not None:
         stmt = stmt.where(models.Order.user_id == user_id)
-    stmt = stmt.order_by(models.Order.created_at.desc()).offset(skip).limit(limit)
+    stmt = _paginate(stmt, skip, limit, after, models.Order.id, models.Order.created_at)
     return db.execute(stmt).scalars().all()
 
 
-def update_order(db: Session, order: models.Order, order_in: schemas.OrderUpdate) -> models.Order:
+def update_order(db: Session, order: models.Order, order_in: schemas.OrderUpdate, modules: Optional[Sequence[models.Module]] = None) -> models.Order:
     order_data = order_in.dict(exclude_unset=True)
     module_ids = order_data.pop('module_ids', None)
     
@@ -318,13 +690,18 @@ def update_order(db: Session, order: models.Order, order_in: schemas.OrderUpdate
     
     # Обновить связи с модулями если указано
     if module_ids is not None:
-        modules = db.execute(select(models.Module).where(models.Module.id.in_(module_ids))).scalars().all()
-        order.modules = modules
+        if modules is None:
+            modules = get_modules(db, module_ids)
+        order.modules = list(modules)
+        lines = module_lines(modules)
+        order.items = [models.OrderItem(**line) for line in lines]
+        order.total_amount = lines_total(lines)
+        # смена состава не трогает колонки заказа: без этого ETag не изменится
+        order.updated_at = datetime.utcnow()
     
     db.add(order)
     db.commit()
-    db.refresh(order)
-    return order
+    return _reload(db, models.Order, order.id, ORDER_LOAD)
 
 
 def delete_order(db: Session, order: models.Order) -> None:
@@ -348,9 +725,12 @@ def get_news(db: Session, news_id: int) -> Optional[models.News]:
     return db.get(models.News, news_id)
 
 
-def list_news(db: Session, skip: int = 0, limit: int = 100) -> Sequence[models.News]:
-    stmt = select(models.News).order_by(models.News.created_at.desc()).offset(skip).limit(limit)
-    return db.execute(stmt).scalars().all()
+def select_news(skip: int = 0, limit: int = 100, after: Optional[Cursor] = None):
+    return _paginate(select(models.News), skip, limit, after, models.News.id, models.News.created_at)
+
+
+def list_news(db: Session, skip: int = 0, limit: int = 100, after: Optional[Cursor] = None) -> Sequence[models.News]:
+    return db.execute(select_news(skip, limit, after)).scalars().all()
 
 
 def update_news(db: Session, news: models.News, news_in: schemas.NewsUpdate) -> models.News:
@@ -383,11 +763,11 @@ def get_support_request(db: Session, request_id: int) -> Optional[models.Support
     return db.get(models.SupportRequest, request_id)
 
 
-def list_support_requests(db: Session, skip: int = 0, limit: int = 100, status: Optional[str] = None) -> Sequence[models.SupportRequest]:
+def list_support_requests(db: Session, skip: int = 0, limit: int = 100, status: Optional[str] = None, after: Optional[Cursor] = None) -> Sequence[models.SupportRequest]:
     stmt = select(models.SupportRequest)
     if status:
         stmt = stmt.where(models.SupportRequest.status == status)
-    stmt = stmt.order_by(models.SupportRequest.created_at.desc()).offset(skip).limit(limit)
+    stmt = _paginate(stmt, skip, limit, after, models.SupportRequest.id, models.SupportRequest.created_at)
     return db.execute(stmt).scalars().all()
 
 
@@ -413,6 +793,7 @@ def create_shop(db: Session, shop_in: schemas.ShopCreate) -> models.Shop:
     shop = models.Shop(**shop_in.dict())
     db.add(shop)
     db.commit()
+    cache.invalidate("shops")
     db.refresh(shop)
     return shop
 
@@ -421,12 +802,15 @@ def get_shop(db: Session, shop_id: int) -> Optional[models.Shop]:
     return db.get(models.Shop, shop_id)
 
 
-def list_shops(db: Session, skip: int = 0, limit: int = 100, city: Optional[str] = None) -> Sequence[models.Shop]:
+def select_shops(skip: int = 0, limit: int = 100, city: Optional[str] = None):
     stmt = select(models.Shop)
     if city:
         stmt = stmt.where(models.Shop.city.ilike(f"%{city}%"))
-    stmt = stmt.offset(skip).limit(limit)
-    return db.execute(stmt).scalars().all()
+    return stmt.offset(skip).limit(limit)
+
+
+def list_shops(db: Session, skip: int = 0, limit: int = 100, city: Optional[str] = None) -> Sequence[models.Shop]:
+    return db.execute(select_shops(skip, limit, city)).scalars().all()
 
 
 def update_shop(db: Session, shop: models.Shop, shop_in: schemas.ShopUpdate) -> models.Shop:
@@ -434,6 +818,7 @@ def update_shop(db: Session, shop: models.Shop, shop_in: schemas.ShopUpdate) ->
         setattr(shop, field, value)
     db.add(shop)
     db.commit()
+    cache.invalidate("shops")
     db.refresh(shop)
     return shop
 
@@ -441,6 +826,7 @@ def update_shop(db: Session, shop: models.Shop, shop_in: schemas.ShopUpdate) ->
 def delete_shop(db: Session, shop: models.Shop) -> None:
     db.delete(shop)
     db.commit()
+    cache.invalidate("shops")
 
 
 # ======================
@@ -451,6 +837,7 @@ def create_where_to_buy(db: Session, where_to_buy_in: schemas.WhereToBuyCreate)
     where_to_buy = models.WhereToBuy(**where_to_buy_in.dict())
     db.add(where_to_buy)
     db.commit()
+    cache.invalidate("where_to_buy")
     db.refresh(where_to_buy)
     return where_to_buy
 
@@ -459,12 +846,15 @@ def get_where_to_buy(db: Session, where_to_buy_id: int) -> Optional[models.Where
     return db.get(models.WhereToBuy, where_to_buy_id)
 
 
-def list_where_to_buy(db: Session, skip: int = 0, limit: int = 100, location: Optional[str] = None) -> Sequence[models.WhereToBuy]:
+def select_where_to_buy(skip: int = 0, limit: int = 100, location: Optional[str] = None):
     stmt = select(models.WhereToBuy)
     if location:
         stmt = stmt.where(models.WhereToBuy.location.ilike(f"%{location}%"))
-    stmt = stmt.offset(skip).limit(limit)
-    return db.execute(stmt).scalars().all()
+    return stmt.offset(skip).limit(limit)
+
+
+def list_where_to_buy(db: Session, skip: int = 0, limit: int = 100, location: Optional[str] = None) -> Sequence[models.WhereToBuy]:
+    return db.execute(select_where_to_buy(skip, limit, location)).scalars().all()
 
 
 def update_where_to_buy(db: Session, where_to_buy: models.WhereToBuy, where_to_buy_in: schemas.WhereToBuyUpdate) -> models.WhereToBuy:
@@ -472,10 +862,12 @@ def update_where_to_buy(db: Session, where_to_buy: models.WhereToBuy, where_to_b
         setattr(where_to_buy, field, value)
     db.add(where_to_buy)
     db.commit()
+    cache.invalidate("where_to_buy")
     db.refresh(where_to_buy)
     return where_to_buy
 
 
 def delete_where_to_buy(db: Session, where_to_buy: models.WhereToBuy) -> None:
     db.delete(where_to_buy)
-    db.commit()
\ No newline at end of file
+    db.commit()
+    cache.invalidate("where_to_buy")
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from typing import Optional, Sequence
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import cards, crud, models, pricing
+from .crud import (
+    CART_LOAD,
+    FURNITURE_LOAD,
+    MODULE_LOAD,
+    cart_line_filter,
+    select_cart,
+    select_colors,
+    select_furniture,
+    select_modules,
+    select_news,
+    select_shops,
+    select_where_to_buy,
+    unit_price_stmt,
+    upsert_cart_item_stmt,
+)
+from .filters import CatalogFilters
+from .pagination import Cursor
+
+
+# Async counterparts of the crud.py read paths and cart writes used by the
+# DB_ASYNC routes. Statements are shared with crud.py so both modes run the
+# same SQL with the same eager-loading profiles.
+
+
+async def _reload(db: AsyncSession, model, obj_id: int, options):
+    return await db.get(model, obj_id, options=options, populate_existing=True)
+
+
+# ======================
+# User
+# ======================
+
+async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[models.User]:
+    return await db.get(models.User, user_id)
+
+
+# ======================
+# Catalog
+# ======================
+
+async def get_color(db: AsyncSession, color_id: int) -> Optional[models.Color]:
+    return await db.get(models.Color, color_id)
+
+
+async def list_colors(db: AsyncSession, skip: int = 0, limit: int = 100) -> Sequence[models.Color]:
+    return (await db.execute(select_colors(skip, limit))).scalars().all()
+
+
+async def get_module(db: AsyncSession, module_id: int, options: tuple = MODULE_LOAD) -> Optional[models.Module]:
+    return await db.get(models.Module, module_id, options=options)
+
+
+async def list_modules(db: AsyncSession, skip: int = 0, limit: int = 100, name: Optional[str] = None, after: Optional[Cursor] = None, filters: Optional[CatalogFilters] = None, options: tuple = MODULE_LOAD) -> Sequence[models.Module]:
+    return (await db.execute(select_modules(skip, limit, name, after, filters, options))).scalars().all()
+
+
+async def module_facets(db: AsyncSession, name: Optional[str] = None, filters: Optional[CatalogFilters] = None) -> dict:
+    return await db.run_sync(crud.module_facets, name, filters)
+
+
+async def get_furniture(db: AsyncSession, furniture_id: int, options: tuple = FURNITURE_LOAD) -> Optional[models.Furniture]:
+    return await db.get(models.Furniture, furniture_id, options=options)
+
+
+async def list_furniture(db: AsyncSession, skip: int = 0, limit: int = 100, furniture_type: Optional[str] = None, after: Optional[Cursor] = None, filters: Optional[CatalogFilters] = None, model: Optional[str] = None, options: tuple = FURNITURE_LOAD) -> Sequence[models.Furniture]:
+    return (await db.execute(select_furniture(skip, limit, furniture_type, after, filters, model, options))).scalars().all()
+
+
+async def furniture_facets(db: AsyncSession, furniture_type: Optional[str] = None, model: Optional[str] = None, filters: Optional[CatalogFilters] = None) -> dict:
+    return await db.run_sync(crud.furniture_facets, furniture_type, model, filters)
+
+
+async def list_cards(db: AsyncSession, kind: str, skip: int = 0, limit: int = 100, after: Optional[Cursor] = None, furniture_type: Optional[str] = None) -> Sequence[models.CatalogCard]:
+    return (await db.execute(cards.select_cards(kind, skip, limit, after, furniture_type))).scalars().all()
+
+
+async def get_news(db: AsyncSession, news_id: int) -> Optional[models.News]:
+    return await db.get(models.News, news_id)
+
+
+async def list_news(db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[Cursor] = None) -> Sequence[models.News]:
+    return (await db.execute(select_news(skip, limit, after))).scalars().all()
+
+
+async def get_shop(db: AsyncSession, shop_id: int) -> Optional[models.Shop]:
+    return await db.get(models.Shop, shop_id)
+
+
+async def list_shops(db: AsyncSession, skip: int = 0, limit: int = 100, city: Optional[str] = None) -> Sequence[models.Shop]:
+    return (await db.execute(select_shops(skip, limit, city))).scalars().all()
+
+
+async def get_where_to_buy(db: AsyncSession, where_to_buy_id: int) -> Optional[models.WhereToBuy]:
+    return await db.get(models.WhereToBuy, where_to_buy_id)
+
+
+async def list_where_to_buy(db: AsyncSession, skip: int = 0, limit: int = 100, location: Optional[str] = None) -> Sequence[models.WhereToBuy]:
+    return (await db.execute(select_where_to_buy(skip, limit, location))).scalars().all()
+
+
+# ======================
+# Cart
+# ======================
+
+async def _create_cart(db: AsyncSession, user_id: int) -> int:
+    cart = models.Cart(user_id=user_id)
+    db.add(cart)
+    await db.commit()
+    return cart.id
+
+
+async def get_or_create_cart(db: AsyncSession, user_id: int) -> models.Cart:
+    cart = (await db.execute(select_cart(user_id))).scalars().first()
+    if not cart:
+        cart = await _reload(db, models.Cart, await _create_cart(db, user_id), CART_LOAD)
+    return cart
+
+
+async def get_or_create_cart_id(db: AsyncSession, user_id: int) -> int:
+    cart_id = await db.scalar(select(models.Cart.id).where(models.Cart.user_id == user_id).limit(1))
+    return cart_id if cart_id is not None else await _create_cart(db, user_id)
+
+
+async def add_cart_item(db: AsyncSession, user_id: int, module_id: int, color_id: Optional[int] = None, quantity: int = 1) -> Optional[models.Cart]:
+    unit_price = await db.scalar(unit_price_stmt(module_id, color_id))
+    if unit_price is None:
+        return None
+    cart_id = await get_or_create_cart_id(db, user_id)
+    stmt = upsert_cart_item_stmt(db.get_bind().dialect.name, cart_id, module_id, color_id, quantity, unit_price)
+    if stmt is not None:
+        await db.execute(stmt)
+    else:
+        updated = await db.execute(
+            update(models.CartItem)
+            .where(cart_line_filter(cart_id, module_id, color_id))
+            .values(quantity=models.CartItem.quantity + quantity, unit_price=unit_price)
+        )
+        if updated.rowcount == 0:
+            db.add(models.CartItem(cart_id=cart_id, module_id=module_id, color_id=color_id, quantity=quantity, unit_price=unit_price))
+            await db.flush()
+    await db.execute(pricing.refresh_cart_totals_stmt([cart_id]))
+    await db.commit()
+    return await _reload(db, models.Cart, cart_id, CART_LOAD)
+
+
+async def remove_module_from_cart(db: AsyncSession, user_id: int, module_id: int, color_id: Optional[int] = None) -> models.Cart:
+    cart_id = await get_or_create_cart_id(db, user_id)
+    stmt = delete(models.CartItem).where(models.CartItem.cart_id == cart_id, models.CartItem.module_id == module_id)
+    if color_id is not None:
+        stmt = stmt.where(models.CartItem.color_id == color_id)
+    await db.execute(stmt)
+    await db.execute(pricing.refresh_cart_totals_stmt([cart_id]))
+    await db.commit()
+    return await _reload(db, models.Cart, cart_id, CART_LOAD)
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import JSON, Boolean, DateTime, Float, Integer, select
+
+from . import models
+from .database import SessionLocal
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional: Parquet export is unavailable without it
+    pa = None
+    pq = None
+
+
+# Rows fetched per round trip from the server-side cursor (and per Parquet row group)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Exported tables; every column of the table, in declaration order
+ENTITIES = {
+    "orders": models.Order,
+    "modules": models.Module,
+    "furniture": models.Furniture,
+    "support": models.SupportRequest,
+}
+
+
+def parquet_available() -> bool:
+    return pa is not None
+
+
+def _columns(model) -> List[Any]:
+    return list(model.__table__.columns)
+
+
+def _rows(model, since: Optional[datetime]) -> Iterator[Sequence[Any]]:
+    """Yield row batches through a server-side cursor, on a session owned by the generator.
+
+    The request's own session is closed by the time a streaming body is sent,
+    so the export opens (and always closes) its own.
+    """
+    stmt = select(*_columns(model)).order_by(model.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    if since is not None:
+        stmt = stmt.where(model.created_at >= since)
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt)
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+def _plain(value: Any, column) -> Any:
+    if value is None:
+        return None
+    if isinstance(column.type, JSON):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _csv(model, batches: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    columns = _columns(model)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in columns])
+    for batch in batches:
+        writer.writerows([[_plain(value, column) for value, column in zip(row, columns)] for row in batch])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _ndjson(model, batches: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    columns = _columns(model)
+    for batch in batches:
+        lines = []
+        for row in batch:
+            record = {column.name: value for column, value in zip(columns, row)}
+            lines.append(json.dumps(record, ensure_ascii=False, default=_json_default))
+        yield ("\n".join(lines) + "\n").encode()
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file handing out what was written since the last drain; keeps the absolute position for tell()."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_type(column):
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us")
+    return pa.string()
+
+
+def _parquet(model, batches: Iterable[Sequence[Any]], compression: str) -> Iterator[bytes]:
+    columns = _columns(model)
+    schema = pa.schema([(column.name, _arrow_type(column)) for column in columns])
+    sink = _ChunkSink()
+    # one row group per batch, flushed to the client as soon as it is written
+    with pq.ParquetWriter(sink, schema, compression=compression) as writer:
+        for batch in batches:
+            data = {
+                column.name: [json.dumps(row[i], ensure_ascii=False) if row[i] is not None and isinstance(column.type, JSON) else row[i] for row in batch]
+                for i, column in enumerate(columns)
+            }
+            writer.write_table(pa.Table.from_pydict(data, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_export(entity: str, fmt: str, gzip: bool = False, since: Optional[datetime] = None) -> Iterator[bytes]:
+    """Body of an export download; memory use is bounded by one batch whatever the table size."""
+    model = ENTITIES[entity]
+    batches = _rows(model, since)
+    if fmt == "parquet":
+        # Parquet compresses its own column chunks
+        return _parquet(model, batches, "gzip" if gzip else "snappy")
+    writers: Dict[str, Callable[[Any, Iterable[Sequence[Any]]], Iterator[bytes]]] = {"csv": _csv, "ndjson": _ndjson}
+    chunks = writers[fmt](model, batches)
+    return _gzip(chunks) if gzip else chunks
+
+
+def export_filename(entity: str, fmt: str, gzip: bool = False) -> str:
+    name = f"{entity}-{datetime.utcnow():%Y%m%d-%H%M%S}.{FORMATS[fmt][1]}"
+    return f"{name}.gz" if gzip and fmt != "parquet" else name
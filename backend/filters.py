@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import os
+from typing import List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, Query
+
+
+# Upper bounds of the price facet buckets; the last bucket is open-ended
+FACET_PRICE_BUCKETS = tuple(
+    float(edge) for edge in os.getenv("FACET_PRICE_BUCKETS", "5000,10000,25000,50000,100000").split(",") if edge.strip()
+)
+
+
+class CatalogFilters(NamedTuple):
+    """Price and color filters shared by module and furniture listings and facets."""
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    color_ids: Tuple[int, ...] = ()
+
+    def without(self, *fields: str) -> "CatalogFilters":
+        """The same filters minus one facet, so that facet still counts its other values."""
+        return self._replace(**{field: self._field_defaults[field] for field in fields})
+
+
+def catalog_filters(
+    price_min: Optional[float] = Query(None, ge=0, description="Минимальная цена (с учетом скидки)"),
+    price_max: Optional[float] = Query(None, ge=0, description="Максимальная цена (с учетом скидки)"),
+    color_ids: Optional[List[int]] = Query(None, description="ID цветов (любой из)"),
+) -> CatalogFilters:
+    if price_min is not None and price_max is not None and price_min > price_max:
+        raise HTTPException(status_code=400, detail="price_min больше price_max")
+    return CatalogFilters(price_min, price_max, tuple(sorted(set(color_ids or ()))))
+
+
+def price_buckets() -> List[Tuple[float, Optional[float]]]:
+    """(min, max) pairs of the price facet; max is None for the last bucket."""
+    edges = (0.0,) + FACET_PRICE_BUCKETS
+    return [(low, high) for low, high in zip(edges, edges[1:])] + [(edges[-1], None)]
@@ -0,0 +1,158 @@
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Set
+
+from .cache import TTLCache
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional: without it originals are served as-is
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Derivative sizes (longest side, px); images are never upscaled
+VARIANTS = {"thumb": 320, "card": 800, "full": 1920}
+# Preferred derivative format; falls back to WebP, then JPEG, when Pillow can't encode it
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "webp").upper()
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+# Digests remembered as ready or failed; an evicted one costs one more disk check
+IMAGE_STATE_TTL = float(os.getenv("IMAGE_STATE_TTL", str(24 * 3600)))
+IMAGE_STATE_MAX_ENTRIES = int(os.getenv("IMAGE_STATE_MAX_ENTRIES", "100000"))
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp", ".tif", ".tiff", ".avif"}
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _derivative_format() -> Optional[str]:
+    if Image is None:
+        return None
+    Image.init()
+    for fmt in (IMAGE_FORMAT, "WEBP", "JPEG"):
+        if fmt in Image.SAVE:
+            return fmt
+    return None
+
+
+class ImageStore:
+    """Content-addressed image originals with resized derivatives.
+
+    Layout under `root`: `<sha256><ext>` for the original and
+    `<sha256>/<variant>.<fmt>` for each entry of VARIANTS. Derivatives are
+    rendered on a background pool; until they exist, `variants()` points
+    every size at the original.
+
+    Each digest is looked up on disk at most once per process: it is then
+    known as ready, pending (scheduled, not finished) or failed (not a
+    decodable image), and `variants()` answers from memory. A digest seen
+    with missing derivatives (an older upload, a dedupe hit after a crash)
+    is scheduled again. Only `<sha256><image ext>` names are looked at: any
+    other stored URL is served as-is and never reaches the filesystem.
+    """
+
+    def __init__(self, root: str, url_prefix: str, on_ready: Optional[Callable[[str], None]] = None):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip("/") + "/"
+        self.on_ready = on_ready
+        self.format = _derivative_format()
+        self.suffix = {"JPEG": "jpg"}.get(self.format, (self.format or "").lower())
+        self._ready = TTLCache(ttl=IMAGE_STATE_TTL, max_entries=IMAGE_STATE_MAX_ENTRIES)  # digest -> variant URLs
+        self._failed = TTLCache(ttl=IMAGE_STATE_TTL, max_entries=IMAGE_STATE_MAX_ENTRIES)  # digest -> True
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="images")
+
+    def accepts(self, ext: str) -> bool:
+        return ext.lower() in IMAGE_EXTENSIONS
+
+    def _valid(self, digest: str, ext: str) -> bool:
+        return bool(_DIGEST_RE.match(digest)) and ext in IMAGE_EXTENSIONS
+
+    def _known(self, digest: str) -> bool:
+        return digest in self._pending or self._ready.get(digest) is not None or self._failed.get(digest) is not None
+
+    def original_path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.root, f"{digest}{ext}")
+
+    def original_url(self, digest: str, ext: str) -> str:
+        return f"{self.url_prefix}{digest}{ext}"
+
+    def _derivative_path(self, digest: str, variant: str) -> str:
+        return os.path.join(self.root, digest, f"{variant}.{self.suffix}")
+
+    def _derivative_url(self, digest: str, variant: str) -> str:
+        return f"{self.url_prefix}{digest}/{variant}.{self.suffix}"
+
+    def _ready_urls(self, digest: str, ext: str) -> Dict[str, str]:
+        return {"original": self.original_url(digest, ext), **{variant: self._derivative_url(digest, variant) for variant in VARIANTS}}
+
+    def schedule_derivatives(self, digest: str, ext: str) -> None:
+        if self.format is None or not self._valid(digest, ext):
+            return
+        with self._lock:
+            if self._known(digest):
+                return
+            self._pending.add(digest)
+        self._executor.submit(self._generate, digest, ext)
+
+    def ensure_derivatives(self, digest: str, ext: str) -> None:
+        """Mark the digest ready when its derivatives are on disk, otherwise (re)schedule them."""
+        if self.format is None or not self._valid(digest, ext):
+            return
+        with self._lock:
+            if self._known(digest):
+                return
+        if all(os.path.exists(self._derivative_path(digest, variant)) for variant in VARIANTS):
+            self._ready.set(digest, self._ready_urls(digest, ext))
+            return
+        self.schedule_derivatives(digest, ext)
+
+    def _generate(self, digest: str, ext: str) -> None:
+        try:
+            with Image.open(self.original_path(digest, ext)) as source:
+                source.load()
+                os.makedirs(os.path.join(self.root, digest), exist_ok=True)
+                if self.format == "JPEG" or source.mode not in ("RGB", "RGBA"):
+                    source = source.convert("RGB" if self.format == "JPEG" else "RGBA")
+                for variant, size in VARIANTS.items():
+                    target = self._derivative_path(digest, variant)
+                    if os.path.exists(target):
+                        continue
+                    resized = source.copy()
+                    resized.thumbnail((size, size))
+                    tmp_path = f"{target}.tmp"
+                    resized.save(tmp_path, format=self.format, quality=IMAGE_QUALITY)
+                    os.replace(tmp_path, target)
+        except Exception:
+            logger.exception("Failed to build derivatives for %s%s", digest, ext)
+            self._failed.set(digest, True)  # served as the original from now on, without disk checks
+            with self._lock:
+                self._pending.discard(digest)
+            return
+        self._ready.set(digest, self._ready_urls(digest, ext))
+        try:
+            if self.on_ready is not None:
+                self.on_ready(digest)  # after `_ready`: responses built past this point carry the new URLs
+        except Exception:
+            logger.exception("on_ready failed for %s%s", digest, ext)
+        finally:
+            with self._lock:
+                self._pending.discard(digest)
+
+    def variants(self, url: str) -> Dict[str, str]:
+        """URLs of every derivative size of a stored photo URL, falling back to the URL itself."""
+        fallback = {"original": url, **{variant: url for variant in VARIANTS}}
+        if not url or not url.startswith(self.url_prefix) or self.format is None:
+            return fallback
+        digest, ext = os.path.splitext(url[len(self.url_prefix):])
+        if not self._valid(digest, ext):
+            return fallback
+        ready = self._ready.get(digest)
+        if ready is None:
+            self.ensure_derivatives(digest, ext)
+            ready = self._ready.get(digest)
+        return fallback if ready is None else ready
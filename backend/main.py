@@ -1,5 +1,4 @@
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from fastapi import Depends, FastAPI
 from fastapi.openapi.utils import get_openapi
 from .api.routers.users import router as users_router
 from .api.routers.orders import router as orders_router
@@ -12,20 +11,48 @@ from .api.routers.news import router as news_router
 from .api.routers.support import router as support_router
 from .api.routers.shops import router as shops_router
 from .api.routers.where_to_buy import router as where_to_buy_router
-from .database import init_db
+from .api.routers.search import router as search_router
+from .api.routers.export import router as export_router
+from .api.routers.internal import router as internal_router
+from .api.routers.catalog_async import router as catalog_async_router
+from .auth import AuthContext, require_access
+from .compression import CompressionMiddleware
+from .database import init_db, DB_ASYNC, engine, async_engine, pool_status
+from .metrics import MetricsMiddleware, instrument_engine, metrics_response
+from .security import shutdown_password_pool
+from .static import UploadsStaticFiles
+from .uploads import UPLOAD_DIR, image_store
 import os
 
 app = FastAPI()
 
+# Сжатие ответов (zstd/br/gzip по Accept-Encoding); метрики подключаются снаружи и учитывают его время
+app.add_middleware(CompressionMiddleware)
+
+# Метрики: время ответа, число SQL-запросов и время в БД по маршрутам (/metrics)
+instrument_engine(engine)
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine)
+app.add_middleware(MetricsMiddleware)
+
 # Создание таблиц при запуске
 @app.on_event("startup")
 def on_startup():
     init_db()
 
+
+@app.on_event("shutdown")
+def on_shutdown():
+    shutdown_password_pool()
+
 # Static uploads
-uploads_path = os.path.join(os.path.dirname(__file__), "uploads")
+uploads_path = UPLOAD_DIR
 os.makedirs(uploads_path, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=uploads_path), name="uploads")
+app.mount("/uploads", UploadsStaticFiles(directory=uploads_path, image_store=image_store), name="uploads")
+
+# Async-версии чтения каталога и корзины регистрируются первыми, чтобы перекрыть sync-маршруты
+if DB_ASYNC:
+    app.include_router(catalog_async_router, prefix="/api")
 
 # Подключение роутеров по доменам
 app.include_router(auth_router, prefix="/api")
@@ -39,6 +66,15 @@ app.include_router(news_router, prefix="/api")
 app.include_router(support_router, prefix="/api")
 app.include_router(shops_router, prefix="/api")
 app.include_router(where_to_buy_router, prefix="/api")
+app.include_router(search_router, prefix="/api")
+app.include_router(export_router, prefix="/api")
+app.include_router(internal_router, prefix="/api")
+
+
+# Метрики (включая пул соединений) доступны тем же пользователям, что и /api/internal/*
+@app.get("/metrics", include_in_schema=False)
+def metrics(ctx: AuthContext = Depends(require_access(3))):
+    return metrics_response(pool_status())
 
 
 @app.get("/")
@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+# Per-request instrumentation: an ASGI middleware opens a RequestStats for each
+# HTTP request and SQLAlchemy cursor hooks add every statement the request
+# runs to it (the context variable follows the request into the threadpool
+# and into async sessions). Totals are kept per route template and exported
+# on /metrics in the Prometheus text format.
+
+# Budgets: a request over either one is logged with its statement fingerprints (0 disables)
+METRICS_QUERY_BUDGET = int(os.getenv("METRICS_QUERY_BUDGET", "30"))
+METRICS_LATENCY_BUDGET_MS = float(os.getenv("METRICS_LATENCY_BUDGET_MS", "500"))
+# Fingerprints listed in a budget warning, most frequent first
+METRICS_WARN_STATEMENTS = int(os.getenv("METRICS_WARN_STATEMENTS", "10"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Requests that matched no route (404s, mounted static files) share one label
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "rows", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.statements: Counter = Counter()
+
+    def observe(self, statement: str, seconds: float, rowcount: int) -> None:
+        self.queries += 1
+        self.db_seconds += seconds
+        if rowcount > 0:  # -1 when the driver does not report it (SQLite SELECTs)
+            self.rows += rowcount
+        self.statements[statement] += 1
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PARAM_RE = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+|\?")
+_PARAM_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Statement with literals and bind parameters replaced by ?, IN lists folded."""
+    text = _LITERAL_RE.sub("?", statement)
+    text = _PARAM_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _PARAM_LIST_RE.sub("(?, ...)", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class _RouteStats:
+    __slots__ = ("latency", "queries", "db_seconds", "rows", "statuses")
+
+    def __init__(self):
+        self.latency = _Histogram(LATENCY_BUCKETS)
+        self.queries = _Histogram(QUERY_COUNT_BUCKETS)
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.statuses: Counter = Counter()
+
+
+class MetricsRegistry:
+    """Per-route totals since process start (each worker process exports its own)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str], _RouteStats] = {}
+
+    def record(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        with self._lock:
+            entry = self._routes.get((method, route))
+            if entry is None:
+                entry = self._routes[(method, route)] = _RouteStats()
+            entry.latency.observe(seconds)
+            entry.queries.observe(stats.queries)
+            entry.db_seconds += stats.db_seconds
+            entry.rows += stats.rows
+            entry.statuses[status] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+    def render(self) -> str:
+        """Prometheus text exposition format 0.0.4."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines: List[str] = []
+            _family(lines, "http_requests_total", "counter", "Requests by route and status.")
+            for (method, route), entry in routes:
+                for status, count in sorted(entry.statuses.items()):
+                    lines.append(f"http_requests_total{_labels(method, route, status=status)} {count}")
+            _family(lines, "http_request_duration_seconds", "histogram", "Request latency, until the response body is sent.")
+            for (method, route), entry in routes:
+                _histogram(lines, "http_request_duration_seconds", method, route, entry.latency)
+            _family(lines, "http_request_db_queries", "histogram", "SQL statements executed per request.")
+            for (method, route), entry in routes:
+                _histogram(lines, "http_request_db_queries", method, route, entry.queries)
+            _family(lines, "http_request_db_seconds_total", "counter", "Time spent in SQL statements.")
+            for (method, route), entry in routes:
+                lines.append(f"http_request_db_seconds_total{_labels(method, route)} {entry.db_seconds!r}")
+            _family(lines, "http_request_db_rows_total", "counter", "Rows returned or affected, as reported by the driver.")
+            for (method, route), entry in routes:
+                lines.append(f"http_request_db_rows_total{_labels(method, route)} {entry.rows}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(method: str, route: str, **extra) -> str:
+    pairs = [("method", method), ("route", route), *((k, str(v)) for k, v in extra.items())]
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _family(lines: List[str], name: str, kind: str, help_text: str) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _histogram(lines: List[str], name: str, method: str, route: str, histogram: _Histogram) -> None:
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(method, route, le=bound)} {cumulative}")
+    lines.append(f"{name}_bucket{_labels(method, route, le='+Inf')} {histogram.count}")
+    lines.append(f"{name}_sum{_labels(method, route)} {histogram.total!r}")
+    lines.append(f"{name}_count{_labels(method, route)} {histogram.count}")
+
+
+registry = MetricsRegistry()
+
+
+# The start time lives on the statement's execution context, so a statement
+# that raises leaves nothing behind on the (pooled) connection.
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None and context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    start = getattr(context, "_metrics_start", None)
+    if stats is None or start is None:
+        return
+    stats.observe(statement, time.perf_counter() - start, getattr(cursor, "rowcount", -1))
+
+
+def _handle_error(exception_context) -> None:
+    """Count a failed statement too; after_cursor_execute never runs for it."""
+    stats = _current.get()
+    start = getattr(exception_context.execution_context, "_metrics_start", None)
+    if stats is None or start is None:
+        return
+    stats.observe(exception_context.statement, time.perf_counter() - start, -1)
+
+
+def instrument_engine(engine) -> None:
+    """Attach the cursor hooks to a sync Engine (pass AsyncEngine.sync_engine for async ones)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def _route_label(scope: Scope) -> str:
+    route = scope.get("route")  # set by FastAPI's APIRoute on match
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+def _over_budget(method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+    top = Counter()
+    for statement, count in stats.statements.items():
+        top[fingerprint(statement)] += count
+    listing = "\n".join(f"  {count}x {text[:300]}" for text, count in top.most_common(METRICS_WARN_STATEMENTS))
+    logger.warning(
+        "%s %s -> %s over budget: %.1f ms, %d queries (%.1f ms in DB, %d rows); statements:\n%s",
+        method, route, status, seconds * 1000, stats.queries, stats.db_seconds * 1000, stats.rows, listing,
+    )
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses are timed until their last chunk."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            seconds = time.perf_counter() - start
+            method, route = scope["method"], _route_label(scope)
+            registry.record(method, route, status, seconds, stats)
+            if (METRICS_QUERY_BUDGET and stats.queries > METRICS_QUERY_BUDGET) or (
+                METRICS_LATENCY_BUDGET_MS and seconds * 1000 > METRICS_LATENCY_BUDGET_MS
+            ):
+                _over_budget(method, route, status, seconds, stats)
+
+
+# pool_status() keys exported as gauges, with their metric names
+POOL_GAUGES = (
+    ("size", "db_pool_size", "Connections the pool keeps open."),
+    ("checked_in", "db_pool_checked_in", "Idle connections in the pool."),
+    ("checked_out", "db_pool_checked_out", "Connections in use."),
+    ("overflow", "db_pool_overflow", "Connections over the pool size (negative: not yet opened)."),
+    ("max_overflow", "db_pool_max_overflow", "Configured overflow limit."),
+)
+
+
+def render_pools(pools: Dict[str, Dict[str, Any]]) -> str:
+    """database.pool_status() as Prometheus gauges and a checkout wait histogram, labelled by pool."""
+    queued = sorted((name, status) for name, status in pools.items() if "checkouts" in status)  # NullPool has no gauges
+    lines: List[str] = []
+    for key, name, help_text in POOL_GAUGES:
+        _family(lines, name, "gauge", help_text)
+        for pool, status in queued:
+            lines.append(f'{name}{{pool="{pool}"}} {status[key]}')
+    _family(lines, "db_pool_timeouts_total", "counter", "Checkouts that gave up waiting for a connection.")
+    for pool, status in queued:
+        lines.append(f'db_pool_timeouts_total{{pool="{pool}"}} {status["timeouts"]}')
+    _family(lines, "db_pool_checkout_wait_seconds", "histogram", "Time spent waiting for a pooled connection.")
+    for pool, status in queued:
+        cumulative = 0
+        for bound, count in status["wait_seconds_buckets"].items():
+            cumulative += count
+            lines.append(f'db_pool_checkout_wait_seconds_bucket{{pool="{pool}",le="{bound}"}} {cumulative}')
+        lines.append(f'db_pool_checkout_wait_seconds_sum{{pool="{pool}"}} {status["wait_seconds_total"]!r}')
+        lines.append(f'db_pool_checkout_wait_seconds_count{{pool="{pool}"}} {status["checkouts"]}')
+    return "\n".join(lines) + "\n"
+
+
+def metrics_response(pools: Optional[Dict[str, Dict[str, Any]]] = None) -> Response:
+    body = registry.render() + (render_pools(pools) if pools else "")
+    return Response(body, media_type="text/plain; version=0.0.4; charset=utf-8")
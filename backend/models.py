@@ -1,12 +1,12 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional, List
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, Float, Boolean, Table, JSON
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, Float, Boolean, Table, JSON, Index, func, text
+from sqlalchemy.dialects import postgresql  # noqa: F401  (регистрирует to_tsvector и др.)
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
-from .database import Base
+from .database import Base, SEARCH_TS_CONFIG
 
 
 class TimestampMixin:
@@ -28,14 +28,6 @@ order_modules = Table(
     Column("module_id", ForeignKey("modules.id"), primary_key=True),
 )
 
-# Связь многие-ко-многим между корзиной и модулями
-cart_modules = Table(
-    "cart_modules",
-    Base.metadata,
-    Column("cart_id", ForeignKey("carts.id"), primary_key=True),
-    Column("module_id", ForeignKey("modules.id"), primary_key=True),
-)
-
 # Связь многие-ко-многим между модулями и цветами
 module_colors = Table(
     "module_colors",
@@ -75,6 +67,11 @@ class User(Base, TimestampMixin):
 
 class Order(Base, TimestampMixin):
     __tablename__ = "orders"
+    __table_args__ = (
+        # keyset-пагинация: ORDER BY created_at DESC, id DESC
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -100,6 +97,22 @@ class Order(Base, TimestampMixin):
     # связи
     user = relationship("User", back_populates="orders")
     modules = relationship("Module", secondary=order_modules, back_populates="orders")
+    items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan", order_by="OrderItem.id")
+
+
+class OrderItem(Base):
+    __tablename__ = "order_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True)
+    # без внешних ключей: строка заказа переживает удаление модуля или цвета
+    module_id = Column(Integer, nullable=False)
+    color_id = Column(Integer, nullable=True)  # выбранный цвет
+    quantity = Column(Integer, nullable=False, default=1)  # количество
+    unit_price = Column(Float, nullable=False)  # цена за единицу на момент заказа (со скидкой и цветом)
+
+    # связи
+    order = relationship("Order", back_populates="items")
 
 
 class Cart(Base, TimestampMixin):
@@ -112,7 +125,23 @@ class Cart(Base, TimestampMixin):
 
     # связи
     user = relationship("User", back_populates="cart")
-    modules = relationship("Module", secondary=cart_modules, back_populates="carts")
+    items = relationship("CartItem", back_populates="cart", cascade="all, delete-orphan", order_by="CartItem.id")
+
+
+class CartItem(Base, TimestampMixin):
+    __tablename__ = "cart_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cart_id = Column(Integer, ForeignKey("carts.id", ondelete="CASCADE"), nullable=False)
+    module_id = Column(Integer, ForeignKey("modules.id", ondelete="CASCADE"), nullable=False)
+    color_id = Column(Integer, ForeignKey("colors.id", ondelete="CASCADE"), nullable=True)  # выбранный цвет
+    quantity = Column(Integer, nullable=False, default=1)  # количество
+    unit_price = Column(Float, nullable=False)  # цена за единицу на момент добавления (со скидкой и цветом)
+
+    # связи
+    cart = relationship("Cart", back_populates="items")
+    module = relationship("Module")
+    color = relationship("Color")
 
 
 class Module(Base, TimestampMixin):
@@ -129,7 +158,6 @@ class Module(Base, TimestampMixin):
 
     # связи
     orders = relationship("Order", secondary=order_modules, back_populates="modules")
-    carts = relationship("Cart", secondary=cart_modules, back_populates="modules")
     colors = relationship("Color", secondary=module_colors, back_populates="modules")
 
 
@@ -166,6 +194,9 @@ class Furniture(Base, TimestampMixin):
 
 class News(Base, TimestampMixin):
     __tablename__ = "news"
+    __table_args__ = (
+        Index("ix_news_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)  # заголовок
@@ -177,6 +208,10 @@ class News(Base, TimestampMixin):
 
 class SupportRequest(Base, TimestampMixin):
     __tablename__ = "support_requests"
+    __table_args__ = (
+        Index("ix_support_requests_created_at_id", "created_at", "id"),
+        Index("ix_support_requests_status_created_at_id", "status", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # может быть анонимным
@@ -206,4 +241,117 @@ class WhereToBuy(Base, TimestampMixin):
     location = Column(String, nullable=False)  # локация
     name = Column(String, nullable=False)  # название
     address = Column(String, nullable=False)  # адрес
-    phone = Column(String, nullable=False)  # телефон
\ No newline at end of file
+    phone = Column(String, nullable=False)  # телефон
+
+
+class CatalogCard(Base):
+    """Карточка модуля или мебели для списков: цена, первое фото и цвета в одной строке.
+
+    Проекция обновляется из функций записи crud/bulk (backend/cards.py).
+    """
+    __tablename__ = "catalog_cards"
+    __table_args__ = (
+        Index("ix_catalog_cards_kind_type_id", "kind", "furniture_type", "id"),
+    )
+
+    kind = Column(String(16), primary_key=True)  # module / furniture
+    id = Column(Integer, primary_key=True, autoincrement=False)  # id модуля или мебели
+    name = Column(String, nullable=False)
+    article = Column(String, nullable=False)
+    furniture_type = Column(String, nullable=True)  # только для мебели
+    model = Column(String, nullable=True)  # только для мебели
+    price = Column(Float, nullable=False)
+    discounted_price = Column(Float, nullable=True)
+    effective_price = Column(Float, nullable=False)  # цена со скидкой, если она есть
+    photo = Column(String, nullable=True)  # первое фото
+    colors = Column(JSON, nullable=False, default=list)  # [{id, name, hex_code, additional_price}]
+    updated_at = Column(DateTime, nullable=False)  # updated_at исходной записи
+
+
+class CatalogFacetCount(Base):
+    """Счетчики фасетов каталога без фильтров: сколько карточек на цвет, ценовой диапазон, тип, модель.
+
+    Ведутся вместе с catalog_cards (backend/cards.py): каждая перезапись карточек
+    вычитает вклад старых строк и добавляет вклад новых.
+    """
+    __tablename__ = "catalog_facet_counts"
+
+    kind = Column(String(16), primary_key=True)  # module / furniture
+    facet = Column(String(16), primary_key=True)  # total / color / price / furniture_type / model
+    value = Column(String, primary_key=True)  # id цвета, нижняя граница диапазона, тип или модель
+    count = Column(Integer, nullable=False, default=0)
+
+
+class IdempotencyKey(Base, TimestampMixin):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        # один ключ на пользователя: повторный запрос с тем же ключом получает тот же заказ
+        Index("ux_idempotency_keys_user_key", "user_id", "key", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    key = Column(String(255), nullable=False)  # заголовок Idempotency-Key
+    request_hash = Column(String(64), nullable=False)  # sha256 тела запроса
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="SET NULL"), nullable=True)  # созданный заказ
+
+
+# Одна строка на модуль и цвет в корзине: upsert увеличивает количество (NULL-цвет сравнивается как 0)
+CART_ITEM_LINE = (CartItem.cart_id, CartItem.module_id, func.coalesce(CartItem.color_id, text("0")))
+Index("ux_cart_items_line", *CART_ITEM_LINE, unique=True)
+
+
+# ======================
+# ПОЛНОТЕКСТОВЫЙ ПОИСК
+# ======================
+
+# Все части выражения — литералы, чтобы запросы совпадали с индексом и при серверных prepared statements
+SEARCH_REGCONFIG = text(f"'{SEARCH_TS_CONFIG}'::regconfig")
+
+
+def search_document(*weighted):
+    """tsvector из пар (колонка, вес A-D); одно и то же выражение в индексе и в запросах"""
+    document = None
+    for column, weight in weighted:
+        part = func.setweight(
+            func.to_tsvector(SEARCH_REGCONFIG, func.coalesce(column, text("''"))),
+            text(f"'{weight}'"),
+        )
+        document = part if document is None else document.op("||")(part)
+    return document
+
+
+def _trgm_index(name, column):
+    return Index(name, column, postgresql_using="gin", postgresql_ops={column.key: "gin_trgm_ops"}).ddl_if(dialect="postgresql")
+
+
+module_search_document = search_document(
+    (Module.name, "A"), (Module.article, "A"), (Module.technical_details, "C")
+)
+furniture_search_document = search_document(
+    (Furniture.name, "A"), (Furniture.article, "A"), (Furniture.furniture_type, "B"),
+    (Furniture.model, "B"), (Furniture.technical_characteristics, "C"),
+)
+news_search_document = search_document((News.title, "A"), (News.text1, "B"), (News.text2, "C"))
+
+Index("ix_modules_search", module_search_document, postgresql_using="gin").ddl_if(dialect="postgresql")
+Index("ix_furniture_search", furniture_search_document, postgresql_using="gin").ddl_if(dialect="postgresql")
+Index("ix_news_search", news_search_document, postgresql_using="gin").ddl_if(dialect="postgresql")
+
+# триграммы: опечатки в поиске и ускорение ilike('%...%') в фильтрах списков
+_trgm_index("ix_modules_name_trgm", Module.name)
+_trgm_index("ix_modules_article_trgm", Module.article)
+_trgm_index("ix_furniture_name_trgm", Furniture.name)
+_trgm_index("ix_furniture_article_trgm", Furniture.article)
+_trgm_index("ix_furniture_type_trgm", Furniture.furniture_type)
+_trgm_index("ix_news_title_trgm", News.title)
+
+# условный GET (conditional.py): count(*) и max(updated_at) таблицы читаются из индекса
+Index("ix_users_updated_at", User.updated_at)
+Index("ix_orders_updated_at", Order.updated_at)
+Index("ix_modules_updated_at", Module.updated_at)
+Index("ix_furniture_updated_at", Furniture.updated_at)
+Index("ix_news_updated_at", News.updated_at)
+Index("ix_support_requests_updated_at", SupportRequest.updated_at)
+Index("ix_shops_updated_at", Shop.updated_at)
+Index("ix_where_to_buy_updated_at", WhereToBuy.updated_at)
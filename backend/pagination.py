@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Callable, MutableMapping, NamedTuple, Optional, Sequence
+
+from fastapi import HTTPException, Query
+
+
+# Header carrying the token for the next page in cursor mode
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class Cursor(NamedTuple):
+    """Position after the last row of a page: its sort key (if any) and id.
+
+    `kind` names the list that issued it (e.g. "modules", "orders"): a token
+    replayed against another list would compare the wrong sort key.
+    """
+    id: int
+    key: Any = None
+    kind: Optional[str] = None
+
+
+def encode_cursor(row_id: int, key: Any = None, kind: Optional[str] = None) -> str:
+    if isinstance(key, datetime):
+        payload = {"id": row_id, "dt": key.isoformat()}
+    else:
+        payload = {"id": row_id, "k": key}
+    if kind is not None:
+        payload["t"] = kind
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        row_id = int(payload["id"])
+        key = datetime.fromisoformat(payload["dt"]) if "dt" in payload else payload.get("k")
+        kind = payload.get("t")
+    except (binascii.Error, ValueError, KeyError, TypeError, AttributeError) as exc:
+        raise ValueError("malformed cursor") from exc
+    return Cursor(id=row_id, key=key, kind=kind)
+
+
+def cursor_param(kind: str) -> Callable[..., Optional[Cursor]]:
+    """Dependency decoding the opaque `after` token of the `kind` list; `skip` is ignored when it is set."""
+    def dependency(
+        after: Optional[str] = Query(None, description="Курсор следующей страницы (из заголовка X-Next-Cursor)"),
+    ) -> Optional[Cursor]:
+        if after is None:
+            return None
+        try:
+            cursor = decode_cursor(after)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Некорректный курсор")
+        if cursor.kind != kind:
+            raise HTTPException(status_code=400, detail="Курсор выдан для другого списка")
+        return cursor
+    return dependency
+
+
+def set_next_cursor(headers: MutableMapping[str, str], items: Sequence, limit: int, kind: str, key: Optional[Callable[[Any], Any]] = None) -> None:
+    """Expose the cursor for the page after `items` when the page is full."""
+    if not items or len(items) < limit:
+        return
+    last = items[-1]
+    headers[NEXT_CURSOR_HEADER] = encode_cursor(last.id, key(last) if key else None, kind)
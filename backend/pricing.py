@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import os
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+
+
+# Carts repriced per transaction when a price list changes
+REPRICE_BATCH_SIZE = int(os.getenv("REPRICE_BATCH_SIZE", "1000"))
+
+
+def effective_price(model):
+    """Price a shopper pays: the discounted price when there is one."""
+    return func.coalesce(model.discounted_price, model.price)
+
+
+def _line_unit_price():
+    """Current price of one unit of a cart line, correlated to the enclosing cart_items row."""
+    module_price = select(effective_price(models.Module)).where(models.Module.id == models.CartItem.module_id).scalar_subquery()
+    surcharge = select(models.Color.additional_price).where(models.Color.id == models.CartItem.color_id).scalar_subquery()
+    return module_price + func.coalesce(surcharge, 0)
+
+
+def cart_totals_stmt(cart_ids: Iterable[int]):
+    """(cart_id, total) from current module, discount and color prices, in one aggregated query."""
+    unit_price = effective_price(models.Module) + func.coalesce(models.Color.additional_price, 0)
+    return (
+        select(models.CartItem.cart_id, func.sum(models.CartItem.quantity * unit_price))
+        .join(models.Module, models.Module.id == models.CartItem.module_id)
+        .outerjoin(models.Color, models.Color.id == models.CartItem.color_id)
+        .where(models.CartItem.cart_id.in_(list(cart_ids)))
+        .group_by(models.CartItem.cart_id)
+    )
+
+
+def cart_lines_stmt(cart_id: int):
+    """(module_id, color_id, quantity, current unit price) of each line of a cart, in cart order."""
+    unit_price = effective_price(models.Module) + func.coalesce(models.Color.additional_price, 0)
+    return (
+        select(models.CartItem.module_id, models.CartItem.color_id, models.CartItem.quantity, unit_price.label("unit_price"))
+        .join(models.Module, models.Module.id == models.CartItem.module_id)
+        .outerjoin(models.Color, models.Color.id == models.CartItem.color_id)
+        .where(models.CartItem.cart_id == cart_id)
+        .order_by(models.CartItem.id)
+    )
+
+
+def refresh_cart_totals_stmt(cart_ids: Iterable[int]):
+    """UPDATE storing each cart's total over its lines; Cart.total_amount is the shared per-cart cache."""
+    line_total = models.CartItem.quantity * models.CartItem.unit_price
+    total = (
+        select(func.coalesce(func.sum(line_total), 0))
+        .where(models.CartItem.cart_id == models.Cart.id)
+        .scalar_subquery()
+    )
+    stmt = update(models.Cart).where(models.Cart.id.in_(list(cart_ids))).values(total_amount=total)
+    # carts are reloaded after commit; skip the ORM's in-session synchronization
+    return stmt.execution_options(synchronize_session=False)
+
+
+def cart_totals(db: Session, cart_ids: Sequence[int]) -> Dict[int, float]:
+    totals = dict(db.execute(cart_totals_stmt(cart_ids)).all())
+    return {cart_id: float(totals.get(cart_id) or 0) for cart_id in cart_ids}
+
+
+def refresh_cart_totals(db: Session, cart_ids: Sequence[int]) -> None:
+    """Recompute stored totals after a cart mutation, inside the caller's transaction."""
+    if cart_ids:
+        db.execute(refresh_cart_totals_stmt(cart_ids))
+
+
+def affected_carts(db: Session, module_ids: Iterable[int] = (), color_ids: Iterable[int] = ()) -> List[int]:
+    """Active carts holding any of the modules or colors."""
+    module_ids, color_ids = list(module_ids), list(color_ids)
+    if not module_ids and not color_ids:
+        return []
+    stmt = (
+        select(models.CartItem.cart_id)
+        .join(models.Cart, models.Cart.id == models.CartItem.cart_id)
+        .where(
+            models.Cart.status == "active",
+            or_(models.CartItem.module_id.in_(module_ids), models.CartItem.color_id.in_(color_ids)),
+        )
+        .distinct()
+    )
+    return list(db.scalars(stmt))
+
+
+def reprice_carts(db: Session, cart_ids: Optional[Sequence[int]] = None, batch_size: int = REPRICE_BATCH_SIZE) -> int:
+    """Refresh unit-price snapshots and totals of the given (default: all active) carts.
+
+    Works in batches of `batch_size` carts, each with two set-based UPDATEs and
+    its own commit, so a price-list change touching thousands of carts never
+    holds one long transaction. Returns the number of carts repriced.
+    """
+    repriced = 0
+    if cart_ids is not None:
+        ids = sorted(set(cart_ids))
+        batches = (ids[start:start + batch_size] for start in range(0, len(ids), batch_size))
+    else:
+        batches = _active_cart_batches(db, batch_size)
+    for batch in batches:
+        db.execute(
+            update(models.CartItem).where(models.CartItem.cart_id.in_(batch)).values(unit_price=_line_unit_price()),
+            execution_options={"synchronize_session": False},
+        )
+        db.execute(refresh_cart_totals_stmt(batch))
+        db.commit()
+        repriced += len(batch)
+    return repriced
+
+
+def _active_cart_batches(db: Session, batch_size: int):
+    last_id = 0
+    while True:
+        batch = list(db.scalars(
+            select(models.Cart.id).where(models.Cart.status == "active", models.Cart.id > last_id).order_by(models.Cart.id).limit(batch_size)
+        ))
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]
+
+
+def unit_price(module: models.Module) -> float:
+    """effective_price() of an already loaded module or furniture row."""
+    return module.discounted_price if module.discounted_price is not None else module.price
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, FrozenSet, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, Query, Response
+from pydantic import ConfigDict, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+
+from . import models, schemas
+from .crud import FURNITURE_LOAD, MODULE_LOAD
+from .serialization import dump_json
+
+
+# Column projection for module and furniture responses: `fields=name,price`
+# or a named `view=card` narrows both the SELECT (load_only on the columns,
+# colors fetched only when asked for) and the JSON (a schema holding just
+# those fields). Without either parameter the full schema is served as before.
+# `id` is always included: cursors and links need it.
+
+VIEW_FULL = "full"
+
+# properties computed from a column rather than stored
+DERIVED = {"photo_variants": ("photos",)}
+
+MODULE_VIEWS: Dict[str, Tuple[str, ...]] = {
+    "card": ("id", "name", "article", "price", "discounted_price", "photo_variants"),
+    "list": ("id", "name", "article", "price", "discounted_price", "photos", "photo_variants", "colors", "updated_at"),
+}
+FURNITURE_VIEWS: Dict[str, Tuple[str, ...]] = {
+    "card": ("id", "furniture_type", "name", "article", "price", "discounted_price", "photo_variants"),
+    "list": ("id", "furniture_type", "name", "article", "model", "price", "discounted_price", "photos", "photo_variants", "colors", "updated_at"),
+}
+
+
+class Projection(NamedTuple):
+    """Response schema and loader options for one set of requested fields."""
+    schema: Any
+    options: tuple
+    full: bool
+
+    def render(self, obj: Any, response: Response) -> Any:
+        """Detail responses: the row itself for the full schema, pre-encoded JSON otherwise.
+
+        A narrowed row cannot go through the route's response_model (the
+        deferred columns would be loaded again, the missing fields would fail
+        validation), so it leaves as a Response carrying the headers set by
+        dependencies (ETag, Last-Modified).
+        """
+        if self.full:
+            return obj
+        out = Response(dump_json(self.schema, obj), status_code=response.status_code or 200, media_type="application/json")
+        out.headers.raw.extend(header for header in response.headers.raw if header[0] != b"content-length")
+        return out
+
+
+_partial_schemas: Dict[Tuple[Any, FrozenSet[str]], Any] = {}
+
+
+def partial_schema(schema: Any, fields: FrozenSet[str]) -> Any:
+    """`schema` reduced to `fields`, in the schema's own field order; cached per field set."""
+    key = (schema, fields)
+    partial = _partial_schemas.get(key)
+    if partial is None:
+        definitions = {name: (info.annotation, info) for name, info in schema.model_fields.items() if name in fields}
+        partial = _partial_schemas[key] = create_model(
+            f"{schema.__name__}Fields", __config__=ConfigDict(from_attributes=True), **definitions
+        )
+    return partial
+
+
+def load_options(model: Any, fields: FrozenSet[str], relations: Dict[str, tuple]) -> tuple:
+    """load_only for the selected columns plus the loaders of the selected relationships."""
+    mapper = inspect(model)
+    columns = {attr.key for attr in mapper.column_attrs}
+    wanted = set(fields)
+    for name in fields:
+        wanted.update(DERIVED.get(name, ()))
+    options = [load_only(*(getattr(model, name) for name in sorted(wanted & columns)))]
+    for name in sorted(wanted & set(relations)):
+        options.extend(relations[name])
+    return tuple(options)
+
+
+def projection_param(model: Any, schema: Any, views: Dict[str, Tuple[str, ...]], relations: Dict[str, tuple]) -> Callable[..., Projection]:
+    """Dependency reading `fields` / `view` for one resource.
+
+    `relations` maps each relationship field of the schema to its loader
+    options (the crud loader profile), used only when the field is selected.
+    """
+    full = Projection(schema, tuple(option for options in relations.values() for option in options), True)
+    known = frozenset(schema.model_fields)
+    cache: Dict[FrozenSet[str], Projection] = {}
+    view_names = ", ".join((*views, VIEW_FULL))
+
+    def dependency(
+        fields: Optional[str] = Query(None, description="Поля ответа через запятую, например id,name,price"),
+        view: Optional[str] = Query(None, description=f"Готовый набор полей: {view_names}"),
+    ) -> Projection:
+        if fields is None and (view is None or view == VIEW_FULL):
+            return full
+        selected = set()
+        if view is not None and view != VIEW_FULL:
+            if view not in views:
+                raise HTTPException(status_code=400, detail=f"Неизвестное представление: {view}. Доступны: {view_names}")
+            selected.update(views[view])
+        if fields is not None:
+            requested = {name.strip() for name in fields.split(",") if name.strip()}
+            unknown = sorted(requested - known)
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Неизвестные поля: {', '.join(unknown)}")
+            selected.update(requested)
+        selected.add("id")
+        key = frozenset(selected)
+        if key == known:
+            return full
+        projection = cache.get(key)
+        if projection is None:
+            projection = cache[key] = Projection(partial_schema(schema, key), load_options(model, key, relations), False)
+        return projection
+    return dependency
+
+
+module_projection = projection_param(models.Module, schemas.Module, MODULE_VIEWS, {"colors": MODULE_LOAD})
+furniture_projection = projection_param(models.Furniture, schemas.Furniture, FURNITURE_VIEWS, {"colors": FURNITURE_LOAD})
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional, List
+from typing import Annotated, Any, Optional, List
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, BeforeValidator, EmailStr, Field
+
+from .uploads import image_store
 
 
 # ========== USER ==========
@@ -37,6 +39,27 @@ class User(UserBase):
         from_attributes = True
 
 
+# ========== PHOTOS ==========
+class PhotoVariants(BaseModel):
+    original: str
+    thumb: str
+    card: str
+    full: str
+
+
+# URL производных размеров считаются при сериализации из сохраненных ссылок на фото
+def _variants_of(urls: Any) -> List[dict]:
+    return [image_store.variants(url) for url in (urls or [])]
+
+
+def _variants_of_one(url: Any) -> Optional[dict]:
+    return image_store.variants(url) if url else None
+
+
+PhotoVariantsList = Annotated[List[PhotoVariants], BeforeValidator(_variants_of)]
+OptionalPhotoVariants = Annotated[Optional[PhotoVariants], BeforeValidator(_variants_of_one)]
+
+
 # ========== COLOR ==========
 class ColorBase(BaseModel):
     name: str
@@ -58,6 +81,7 @@ class ColorUpdate(BaseModel):
 
 class Color(ColorBase):
     id: int
+    photo_variants: PhotoVariantsList = Field([], validation_alias="photos")
 
     class Config:
         from_attributes = True
@@ -94,6 +118,7 @@ class Module(ModuleBase):
     created_at: datetime
     updated_at: datetime
     colors: List[Color] = []
+    photo_variants: PhotoVariantsList = Field([], validation_alias="photos")
 
     class Config:
         from_attributes = True
@@ -132,33 +157,104 @@ class Furniture(FurnitureBase):
     created_at: datetime
     updated_at: datetime
     colors: List[Color] = []
+    photo_variants: PhotoVariantsList = Field([], validation_alias="photos")
+
+    class Config:
+        from_attributes = True
+
+
+# ========== CATALOG CARDS ==========
+class CatalogCardColor(BaseModel):
+    id: int
+    name: str
+    hex_code: Optional[str] = None
+    additional_price: float = 0
+
+
+class CatalogCard(BaseModel):
+    id: int
+    name: str
+    article: str
+    furniture_type: Optional[str] = None  # только для мебели
+    model: Optional[str] = None  # только для мебели
+    price: float
+    discounted_price: Optional[float] = None
+    effective_price: float
+    photo: Optional[str] = None  # первое фото
+    photo_variants: OptionalPhotoVariants = Field(None, validation_alias="photo")
+    colors: List[CatalogCardColor] = []
 
     class Config:
         from_attributes = True
 
 
 # ========== CART ==========
+class CartItemBase(BaseModel):
+    module_id: int
+    color_id: Optional[int] = None
+    quantity: int = Field(1, ge=1)
+
+
+class CartItemCreate(CartItemBase):
+    pass
+
+
+class CartItemUpdate(BaseModel):
+    quantity: int = Field(..., ge=0)  # 0 — удалить строку
+
+
+class CartItemModule(BaseModel):
+    id: int
+    name: str
+    article: str
+    price: float
+    discounted_price: Optional[float] = None
+    photos: Optional[List[str]] = None
+
+    class Config:
+        from_attributes = True
+
+
+class CartItemColor(BaseModel):
+    id: int
+    name: str
+    hex_code: Optional[str] = None
+    additional_price: float = 0
+
+    class Config:
+        from_attributes = True
+
+
+class CartItem(CartItemBase):
+    id: int
+    unit_price: float  # цена за единицу на момент добавления
+    module: CartItemModule
+    color: Optional[CartItemColor] = None
+
+    class Config:
+        from_attributes = True
+
+
 class CartBase(BaseModel):
     status: str = "active"
-    total_amount: float = 0
 
 
 class CartCreate(CartBase):
-    module_ids: Optional[List[int]] = []
+    items: Optional[List[CartItemCreate]] = []
 
 
 class CartUpdate(BaseModel):
     status: Optional[str] = None
-    total_amount: Optional[float] = None
-    module_ids: Optional[List[int]] = None
+    items: Optional[List[CartItemCreate]] = None  # полностью заменяет содержимое корзины
 
 
 class Cart(CartBase):
     id: int
     user_id: int
+    total_amount: float = 0  # считается сервером по текущим ценам
     created_at: datetime
     updated_at: datetime
-    modules: List[Module] = []
+    items: List[CartItem] = []
 
     class Config:
         from_attributes = True
@@ -177,14 +273,18 @@ class OrderBase(BaseModel):
     entrance_code: Optional[str] = None
     payment_method: str
     recipient: str
-    total_amount: float
     status: str = "pending"
 
 
 class OrderCreate(OrderBase):
+    user_id: int
     module_ids: Optional[List[int]] = []
 
 
+class CheckoutCreate(OrderBase):
+    pass  # состав и сумма заказа берутся из корзины
+
+
 class OrderUpdate(BaseModel):
     full_name: Optional[str] = None
     email: Optional[EmailStr] = None
@@ -197,18 +297,30 @@ class OrderUpdate(BaseModel):
     entrance_code: Optional[str] = None
     payment_method: Optional[str] = None
     recipient: Optional[str] = None
-    total_amount: Optional[float] = None
     status: Optional[str] = None
     module_ids: Optional[List[int]] = None
 
 
+class OrderItem(BaseModel):
+    id: int
+    module_id: int
+    color_id: Optional[int] = None
+    quantity: int
+    unit_price: float  # цена за единицу на момент заказа
+
+    class Config:
+        from_attributes = True
+
+
 class Order(OrderBase):
     id: int
     user_id: int
+    total_amount: float  # считается сервером по текущим ценам модулей
     date: datetime
     created_at: datetime
     updated_at: datetime
     modules: List[Module] = []
+    items: List[OrderItem] = []  # строки заказа: total_amount — их сумма
 
     class Config:
         from_attributes = True
@@ -239,6 +351,8 @@ class News(NewsBase):
     id: int
     created_at: datetime
     updated_at: datetime
+    photo_variants: PhotoVariantsList = Field([], validation_alias="photos")
+    main_photo_variants: OptionalPhotoVariants = Field(None, validation_alias="main_photo")
 
     class Config:
         from_attributes = True
@@ -329,6 +443,54 @@ class WhereToBuy(WhereToBuyBase):
         from_attributes = True
 
 
+# ========== BULK ==========
+class BulkRowError(BaseModel):
+    index: int  # номер строки во входном массиве / NDJSON
+    id: Optional[int] = None
+    errors: List[str]
+
+
+class BulkResult(BaseModel):
+    ids: List[int]  # созданные / обновленные / удаленные записи
+    errors: List[BulkRowError] = []
+
+
+# ========== FACETS ==========
+class ColorFacet(BaseModel):
+    id: int
+    name: str
+    count: int
+
+
+class ValueFacet(BaseModel):
+    value: str
+    count: int
+
+
+class PriceFacet(BaseModel):
+    min: float
+    max: Optional[float] = None  # None — без верхней границы
+    count: int
+
+
+class CatalogFacets(BaseModel):
+    total: int
+    colors: List[ColorFacet] = []
+    price: List[PriceFacet] = []
+    furniture_types: List[ValueFacet] = []  # только для мебели
+    models: List[ValueFacet] = []  # только для мебели
+
+
+# ========== SEARCH ==========
+class SearchHit(BaseModel):
+    type: str  # module, furniture, news
+    id: int
+    title: str
+    article: Optional[str] = None
+    rank: float
+    highlight: Optional[str] = None  # HTML: экранированный фрагмент, совпадения в <mark>
+
+
 # ========== RESPONSE SCHEMAS ==========
 class Token(BaseModel):
     access_token: str
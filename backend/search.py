@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import html
+import os
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import and_, func, literal, or_, select, text
+from sqlalchemy.orm import Session
+
+from . import models
+
+
+# Minimum word_similarity for a typo-tolerant match (pg_trgm's own default is 0.6)
+SEARCH_SIMILARITY = float(os.getenv("SEARCH_SIMILARITY", "0.4"))
+# Words of a query beyond this are ignored
+SEARCH_MAX_TERMS = 8
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=10, MaxFragments=2"
+SNIPPET_LENGTH = 160
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class SearchTarget(NamedTuple):
+    """How one catalog entity is searched: its tsvector, fuzzy-matched columns and snippet source."""
+    kind: str
+    model: Any
+    document: Any
+    title: Any
+    article: Any
+    fuzzy: Sequence[Any]
+    snippet: Any
+    text_columns: Sequence[Any]
+
+
+TARGETS: Dict[str, SearchTarget] = {
+    "modules": SearchTarget(
+        "module", models.Module, models.module_search_document,
+        models.Module.name, models.Module.article,
+        (models.Module.name, models.Module.article),
+        models.Module.technical_details,
+        (models.Module.name, models.Module.article, models.Module.technical_details),
+    ),
+    "furniture": SearchTarget(
+        "furniture", models.Furniture, models.furniture_search_document,
+        models.Furniture.name, models.Furniture.article,
+        (models.Furniture.name, models.Furniture.article, models.Furniture.furniture_type),
+        models.Furniture.technical_characteristics,
+        (models.Furniture.name, models.Furniture.article, models.Furniture.furniture_type,
+         models.Furniture.model, models.Furniture.technical_characteristics),
+    ),
+    "news": SearchTarget(
+        "news", models.News, models.news_search_document,
+        models.News.title, None,
+        (models.News.title,),
+        models.News.text1,
+        (models.News.title, models.News.text1, models.News.text2),
+    ),
+}
+
+
+def query_terms(q: str) -> List[str]:
+    return _TERM_RE.findall(q.lower())[:SEARCH_MAX_TERMS]
+
+
+def search(db: Session, q: str, kinds: Sequence[str], limit: int = 20) -> List[Dict[str, Any]]:
+    """Ranked hits over the requested kinds, best first.
+
+    On PostgreSQL every word is matched as a prefix against the full-text
+    index, and names/articles also match by trigram word similarity so typos
+    still find results; snippets are highlighted with ts_headline. Other
+    databases fall back to ilike over the same columns.
+    """
+    terms = query_terms(q)
+    if not terms:
+        return []
+    postgres = db.get_bind().dialect.name == "postgresql"
+    hits: List[Dict[str, Any]] = []
+    for kind in kinds:
+        target = TARGETS[kind]
+        if postgres:
+            hits.extend(_search_postgres(db, target, q, terms, limit))
+        else:
+            hits.extend(_search_fallback(db, target, terms, limit))
+    hits.sort(key=lambda hit: (-hit["rank"], hit["type"], hit["id"]))
+    return hits[:limit]
+
+
+def _search_postgres(db: Session, target: SearchTarget, q: str, terms: List[str], limit: int):
+    tsquery = func.to_tsquery(models.SEARCH_REGCONFIG, " & ".join(f"{term}:*" for term in terms))
+    phrase = " ".join(terms)
+    fuzzy_match = or_(*(literal(phrase).op("<%")(column) for column in target.fuzzy))
+    rank = func.greatest(
+        func.ts_rank_cd(target.document, tsquery),
+        *(func.word_similarity(phrase, column) for column in target.fuzzy),
+    )
+    model = target.model
+    # rank and cut first, so ts_headline runs only for the rows that are returned
+    top = (
+        select(model.id.label("id"), rank.label("rank"))
+        .where(or_(target.document.op("@@")(tsquery), fuzzy_match))
+        .order_by(rank.desc(), model.id)
+        .limit(limit)
+        .subquery()
+    )
+    # highlight is HTML: escape the text so only the <mark> tags ts_headline adds are markup
+    snippet_source = func.concat_ws(" ", target.title, target.snippet)
+    for char, entity in (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;")):
+        snippet_source = func.replace(snippet_source, char, entity)
+    stmt = (
+        select(
+            model.id,
+            target.title,
+            target.article if target.article is not None else literal(None),
+            top.c.rank,
+            func.ts_headline(models.SEARCH_REGCONFIG, snippet_source, tsquery, HEADLINE_OPTIONS),
+        )
+        .join(top, top.c.id == model.id)
+        .order_by(top.c.rank.desc(), model.id)
+    )
+    # word_similarity threshold used by the <% operator, for this transaction only
+    db.execute(text("SELECT set_config('pg_trgm.word_similarity_threshold', :value, true)"), {"value": str(SEARCH_SIMILARITY)})
+    return [
+        _hit(target.kind, row_id, title, article, float(row_rank), headline)
+        for row_id, title, article, row_rank, headline in db.execute(stmt)
+    ]
+
+
+def _search_fallback(db: Session, target: SearchTarget, terms: List[str], limit: int):
+    model = target.model
+    matches = and_(*(or_(*(column.ilike(f"%{term}%") for column in target.text_columns)) for term in terms))
+    stmt = (
+        select(model.id, target.title, target.article if target.article is not None else literal(None), target.snippet)
+        .where(matches)
+        .order_by(model.id)
+        .limit(limit)
+    )
+    hits = []
+    for row_id, title, article, snippet in db.execute(stmt):
+        lowered = (title or "").lower()
+        rank = sum(term in lowered for term in terms) / len(terms)
+        hits.append(_hit(target.kind, row_id, title, article, rank, _highlight(f"{title or ''} {snippet or ''}", terms)))
+    return hits
+
+
+def _highlight(source: str, terms: List[str]) -> str:
+    """HTML snippet: the text is escaped and the matched terms are wrapped in <mark>."""
+    snippet = source.strip()[:SNIPPET_LENGTH]
+    pattern = re.compile("(" + "|".join(re.escape(term) for term in terms) + ")", re.IGNORECASE)
+    # split first, so a term never matches inside an entity the escaping added
+    parts = pattern.split(snippet)
+    return "".join(
+        f"<mark>{html.escape(part, quote=False)}</mark>" if index % 2 else html.escape(part, quote=False)
+        for index, part in enumerate(parts)
+    )
+
+
+def _hit(kind: str, row_id: int, title: str, article: Optional[str], rank: float, highlight: Optional[str]) -> Dict[str, Any]:
+    return {"type": kind, "id": row_id, "title": title, "article": article, "rank": rank, "highlight": highlight}
@@ -1,15 +1,46 @@
+import asyncio
+import multiprocessing
 import os
+import threading
 import time
-from typing import Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional, Tuple
 
 from jose import jwt, JWTError
 from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+from .cache import TTLCache
 
 SECRET_KEY = os.getenv("JWT_SECRET", "dev-secret-change")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_SECONDS = int(os.getenv("JWT_EXPIRE", "3600"))
+# Verified tokens kept in memory so repeat requests skip signature checks
+TOKEN_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "4096"))
+
+# bcrypt cost; hashes made with another cost are flagged for rehash on next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Hashing runs in a separate process pool awaited from async handlers, so it holds neither the GIL
+# nor a request threadpool thread; PASSWORD_HASH_WORKERS=0 hashes on the threadpool instead
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(max(1, PASSWORD_HASH_WORKERS) * 8)))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+
+class PasswordHasherBusy(Exception):
+    """Too many hash/verify jobs are already queued; the caller should back off."""
+
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
 
 
 def hash_password(password: str) -> str:
@@ -20,6 +51,52 @@ def verify_password(password: str, hashed: str) -> bool:
     return pwd_context.verify(password, hashed)
 
 
+def _verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: forking a process that already runs server threads is not safe
+            _executor = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+async def _run_pooled(fn: Callable, *args):
+    if not _pending.acquire(blocking=False):
+        raise PasswordHasherBusy()
+    try:
+        if PASSWORD_HASH_WORKERS <= 0:
+            return await run_in_threadpool(fn, *args)
+        # the event loop waits on the process pool's future: no thread is parked meanwhile
+        return await asyncio.wrap_future(_get_executor().submit(fn, *args))
+    finally:
+        _pending.release()
+
+
+async def hash_password_pooled(password: str) -> str:
+    """hash_password on the worker pool; raises PasswordHasherBusy when the queue is full."""
+    return await _run_pooled(hash_password, password)
+
+
+async def verify_and_update_pooled(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """Verify on the worker pool; also returns a new hash when the stored one uses an outdated cost."""
+    return await _run_pooled(_verify_and_update, password, hashed)
+
+
+def shutdown_password_pool() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
 def create_access_token(user_id: int, access_level: int) -> str:
     now = int(time.time())
     payload = {
@@ -31,11 +108,24 @@ def create_access_token(user_id: int, access_level: int) -> str:
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 
+# token -> (user_id, level, exp); entries never outlive the token's own exp claim
+_verified_tokens = TTLCache(ACCESS_TOKEN_EXPIRE_SECONDS, TOKEN_CACHE_SIZE)
+
+
 def decode_token(token: str) -> Optional[Tuple[int, int]]:
+    cached = _verified_tokens.get(token)
+    if cached is not None:
+        user_id, level, exp = cached
+        if exp > time.time():
+            return user_id, level
+        _verified_tokens.delete(token)
+        return None
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = int(payload.get("sub"))
         level = int(payload.get("lvl", 0))
-        return user_id, level
     except JWTError:
         return None
+    if payload.get("exp") is not None:
+        _verified_tokens.set(token, (user_id, level, int(payload["exp"])))
+    return user_id, level
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import os
+from collections.abc import Mapping
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Sequence, Union, get_args, get_origin
+
+from fastapi import Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.dependencies.utils import get_typed_signature
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, BeforeValidator, TypeAdapter
+from pydantic_core import PydanticUndefined
+
+try:
+    import orjson
+except ImportError:  # orjson is optional: msgspec or the stdlib encoder is used then
+    orjson = None
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+# FAST_SERIALIZATION=1: response_model routes (FastJSONRoute) and dump_json
+# encode ORM rows straight to JSON bytes through a plan compiled once per
+# schema, instead of validating them through pydantic and encoding the result
+# again. Rows come from our own database, so they are trusted as they are; the
+# OpenAPI schema is still generated from response_model and is unchanged.
+FAST_SERIALIZATION = os.getenv("FAST_SERIALIZATION", "0").lower() in ("1", "true", "yes")
+
+
+_adapters: Dict[Any, TypeAdapter] = {}
+
+
+def _adapter(schema: Any) -> TypeAdapter:
+    adapter = _adapters.get(schema)
+    if adapter is None:
+        adapter = _adapters[schema] = TypeAdapter(schema)
+    return adapter
+
+
+def dump_json(schema: Any, obj: Any) -> bytes:
+    """Serialize ORM rows to JSON bytes through a response schema, e.g. List[schemas.Color]."""
+    if FAST_SERIALIZATION:
+        return fast_dump_json(schema, obj)
+    return pydantic_dump_json(schema, obj)
+
+
+def pydantic_dump_json(schema: Any, obj: Any) -> bytes:
+    adapter = _adapter(schema)
+    return adapter.dump_json(adapter.validate_python(obj, from_attributes=True))
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    encode_json: Callable[[Any], bytes] = orjson.dumps
+elif msgspec is not None:
+    encode_json = msgspec.json.Encoder().encode
+else:
+    def encode_json(value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode()
+
+
+# ---- plans: schema -> function turning ORM rows into plain JSON-ready values
+
+Plan = Callable[[Any], Any]
+_plans: Dict[Any, Plan] = {}
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _float(value: Any) -> Any:
+    return float(value)  # pydantic outputs 5.0 for a float field holding 5
+
+
+def _optional(inner: Plan) -> Plan:
+    return lambda value: None if value is None else inner(value)
+
+
+def _list(inner: Plan) -> Plan:
+    if inner is _identity:
+        return list
+    return lambda values: [inner(value) for value in values]
+
+
+def _has_custom_logic(model) -> bool:
+    decorators = model.__pydantic_decorators__
+    for info in model.model_fields.values():
+        if any(callable(getattr(item, "func", None)) and not isinstance(item, BeforeValidator) for item in info.metadata):
+            return True  # After/Wrap/Plain validators or serializers on a field
+    return bool(
+        decorators.validators or decorators.field_validators or decorators.root_validators
+        or decorators.model_validators or decorators.field_serializers or decorators.model_serializers
+        or decorators.computed_fields
+    )
+
+
+def _field_plan(info) -> Plan:
+    """Plan of one field; a BeforeValidator (derived values such as photo_variants) runs first, even on None."""
+    plan = plan_for(info.annotation)
+    before = [item.func for item in info.metadata if isinstance(item, BeforeValidator)]
+    if not before:
+        return plan
+    inner = plan
+
+    def plan(value: Any) -> Any:
+        for func in before:
+            value = func(value)
+        return None if value is None else inner(value)
+    plan.runs_on_none = True
+    return plan
+
+
+def _field_source(name: str, info) -> str:
+    return info.validation_alias if isinstance(info.validation_alias, str) else name
+
+
+def _model_plan(model) -> Plan:
+    if _has_custom_logic(model):
+        # validators or serializers could change the output: keep pydantic for this model
+        adapter = _adapter(model)
+        return lambda value: adapter.dump_python(adapter.validate_python(value, from_attributes=True), mode="json")
+    fields = []
+    for name, info in model.model_fields.items():
+        default = info.get_default(call_default_factory=True) if not info.is_required() else PydanticUndefined
+        plan = _field_plan(info)
+        fields.append((_field_source(name, info), info.serialization_alias or info.alias or name, plan, default, getattr(plan, "runs_on_none", False)))
+
+    def convert(obj: Any) -> Dict[str, Any]:
+        out = {}
+        get = obj.get if isinstance(obj, Mapping) else functools.partial(getattr, obj)
+        for source, key, plan, default, on_none in fields:
+            value = get(source, default)
+            if value is PydanticUndefined or (value is None and not on_none):
+                out[key] = value
+            else:
+                out[key] = plan(value)
+        return out
+    return convert
+
+
+def plan_for(schema: Any) -> Plan:
+    plan = _plans.get(schema)
+    if plan is not None:
+        return plan
+    origin, args = get_origin(schema), get_args(schema)
+    if origin is Union:
+        members = [arg for arg in args if arg is not type(None)]
+        plan = _optional(plan_for(members[0])) if len(members) == 1 else _identity
+    elif origin in (list, List, Sequence, tuple, set, frozenset) and args:
+        plan = _list(plan_for(args[0]))
+    elif isinstance(schema, type) and issubclass(schema, BaseModel):
+        plan = _model_plan(schema)
+    elif schema is float:
+        plan = _float
+    else:
+        plan = _identity  # str, int, bool, datetime (encoded natively), dict, Any
+    _plans[schema] = plan
+    return plan
+
+
+def fast_dump_json(schema: Any, obj: Any) -> bytes:
+    return encode_json(plan_for(schema)(obj))
+
+
+# ---- routes
+
+def _fast_endpoint(endpoint: Callable, schema: Any, status_code: int) -> Callable:
+    """Wrap an endpoint so its return value leaves as pre-encoded JSON.
+
+    The wrapper needs the Response object FastAPI hands to the endpoint and its
+    dependencies (status codes and headers they set, e.g. ETag, X-Next-Cursor,
+    Idempotent-Replayed, must be carried over). FastAPI injects it into one
+    parameter only, so the endpoint's own Response parameter is reused, or one
+    is added to the wrapper's signature.
+    """
+    signature = get_typed_signature(endpoint)  # string annotations resolved against the router module
+    parameters = list(signature.parameters.values())
+    own = next((p.name for p in parameters if isinstance(p.annotation, type) and issubclass(p.annotation, Response)), None)
+    name = own or "_fast_json_response"
+    if own is None:
+        parameters.append(inspect.Parameter(name, inspect.Parameter.KEYWORD_ONLY, annotation=Response))
+
+    def respond(result: Any, sub_response: Response) -> Any:
+        if isinstance(result, Response):
+            return result
+        response = Response(encode_json(plan_for(schema)(result)), status_code=sub_response.status_code or status_code, media_type="application/json")
+        response.headers.raw.extend(header for header in sub_response.headers.raw if header[0] != b"content-length")
+        return response
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            sub_response = kwargs[name] if own else kwargs.pop(name)
+            return respond(await endpoint(**kwargs), sub_response)
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(**kwargs):
+            sub_response = kwargs[name] if own else kwargs.pop(name)
+            return respond(endpoint(**kwargs), sub_response)
+    wrapper.__signature__ = signature.replace(parameters=parameters)
+    wrapper.fast_json = True
+    return wrapper
+
+
+class FastJSONRoute(APIRoute):
+    """APIRoute that, with FAST_SERIALIZATION on, skips response_model validation and encodes rows directly."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        response_model = kwargs.get("response_model")
+        if (
+            FAST_SERIALIZATION and response_model is not None and not isinstance(response_model, DefaultPlaceholder)
+            and not getattr(endpoint, "fast_json", False)  # include_router builds the route again from the wrapper
+        ):
+            endpoint = _fast_endpoint(endpoint, response_model, kwargs.get("status_code") or 200)
+        super().__init__(path, endpoint, **kwargs)
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import shutil
+from typing import Optional, Tuple
+from urllib.parse import parse_qs
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response, StreamingResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from .cache import TTLCache
+from .compression import encoded_etag, negotiate
+
+try:
+    import brotli
+except ImportError:  # brotli is optional: only gzip siblings are produced then
+    brotli = None
+
+# Names that embed their own SHA-256 (content-addressed originals, hashed uploads)
+_HASHED_NAME_RE = re.compile(r"(?:^|_)([0-9a-f]{64})\.[A-Za-z0-9]{1,10}$")
+_HASH_DIR_RE = re.compile(r"^[0-9a-f]{64}$")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+UPLOADS_CACHE_CONTROL = os.getenv("UPLOADS_CACHE_CONTROL", "public, max-age=86400")
+RANGE_CHUNK_SIZE = 256 * 1024
+
+# Text-like uploads get .br/.gz siblings written next to them at upload time
+PRECOMPRESS_EXTENSIONS = {".svg", ".json", ".txt", ".csv", ".xml", ".html", ".css", ".js"}
+_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# (path, mtime_ns, size) -> strong ETag for files whose name carries no hash
+_etags = TTLCache(ttl=24 * 3600, max_entries=10000)
+
+
+def _file_etag(full_path: str, stat_result: os.stat_result) -> str:
+    match = _HASHED_NAME_RE.search(os.path.basename(full_path))
+    if match:
+        return f'"{match.group(1)}"'
+    key = (full_path, stat_result.st_mtime_ns, stat_result.st_size)
+    etag = _etags.get(key)
+    if etag is None:
+        digest = hashlib.sha256()
+        with open(full_path, "rb") as source:
+            for chunk in iter(lambda: source.read(1024 * 1024), b""):
+                digest.update(chunk)
+        etag = f'"{digest.hexdigest()}"'
+        _etags.set(key, etag)
+    return etag
+
+
+def _is_immutable(full_path: str) -> bool:
+    """Content-addressed originals and the derivatives kept in their `<sha256>/` directory."""
+    return bool(
+        _HASHED_NAME_RE.search(os.path.basename(full_path))
+        or _HASH_DIR_RE.match(os.path.basename(os.path.dirname(full_path)))
+    )
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Single byte range as inclusive (start, end); None if unsatisfiable or malformed."""
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        return None
+    return start, end
+
+
+def _media_type(full_path: str) -> str:
+    return mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+
+
+def precompress(full_path: str) -> None:
+    """Write .gz (and .br when brotli is installed) siblings for text-like files."""
+    if os.path.splitext(full_path)[1].lower() not in PRECOMPRESS_EXTENSIONS:
+        return
+    with open(full_path, "rb") as source, gzip.open(f"{full_path}.gz.tmp", "wb", compresslevel=9) as out:
+        shutil.copyfileobj(source, out)
+    os.replace(f"{full_path}.gz.tmp", f"{full_path}.gz")
+    if brotli is not None:
+        with open(full_path, "rb") as source:
+            data = brotli.compress(source.read(), quality=11)
+        with open(f"{full_path}.br.tmp", "wb") as out:
+            out.write(data)
+        os.replace(f"{full_path}.br.tmp", f"{full_path}.br")
+
+
+class UploadsStaticFiles(StaticFiles):
+    """StaticFiles for /uploads tuned for browser and CDN caching.
+
+    - strong ETags: the SHA-256 from content-addressed names, otherwise a
+      memoized hash of the file (computed in `lookup_path`, off the event loop);
+    - `immutable` Cache-Control for content-addressed names;
+    - If-None-Match / If-Range and single-range `Range` requests (206/416);
+    - precompressed `.br`/`.gz` siblings negotiated by q-value, each with its
+      own ETag, and `Vary: Accept-Encoding` on every response of such a file;
+    - `?variant=thumb|card|full` on an image original serves its derivative.
+    """
+
+    def __init__(self, *args, image_store=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.image_store = image_store
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        variant = self._requested_variant(path, scope)
+        if variant is not None:
+            path = variant
+        return await super().get_response(path, scope)
+
+    def _requested_variant(self, path: str, scope: Scope) -> Optional[str]:
+        if self.image_store is None or b"variant=" not in scope.get("query_string", b""):
+            return None
+        variant = parse_qs(scope["query_string"].decode()).get("variant", [None])[0]
+        url = self.image_store.variants(f"/uploads/{path}").get(variant or "")
+        if not url or not url.startswith("/uploads/"):
+            return None
+        return url[len("/uploads/"):]
+
+    def lookup_path(self, path: str):
+        full_path, stat_result = super().lookup_path(path)
+        if stat_result is not None and os.path.isfile(full_path):
+            _file_etag(full_path, stat_result)  # warm the ETag memo while still in the worker thread
+        return full_path, stat_result
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        etag = _file_etag(full_path, stat_result)
+        headers = {
+            "etag": etag,
+            "cache-control": IMMUTABLE_CACHE_CONTROL if _is_immutable(full_path) else UPLOADS_CACHE_CONTROL,
+            "accept-ranges": "bytes",
+        }
+
+        # Ranges always address the identity bytes; otherwise pick a sibling by q-value
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        ranged = bool(range_header) and status_code == 200 and (if_range is None or if_range == etag)
+        siblings = tuple(encoding for encoding, suffix in _ENCODINGS if os.path.isfile(full_path + suffix))
+        encoding = None if ranged or not siblings else negotiate(request_headers.get("accept-encoding"), siblings)
+        if siblings:
+            headers["vary"] = "Accept-Encoding"  # identity responses too: caches must not reuse them for gzip clients
+        if encoding is not None:
+            headers["etag"] = encoded_etag(etag, encoding)  # a strong ETag names exact bytes
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            if _etag_matches(if_none_match, headers["etag"]):
+                return NotModifiedResponse(Headers(headers))
+        elif status_code == 200:
+            response = FileResponse(full_path, stat_result=stat_result, headers=headers)
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+
+        if ranged:
+            return self._range_response(full_path, stat_result, range_header, headers)
+
+        if encoding is not None:
+            return FileResponse(
+                full_path + dict(_ENCODINGS)[encoding],
+                status_code=status_code,
+                media_type=_media_type(full_path),
+                headers={**headers, "content-encoding": encoding},
+            )
+
+        return FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+
+    def _range_response(self, full_path: str, stat_result: os.stat_result, range_header: str, headers: dict) -> Response:
+        size = stat_result.st_size
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None:
+            return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+        start, end = byte_range
+
+        async def body():
+            async with await anyio.open_file(full_path, "rb") as source:
+                await source.seek(start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = await source.read(min(RANGE_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+
+        return StreamingResponse(
+            body(),
+            status_code=206,
+            media_type=_media_type(full_path),
+            headers={
+                **headers,
+                "content-range": f"bytes {start}-{end}/{size}",
+                "content-length": str(end - start + 1),
+            },
+        )
@@ -1,21 +1,114 @@
+import hashlib
 import os
-from typing import Optional
-from fastapi import UploadFile
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Optional
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import String, cast, or_, update
 
-UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
+from . import cache, cards, models
+from .database import SessionLocal
+from .images import ImageStore
+from .static import precompress
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(os.path.dirname(__file__), "uploads"))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+# Photos of one request are written in parallel on this pool
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+
+_EXTENSION_RE = re.compile(r"^\.[A-Za-z0-9]{1,10}$")
+_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+
+
+
+def _derivatives_ready(digest: str) -> None:
+    """Bump updated_at of the rows showing the image, so their ETags pick up the new URLs."""
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        owners = cards.photo_owners(db, digest)
+        cards.touch_owners(db, owners)
+        cards.refresh_owners(db, owners)
+        db.execute(
+            update(models.News)
+            .where(or_(cast(models.News.photos, String).contains(digest), models.News.main_photo.contains(digest)))
+            .values(updated_at=now),
+            execution_options={"synchronize_session": False},
+        )
+        db.commit()
+    cache.invalidate("colors", "modules", "furniture")
+
+
+# Images are stored by content hash under uploads/img; once their derivatives are
+# rendered, the rows showing them are touched and cached catalog responses dropped
+image_store = ImageStore(os.path.join(UPLOAD_DIR, "img"), "/uploads/img/", on_ready=_derivatives_ready)
 
 
 def ensure_upload_dir() -> None:
     os.makedirs(UPLOAD_DIR, exist_ok=True)
+    os.makedirs(image_store.root, exist_ok=True)
+
+
+def _extension(filename: str) -> str:
+    ext = os.path.splitext(filename)[1].lower()
+    return ext if _EXTENSION_RE.match(ext) else ""
 
 
 def save_upload(file: UploadFile, prefix: Optional[str] = None) -> str:
+    """Stream an upload to disk in chunks and store it under its SHA-256.
+
+    The body goes to a temp file in UPLOAD_DIR and is renamed into place, so
+    readers never see a partial file; identical content maps to the same name
+    and is stored once. Images go to the content-addressed image store (the
+    prefix is not part of their name) and get derivatives in the background.
+    """
     ensure_upload_dir()
-    filename = file.filename or "upload.bin"
-    safe_name = filename.replace("/", "_").replace("\\", "_")
-    if prefix:
-        safe_name = f"{prefix}_{safe_name}"
-    file_path = os.path.join(UPLOAD_DIR, safe_name)
-    with open(file_path, "wb") as out:
-        out.write(file.file.read())
-    return f"/uploads/{safe_name}"
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_DIR, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = file.file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > UPLOAD_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Файл {file.filename} превышает допустимый размер")
+                digest.update(chunk)
+                out.write(chunk)
+        ext = _extension(file.filename or "")
+        if image_store.accepts(ext):
+            file_path = image_store.original_path(digest.hexdigest(), ext)
+            url = image_store.original_url(digest.hexdigest(), ext)
+        else:
+            safe_name = f"{digest.hexdigest()}{ext}"
+            if prefix:
+                safe_name = f"{prefix}_{safe_name}"
+            file_path = os.path.join(UPLOAD_DIR, safe_name)
+            url = f"/uploads/{safe_name}"
+        if os.path.exists(file_path):
+            os.remove(tmp_path)
+            if image_store.accepts(ext):
+                image_store.ensure_derivatives(digest.hexdigest(), ext)  # a crash may have left them unbuilt
+        else:
+            os.replace(tmp_path, file_path)
+            if image_store.accepts(ext):
+                image_store.schedule_derivatives(digest.hexdigest(), ext)
+            else:
+                precompress(file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return url
+
+
+def save_uploads(files: List[UploadFile], prefix: Optional[str] = None) -> List[str]:
+    """Save every named file of a form concurrently, keeping their order."""
+    files = [file for file in files if file.filename]
+    if len(files) <= 1:
+        return [save_upload(file, prefix=prefix) for file in files]
+    return list(_executor.map(lambda file: save_upload(file, prefix=prefix), files))
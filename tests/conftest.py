@@ -0,0 +1,58 @@
+import os
+import tempfile
+
+import pytest
+
+# The engine is created when backend.database is imported: point it at a
+# throwaway SQLite file before any backend module is loaded.
+_tmp = tempfile.mkdtemp(prefix="behoof-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'test.sqlite')}"
+os.environ["UPLOAD_DIR"] = os.path.join(_tmp, "uploads")
+os.environ["RESPONSE_CACHE_TTL"] = "0"  # every request reaches the database
+os.environ["PASSWORD_HASH_WORKERS"] = "0"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["METRICS_QUERY_BUDGET"] = "0"
+os.environ["METRICS_LATENCY_BUDGET_MS"] = "0"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from backend.bench import seed  # noqa: E402
+from backend.database import engine, init_db  # noqa: E402
+from backend.main import app  # noqa: E402
+from backend.security import create_access_token  # noqa: E402
+
+SEED_SIZE = seed.SeedSize(modules=200, colors=12, furniture=100, users=10, orders=120, news=5)
+
+
+@pytest.fixture(scope="session")
+def client():
+    init_db()
+    seed.seed(engine, SEED_SIZE)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def admin_headers():
+    return {"Authorization": f"Bearer {create_access_token(1, 3)}"}
+
+
+@pytest.fixture
+def count_queries():
+    """count_queries(call) -> number of SQL statements the call ran; the response must be 2xx."""
+    statements = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+
+    def count(call):
+        statements.clear()
+        response = call()
+        assert response.is_success, (response.status_code, response.text[:200])
+        return len(statements)
+
+    yield count
+    event.remove(engine, "before_cursor_execute", listener)
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from backend import auth, database, models, security
+from backend.cache import access_level_cache
+
+
+REGISTRATION = {
+    "full_name": "Тест", "login": "auth-test", "email": "auth-test@example.com", "phone_number": "+70000000000",
+    "password": "secret-password",
+}
+
+
+def test_register_and_login(client):
+    response = client.post("/api/auth/register", json=REGISTRATION)
+    assert response.status_code == 200, response.text
+    assert response.json()["access_token"]
+    response = client.post("/api/auth/login", params={"login": REGISTRATION["email"], "password": REGISTRATION["password"]})
+    assert response.status_code == 200, response.text
+    response = client.post("/api/auth/login", params={"login": REGISTRATION["email"], "password": "wrong"})
+    assert response.status_code == 400
+
+
+def test_hashing_does_not_block_the_event_loop():
+    # while a hash is awaited, other coroutines keep running on the loop
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        hashed = await security.hash_password_pooled("password")
+        task.cancel()
+        return hashed, ticks
+
+    hashed, ticks = asyncio.run(scenario())
+    assert security.verify_password("password", hashed)
+    assert ticks > 0
+
+
+def test_async_require_access_reads_the_level_through_the_async_session(client):
+    with database.SessionLocal() as db:
+        db.execute(update(models.User).where(models.User.id == 2).values(access_level=1))
+        db.commit()
+    access_level_cache.delete(2)
+
+    async def check(min_level, claimed_level):
+        engine = create_async_engine(database.ASYNC_DATABASE_URL)
+        try:
+            async with AsyncSession(engine) as db:
+                return await auth.require_access_async(min_level)(auth.AuthContext(user_id=2, access_level=claimed_level), db)
+        finally:
+            await engine.dispose()
+
+    # the token claims level 3, the stored level 1 wins
+    with pytest.raises(HTTPException) as denied:
+        asyncio.run(check(2, 3))
+    assert denied.value.status_code == 403
+    assert access_level_cache.get(2) == 1
+    access_level_cache.delete(2)
+    assert asyncio.run(check(1, 3)).access_level == 1
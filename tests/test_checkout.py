@@ -0,0 +1,55 @@
+from backend.security import create_access_token
+
+from .test_query_counts import _order
+
+BODY = {
+    "full_name": "Иван Иванов", "email": "buyer@example.com", "delivery_address": "ул. Тестовая, 1",
+    "city": "Москва", "street": "Тестовая", "house": "1", "payment_method": "card", "recipient": "Иван Иванов",
+}
+
+
+def _auth(user_id, level=1):
+    return {"Authorization": f"Bearer {create_access_token(user_id, level)}"}
+
+
+def test_checkout_keeps_cart_lines(client):
+    user_id = 5
+    module = client.get("/api/modules/11").json()
+    color = module["colors"][0]
+    client.post(f"/api/users/{user_id}/cart/modules/11", params={"color_id": color["id"], "quantity": 2}, headers=_auth(user_id))
+    client.post(f"/api/users/{user_id}/cart/modules/12", headers=_auth(user_id))
+    cart = client.get(f"/api/users/{user_id}/cart").json()
+
+    response = client.post(f"/api/users/{user_id}/cart/checkout", json=BODY, headers=_auth(user_id))
+    assert response.status_code == 201, response.text
+    order = response.json()
+    lines = [(item["module_id"], item["color_id"], item["quantity"]) for item in order["items"]]
+    assert lines == [(item["module_id"], item["color_id"], item["quantity"]) for item in cart["items"]]
+    assert (11, color["id"], 2) in lines and (12, None, 1) in lines
+    assert order["total_amount"] == sum(item["quantity"] * item["unit_price"] for item in order["items"]) == cart["total_amount"]
+    assert client.get(f"/api/orders/{order['id']}").json()["items"] == order["items"]
+
+
+def test_checkout_of_another_users_cart_is_forbidden(client):
+    client.post("/api/users/6/cart/modules/13", headers=_auth(6))
+    response = client.post("/api/users/6/cart/checkout", json=BODY, headers=_auth(7))
+    assert response.status_code == 403
+    assert client.get("/api/users/6/cart").json()["items"]
+
+
+def test_plain_order_lines_match_its_modules(client, admin_headers):
+    order = client.get(f"/api/orders/{_order(client, admin_headers, [1, 2, 2])}").json()
+    assert [item["module_id"] for item in order["items"]] == [1, 2]
+    assert order["total_amount"] == sum(item["unit_price"] for item in order["items"])
+
+
+def test_creating_an_order_keeps_other_session_objects_attached(client):
+    from backend import crud, models, schemas
+    from backend.database import SessionLocal
+
+    with SessionLocal() as db:
+        user = db.get(models.User, 8)
+        order_in = schemas.OrderCreate(user_id=8, module_ids=[3, 4], **BODY)
+        order = crud.create_order(db, order_in)
+        assert [module.id for module in order.modules] == [3, 4]
+        assert order.id in [placed.id for placed in user.orders]  # lazy load on the caller's row
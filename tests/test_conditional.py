@@ -0,0 +1,51 @@
+import io
+import time
+
+import pytest
+
+from backend import images
+from backend.uploads import image_store
+
+from .test_query_counts import _order
+
+
+def test_order_etag_changes_when_modules_are_replaced(client, admin_headers):
+    order_id = _order(client, admin_headers, [1, 2])
+    first = client.get(f"/api/orders/{order_id}")
+    etag = first.headers["etag"]
+    assert client.get(f"/api/orders/{order_id}", headers={"If-None-Match": etag}).status_code == 304
+
+    # same modules in another order: total_amount stays, the composition does not
+    response = client.put(f"/api/orders/{order_id}", json={"module_ids": [2, 1]}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["total_amount"] == first.json()["total_amount"]
+
+    second = client.get(f"/api/orders/{order_id}", headers={"If-None-Match": etag})
+    assert second.status_code == 200
+    assert second.headers["etag"] != etag
+
+
+@pytest.mark.skipif(images.Image is None, reason="Pillow is not installed")
+def test_etag_changes_when_photo_derivatives_are_ready(client, admin_headers):
+    picture = io.BytesIO()
+    images.Image.effect_noise((1600, 1200), 64).convert("RGB").save(picture, format="PNG")
+    response = client.post(
+        "/api/modules/",
+        data={"name": "Модуль с фото", "article": "M-PHOTO", "price": "1000"},
+        files={"photos": ("photo.png", picture.getvalue(), "image/png")},
+        headers=admin_headers,
+    )
+    assert response.status_code == 201, response.text
+    module_id = response.json()["id"]
+    first = client.get(f"/api/modules/{module_id}")
+    variants = first.json()["photo_variants"][0]
+
+    deadline = time.monotonic() + 20
+    while image_store._pending and time.monotonic() < deadline:
+        time.sleep(0.05)
+    second = client.get(f"/api/modules/{module_id}", headers={"If-None-Match": first.headers["etag"]})
+    if variants["thumb"] == variants["original"]:  # served before the derivatives existed
+        assert second.status_code == 200
+        assert second.json()["photo_variants"][0]["thumb"] != variants["original"]
+    else:
+        assert second.status_code == 304
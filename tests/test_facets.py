@@ -0,0 +1,41 @@
+from backend import crud, models
+from backend.database import SessionLocal
+from backend.filters import CatalogFilters
+
+
+def _module_facets(client):
+    facets = client.get("/api/modules/facets").json()
+    return {key: facets[key] for key in ("total", "colors", "price")}
+
+
+def _live_module_facets():
+    with SessionLocal() as db:
+        return crud._catalog_facets(db, models.Module, crud.MODULE_COLOR_LINK, lambda f: crud._module_conditions(None, f), CatalogFilters())
+
+
+def _live_furniture_types():
+    with SessionLocal() as db:
+        return crud._value_counts(db, models.Furniture.furniture_type, [])
+
+
+def test_unfiltered_facets_match_a_live_count(client):
+    assert _module_facets(client) == _live_module_facets()
+    assert client.get("/api/furniture/facets").json()["furniture_types"] == _live_furniture_types()
+
+
+def test_stored_facets_follow_module_writes(client):
+    colors = client.get("/api/colors/").json()
+    created = client.post(
+        "/api/modules/",
+        data={"name": "Фасетный модуль", "article": "FACET-1", "price": "123456", "color_ids": f"[{colors[0]['id']}]"},
+    )
+    assert created.status_code == 201, created.text
+    module_id = created.json()["id"]
+    assert _module_facets(client) == _live_module_facets()
+
+    updated = client.put(f"/api/modules/{module_id}", data={"price": "10", "color_ids": f"[{colors[1]['id']}, {colors[2]['id']}]"})
+    assert updated.status_code == 200, updated.text
+    assert _module_facets(client) == _live_module_facets()
+
+    assert client.delete(f"/api/modules/{module_id}").status_code == 200
+    assert _module_facets(client) == _live_module_facets()
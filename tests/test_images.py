@@ -0,0 +1,65 @@
+import io
+import os
+import time
+
+import pytest
+
+from backend import images
+from backend.images import ImageStore, VARIANTS
+
+pytestmark = pytest.mark.skipif(images.Image is None, reason="Pillow is not installed")
+
+
+def _png() -> bytes:
+    out = io.BytesIO()
+    images.Image.new("RGB", (40, 30), "red").save(out, format="PNG")
+    return out.getvalue()
+
+
+GOOD = "a" * 64
+BAD = "b" * 64
+
+
+def _store(tmp_path, name: str, body: bytes) -> ImageStore:
+    store = ImageStore(str(tmp_path), "/uploads/img/")
+    (tmp_path / name).write_bytes(body)
+    return store
+
+
+def _wait(store: ImageStore, digest: str) -> None:
+    deadline = time.monotonic() + 10
+    while digest in store._pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_missing_derivatives_are_built_on_first_lookup(tmp_path):
+    store = _store(tmp_path, f"{GOOD}.png", _png())
+    url = f"/uploads/img/{GOOD}.png"
+    assert store.variants(url)["thumb"] == url  # scheduled, the original meanwhile
+    _wait(store, GOOD)
+    variants = store.variants(url)
+    assert all(variants[variant].startswith(f"/uploads/img/{GOOD}/") for variant in VARIANTS)
+    assert all(os.path.exists(os.path.join(str(tmp_path), GOOD, f"{variant}.{store.suffix}")) for variant in VARIANTS)
+
+
+def test_undecodable_upload_is_not_checked_again(tmp_path, monkeypatch):
+    store = _store(tmp_path, f"{BAD}.png", b"not an image")
+    url = f"/uploads/img/{BAD}.png"
+    store.variants(url)
+    _wait(store, BAD)
+    calls = []
+    real_exists = os.path.exists
+    monkeypatch.setattr(images.os.path, "exists", lambda path: calls.append(path) or real_exists(path))
+    for _ in range(5):
+        assert store.variants(url)["card"] == url
+    assert calls == []
+
+
+def test_urls_outside_the_store_never_reach_the_filesystem(tmp_path, monkeypatch):
+    store = ImageStore(str(tmp_path / "img"), "/uploads/img/")
+    monkeypatch.setattr(store, "_generate", lambda digest, ext: pytest.fail(f"scheduled {digest}{ext}"))
+    calls = []
+    monkeypatch.setattr(images.os.path, "exists", lambda path: calls.append(path) or False)
+    for url in ("/uploads/img/../../etc/x.png", f"/uploads/img/{GOOD}.svg", "/uploads/img/abc.png", f"/uploads/img/x/../{GOOD}.png"):
+        assert store.variants(url)["thumb"] == url
+    assert calls == []
@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import DBAPIError
+
+from backend import metrics
+from backend.security import create_access_token
+
+
+def test_metrics_require_internal_access(client):
+    assert client.get("/metrics").status_code in (401, 403)
+    user = {"Authorization": f"Bearer {create_access_token(2, 1)}"}
+    assert client.get("/metrics", headers=user).status_code == 403
+
+
+def test_metrics_export_pool_gauges(client, admin_headers):
+    client.get("/api/modules/", params={"limit": 1})
+    response = client.get("/metrics", headers=admin_headers)
+    assert response.status_code == 200
+    assert 'http_requests_total{method="GET",route="/api/modules/",status="200"}' in response.text
+    for name in ("db_pool_size", "db_pool_checked_out", "db_pool_checkout_wait_seconds_count"):
+        assert f'{name}{{pool="sync"}}' in response.text
+    assert 'db_pool_checkout_wait_seconds_bucket{pool="sync",le="+Inf"}' in response.text
+
+
+def test_failed_statement_is_counted_and_leaves_no_state():
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(engine)
+    stats = metrics.RequestStats()
+    token = metrics._current.set(stats)
+    try:
+        with engine.connect() as conn:
+            with pytest.raises(DBAPIError):
+                conn.exec_driver_sql("SELECT * FROM missing_table")
+            conn.exec_driver_sql("SELECT 1")
+            assert not any(key.startswith("metrics") for key in conn.info)
+    finally:
+        metrics._current.reset(token)
+    assert stats.queries == 2
+    assert stats.statements["SELECT 1"] == 1
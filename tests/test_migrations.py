@@ -0,0 +1,21 @@
+from sqlalchemy import create_engine, insert, select
+
+from backend import database, models
+
+
+def test_cart_modules_migration_recounts_cart_totals():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        database.Base.metadata.create_all(bind=conn)
+        conn.execute(insert(models.User), [{"id": 1, "full_name": "U", "login": "u", "email": "u@example.com", "phone_number": "1", "hashed_password": "x"}])
+        conn.execute(insert(models.Module), [
+            {"id": 1, "name": "A", "article": "A-1", "price": 100.0, "discounted_price": None},
+            {"id": 2, "name": "B", "article": "B-1", "price": 50.0, "discounted_price": 40.0},
+        ])
+        conn.execute(insert(models.Cart), [{"id": 1, "user_id": 1, "status": "active", "total_amount": 999.0}])
+        conn.exec_driver_sql("CREATE TABLE cart_modules (cart_id INTEGER, module_id INTEGER)")
+        conn.exec_driver_sql("INSERT INTO cart_modules VALUES (1, 1), (1, 2)")
+
+        database._migrate_cart_modules(conn)
+
+        assert conn.scalar(select(models.Cart.total_amount).where(models.Cart.id == 1)) == 140.0
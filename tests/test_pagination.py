@@ -0,0 +1,21 @@
+from backend.pagination import NEXT_CURSOR_HEADER, encode_cursor
+
+
+def test_cursor_is_accepted_by_the_list_that_issued_it(client):
+    first = client.get("/api/modules/", params={"limit": 2})
+    token = first.headers[NEXT_CURSOR_HEADER]
+    second = client.get("/api/modules/", params={"limit": 2, "after": token})
+    assert second.status_code == 200
+    assert [row["id"] for row in second.json()] == [3, 4]
+
+
+def test_cursor_from_another_list_is_rejected(client):
+    token = client.get("/api/modules/", params={"limit": 2}).headers[NEXT_CURSOR_HEADER]
+    for path in ("/api/orders", "/api/news/", "/api/furniture/", "/api/modules/cards"):
+        response = client.get(path, params={"after": token})
+        assert response.status_code == 400, path
+
+
+def test_cursor_without_kind_or_malformed_is_rejected(client):
+    assert client.get("/api/orders", params={"after": encode_cursor(5)}).status_code == 400
+    assert client.get("/api/orders", params={"after": "garbage!!"}).status_code == 400
@@ -0,0 +1,61 @@
+import pytest
+
+from backend.security import create_access_token
+
+
+# Every list and detail endpoint runs a fixed number of queries, whatever the
+# page size and however many colors / modules / cart lines the rows carry
+# (crud loader profiles: MODULE_LOAD, FURNITURE_LOAD, ORDER_LOAD, CART_LOAD).
+
+PAGE_SIZES = (1, 10, 50)
+# validator query + rows + one SELECT ... IN per relationship level
+QUERY_BUDGET = 5
+
+LIST_ENDPOINTS = ("/api/modules/", "/api/furniture/", "/api/orders")
+
+
+@pytest.mark.parametrize("path", LIST_ENDPOINTS)
+def test_list_query_count_is_constant(client, count_queries, path):
+    counts = {limit: count_queries(lambda: client.get(path, params={"limit": limit})) for limit in PAGE_SIZES}
+    assert len(set(counts.values())) == 1, counts
+    assert counts[PAGE_SIZES[-1]] <= QUERY_BUDGET, counts
+
+
+@pytest.mark.parametrize("path", ("/api/modules/{}", "/api/furniture/{}"))
+def test_catalog_detail_query_count_is_constant(client, count_queries, path):
+    # seeded rows have 1 to 4 colors each
+    counts = {row_id: count_queries(lambda: client.get(path.format(row_id))) for row_id in range(1, 9)}
+    assert len(set(counts.values())) == 1, counts
+    assert max(counts.values()) <= QUERY_BUDGET, counts
+
+
+def _order(client, headers, module_ids):
+    body = {
+        "user_id": 1, "module_ids": module_ids, "full_name": "Иван Иванов", "email": "buyer@example.com",
+        "delivery_address": "ул. Тестовая, 1", "city": "Москва", "street": "Тестовая", "house": "1",
+        "payment_method": "card", "recipient": "Иван Иванов",
+    }
+    response = client.post("/api/orders", json=body, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def test_order_detail_query_count_is_constant(client, admin_headers, count_queries):
+    orders = {size: _order(client, admin_headers, list(range(1, size + 1))) for size in (1, 10, 40)}
+    counts = {size: count_queries(lambda: client.get(f"/api/orders/{order_id}")) for size, order_id in orders.items()}
+    assert len(set(counts.values())) == 1, counts
+    assert max(counts.values()) <= QUERY_BUDGET, counts
+
+
+def test_cart_query_count_is_constant(client, count_queries):
+    counts = {}
+    for user_id, lines in ((2, 1), (3, 10), (4, 30)):
+        headers = {"Authorization": f"Bearer {create_access_token(user_id, 1)}"}
+        for module_id in range(101, 101 + lines):
+            response = client.post(f"/api/users/{user_id}/cart/modules/{module_id}", headers=headers)
+            assert response.status_code == 200, response.text
+        cart = client.get(f"/api/users/{user_id}/cart").json()
+        assert len(cart["items"]) >= lines
+        counts[lines] = count_queries(lambda: client.get(f"/api/users/{user_id}/cart"))
+    assert len(set(counts.values())) == 1, counts
+    assert max(counts.values()) <= QUERY_BUDGET, counts
@@ -0,0 +1,8 @@
+def test_fallback_highlight_escapes_the_source_text(client):
+    created = client.post("/api/modules/", data={"name": "Shelf <b>amp</b> & lt", "article": "SEARCH-ESC-1", "price": "10"})
+    assert created.status_code == 201, created.text
+
+    response = client.get("/api/search/", params={"q": "shelf amp lt", "types": "modules"})
+    assert response.status_code == 200
+    [hit] = [hit for hit in response.json() if hit["id"] == created.json()["id"]]
+    assert hit["highlight"] == "<mark>Shelf</mark> &lt;b&gt;<mark>amp</mark>&lt;/b&gt; &amp; <mark>lt</mark>"
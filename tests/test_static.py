@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from backend.static import precompress
+from backend.uploads import UPLOAD_DIR
+
+BODY = b"<svg xmlns='http://www.w3.org/2000/svg'>" + b"<g/>" * 500 + b"</svg>"
+
+
+@pytest.fixture(scope="module")
+def svg(client):
+    path = os.path.join(UPLOAD_DIR, "static-test.svg")
+    with open(path, "wb") as out:
+        out.write(BODY)
+    precompress(path)
+    return "/uploads/static-test.svg"
+
+
+def test_sibling_has_its_own_etag(client, svg):
+    identity = client.get(svg, headers={"Accept-Encoding": "identity"})
+    gzipped = client.get(svg, headers={"Accept-Encoding": "gzip"})
+    assert identity.headers.get("content-encoding") is None
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.content == BODY  # httpx decodes the sibling
+    assert identity.headers["etag"] != gzipped.headers["etag"]
+    assert identity.headers["vary"] == gzipped.headers["vary"] == "Accept-Encoding"
+
+    stale = client.get(svg, headers={"Accept-Encoding": "gzip", "If-None-Match": identity.headers["etag"]})
+    assert stale.status_code == 200
+    fresh = client.get(svg, headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]})
+    assert fresh.status_code == 304
+
+
+def test_zero_q_value_refuses_the_encoding(client, svg):
+    response = client.get(svg, headers={"Accept-Encoding": "gzip;q=0, br;q=0"})
+    assert response.headers.get("content-encoding") is None
+    assert response.content == BODY
+
+
+def test_range_addresses_identity_bytes(client, svg):
+    response = client.get(svg, headers={"Accept-Encoding": "gzip", "Range": "bytes=0-9"})
+    assert response.status_code == 206
+    assert response.content == BODY[:10]
+    assert response.headers.get("content-encoding") is None